@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+
+# Seuils par défaut des règles (modifiables depuis la barre latérale)
+SEUILS_ANOMALIES_DEFAUT = {
+    'heures_max_jour': 12.0,       # journée anormalement longue (en heures)
+    'intervalle_min_minutes': 15,  # intervalle entrée–sortie suspect (en minutes)
+}
+
+# Libellés des règles, dans l'ordre d'affichage
+REGLES_ANOMALIES = {
+    'journee_longue': "Journée trop longue",
+    'pointage_orphelin': "Pointage impair (dernier ignoré)",
+    'pointage_illisible': "Pointage illisible ignoré",
+    'intervalle_court': "Intervalle très court",
+    'doublon': "Doublon supprimé",
+}
+
+STYLE_HEURES_ABERRANTES = 'background-color: #ffcccc; color: red; font-weight: bold'
+STYLE_LIGNE_ANOMALIE = 'background-color: #fff4e5'
+
+
+def _colonne(df, nom, defaut):
+    # Les données restaurées d'anciens fichiers peuvent ne pas avoir les colonnes de diagnostic
+    if nom in df.columns:
+        return df[nom]
+    return pd.Series(defaut, index=df.index)
+
+
+def detecter_anomalies(df, seuils=None):
+    """
+    Ajoute une colonne booléenne par règle d'anomalie, calculée sur toute la table à la fois.
+
+    Args:
+        df (pd.DataFrame): Données journalières issues de traiter_fichier (éventuellement ajustées)
+        seuils (dict): Surcharge de SEUILS_ANOMALIES_DEFAUT
+
+    Returns:
+        pd.DataFrame: Copie de `df` avec les colonnes 'anomalie_<règle>' et 'nb_anomalies'
+    """
+    seuils = {**SEUILS_ANOMALIES_DEFAUT, **(seuils or {})}
+    res = df.copy()
+    res['anomalie_journee_longue'] = res['hours_worked'] > seuils['heures_max_jour']
+    res['anomalie_pointage_orphelin'] = _colonne(res, 'pointage_orphelin', False).astype(bool)
+    res['anomalie_pointage_illisible'] = _colonne(res, 'pointages_invalides', 0) > 0
+    # NaN (aucun intervalle complet) n'est jamais inférieur au seuil
+    res['anomalie_intervalle_court'] = _colonne(res, 'intervalle_min', np.nan) < seuils['intervalle_min_minutes']
+    res['anomalie_doublon'] = _colonne(res, 'doublons_retires', 0) > 0
+    colonnes = [f"anomalie_{code}" for code in REGLES_ANOMALIES]
+    res['nb_anomalies'] = res[colonnes].sum(axis=1)
+    return res
+
+
+def table_anomalies(df_anomalies, regles=None):
+    """
+    Construit la table des anomalies : une ligne par (jour, règle déclenchée).
+
+    Args:
+        df_anomalies (pd.DataFrame): Résultat de detecter_anomalies
+        regles (list): Codes des règles à conserver (toutes par défaut)
+
+    Returns:
+        pd.DataFrame: Colonnes 'emp_id', 'name', 'department', 'date', 'hours_worked', 'Anomalie'
+    """
+    regles = list(regles) if regles is not None else list(REGLES_ANOMALIES)
+    colonnes = [f"anomalie_{code}" for code in regles]
+    base = ['emp_id', 'name', 'department', 'date', 'hours_worked']
+    if not colonnes:
+        return pd.DataFrame(columns=base + ['Anomalie'])
+
+    drapeaux = df_anomalies[colonnes].to_numpy()
+    lignes, regles_idx = np.nonzero(drapeaux)
+    table = df_anomalies[base].iloc[lignes].reset_index(drop=True)
+    table['Anomalie'] = np.array([REGLES_ANOMALIES[code] for code in regles])[regles_idx]
+    return table.sort_values(['emp_id', 'date'], kind='stable').reset_index(drop=True)
+
+
+def styler_anomalies(styler, df_anomalies):
+    """
+    Applique le style des anomalies à un Styler en un seul appel sur toute la table.
+
+    Les lignes avec au moins une anomalie sont surlignées, et la cellule 'hours_worked'
+    des journées trop longues passe en rouge.
+
+    Args:
+        styler (pandas.io.formats.style.Styler): Styler de la table affichée
+        df_anomalies (pd.DataFrame): Résultat de detecter_anomalies, même index que la table
+    """
+    def _styles(donnees):
+        en_anomalie = df_anomalies['nb_anomalies'].reindex(donnees.index).fillna(0).to_numpy() > 0
+        longue = df_anomalies['anomalie_journee_longue'].reindex(donnees.index).fillna(False).to_numpy(dtype=bool)
+        styles = np.where(en_anomalie[:, None], STYLE_LIGNE_ANOMALIE, '')
+        styles = np.broadcast_to(styles, donnees.shape).copy()
+        if 'hours_worked' in donnees.columns:
+            col = donnees.columns.get_loc('hours_worked')
+            styles[:, col] = np.where(longue, STYLE_HEURES_ABERRANTES, styles[:, col])
+        return pd.DataFrame(styles, index=donnees.index, columns=donnees.columns)
+
+    return styler.apply(_styles, axis=None)
@@ -1,10 +1,27 @@
 import streamlit as st
-import pandas as pd
+import uuid
+from concurrent.futures import TimeoutError as DelaiDepasse
 from datetime import datetime
-import altair as alt
-import calendar
-from utils import lire_onglet_excel, traiter_fichier, determiner_statut, analyser_rythme_hebdomadaire
-from visualisation import creer_graphique_heures_par_employe, creer_graphiques_par_departement, creer_graphiques_tendance_journaliere, afficher_statut_employes
+from cache_partage import obtenir_cache, empreinte_octets, empreinte_dataframe
+from chargement import (module_paresseux, obtenir_analyse, obtenir_intervalles, analyse_disponible,
+                        enregistrer_fichier, lancer_prechargement)
+
+# Pile de données et de graphiques importée à la demande (après le premier téléversement)
+pd = module_paresseux("pandas")
+np = module_paresseux("numpy")
+utils = module_paresseux("utils")
+visualisation = module_paresseux("visualisation")
+export = module_paresseux("export")
+anomalies = module_paresseux("anomalies")
+prevision = module_paresseux("prevision")
+cube = module_paresseux("cube")
+registre = module_paresseux("registre")
+executeur = module_paresseux("executeur")
+pagination = module_paresseux("pagination")
+simulation = module_paresseux("simulation")
+couverture = module_paresseux("couverture")
+resume_incremental = module_paresseux("resume_incremental")
+instantane = module_paresseux("instantane")
 
 st.set_page_config(page_title="Calcul des Heures Employés", page_icon="⏱️")
 
@@ -13,24 +30,79 @@ if 'employee_roles' not in st.session_state:
     st.session_state.employee_roles = {}
 if 'manual_adjustments' not in st.session_state:
     st.session_state.manual_adjustments = {}
+# Identifiant de la session, pour la file d'attente équitable des analyses
+if 'id_session' not in st.session_state:
+    st.session_state.id_session = uuid.uuid4().hex
 
 # Supprimer les constantes globales, elles seront calculées à partir des inputs
 # SEUIL_CUISINE = 42 * 4.33 
 # SEUIL_SALLE = 39 * 4.33
 
+months_fr = ["Janvier", "Février", "Mars", "Avril", "Mai", "Juin", 
+            "Juillet", "Août", "Septembre", "Octobre", "Novembre", "Décembre"]
+
+# Valeurs initiales des paramètres de la barre latérale (clés "param_<nom>" de l'état de session,
+# enregistrées dans les instantanés de session et restaurées avec eux)
+PARAMETRES_DEFAUT = {
+    'seuil_hebdo_cuisine': 42.0,
+    'seuil_hebdo_salle': 39.0,
+    'mois': months_fr[datetime.now().month - 1],
+    'marge_alerte': 10,
+    'montrer_toutes_donnees': False,
+    'seuil_journee_longue': 12.0,
+    'seuil_intervalle_court': 15,
+}
+for nom_parametre, valeur_defaut in PARAMETRES_DEFAUT.items():
+    if f"param_{nom_parametre}" not in st.session_state:
+        st.session_state[f"param_{nom_parametre}"] = valeur_defaut
+
 st.title("Calcul des Heures Employés")
 st.markdown("Cet outil analyse un fichier Excel de pointage et calcule les heures travaillées par employé.")
 
+# Cache partagé par toutes les sessions du serveur (fichiers analysés et agrégats)
+cache = obtenir_cache()
+
 # --- Paramètres d'analyse --- 
 with st.sidebar:
+    # Reprise d'une session enregistrée : traitée avant les paramètres, qu'elle renseigne
+    with st.expander("💾 Reprendre une session enregistrée"):
+        fichier_instantane = st.file_uploader(
+            "Instantané de session (.heures)", type=["heures"],
+            help="Données analysées, rôles, modifications manuelles et paramètres : la session reprend "
+                 "sans le fichier Excel ni nouvelle analyse."
+        )
+    session_restauree = None
+    if fichier_instantane is not None:
+        donnees_instantane = fichier_instantane.getvalue()
+        cle_instantane = empreinte_octets(donnees_instantane)
+        try:
+            session_restauree = cache.obtenir_ou_calculer(
+                ("instantane", cle_instantane),
+                lambda: instantane.lire_instantane(donnees_instantane)
+            )
+        except ValueError as e:
+            st.error(f"Instantané illisible : {e}")
+        # État de la session remplacé une seule fois par instantané chargé
+        if session_restauree is not None and st.session_state.get('instantane_restaure') != cle_instantane:
+            etat_restaure = session_restauree['etat']
+            # Les champs de rôle et d'heures reprendront les valeurs restaurées
+            for cle_widget in [k for k in st.session_state if str(k).startswith(("role_", "edit_"))]:
+                del st.session_state[cle_widget]
+            st.session_state.employee_roles = dict(etat_restaure['roles'])
+            st.session_state.manual_adjustments = dict(etat_restaure['ajustements'])
+            for nom_parametre, valeur in etat_restaure['parametres'].items():
+                if nom_parametre in PARAMETRES_DEFAUT:
+                    st.session_state[f"param_{nom_parametre}"] = valeur
+            st.session_state.instantane_restaure = cle_instantane
+    
     st.header("Paramètres des Seuils (Heures Supp.)")
     
     # Nouveaux inputs pour les seuils hebdomadaires par rôle
     seuil_hebdo_cuisine = st.number_input("Seuil Cuisine (heures/semaine)", 
-                                          min_value=30.0, max_value=50.0, value=42.0, step=0.5,
+                                          min_value=30.0, max_value=50.0, step=0.5, key="param_seuil_hebdo_cuisine",
                                           help="Seuil hebdomadaire pour déclencher les heures supplémentaires en Cuisine.")
     seuil_hebdo_salle = st.number_input("Seuil Salle (heures/semaine)", 
-                                        min_value=30.0, max_value=50.0, value=39.0, step=0.5,
+                                        min_value=30.0, max_value=50.0, step=0.5, key="param_seuil_hebdo_salle",
                                         help="Seuil hebdomadaire pour déclencher les heures supplémentaires en Salle.")
     
     # Calcul approximatif des seuils mensuels pour info
@@ -43,48 +115,141 @@ with st.sidebar:
     st.header("Autres Paramètres")
 
     # Garder le filtre par mois
-    months_fr = ["Janvier", "Février", "Mars", "Avril", "Mai", "Juin", 
-                "Juillet", "Août", "Septembre", "Octobre", "Novembre", "Décembre"]
-    mois_choisi = st.selectbox("Filtrer par mois", options=months_fr, index=datetime.now().month-1)
+    mois_choisi = st.selectbox("Filtrer par mois", options=months_fr, key="param_mois")
     mois_num = months_fr.index(mois_choisi) + 1
     
     # Garder la marge d'alerte
     marge_alerte = st.slider("Marge d'alerte (heures avant quota)", 
-                           min_value=1, max_value=20, value=10,
+                           min_value=1, max_value=20, key="param_marge_alerte",
                            help="Affiche une alerte orange quand l'employé approche de son quota spécifique (heures restantes)")
     
-    montrer_toutes_donnees = st.checkbox("Montrer toutes les données si aucune donnée pour le mois sélectionné", value=False)
+    montrer_toutes_donnees = st.checkbox("Montrer toutes les données si aucune donnée pour le mois sélectionné",
+                                         key="param_montrer_toutes_donnees")
+    apercu_rapide = st.checkbox("Aperçu rapide des nouveaux fichiers", value=True,
+                                help="Affiche la période, les jours et les premiers employés dès les premières lignes lues, "
+                                     "avant l'analyse complète (toujours confiée au pool de processus partagé).")
+
+    with st.expander("Détection d'anomalies"):
+        seuil_journee_longue = st.number_input("Journée anormale au-delà de (heures)",
+                                               min_value=6.0, max_value=24.0, step=0.5, key="param_seuil_journee_longue")
+        seuil_intervalle_court = st.number_input("Intervalle suspect en dessous de (minutes)",
+                                                 min_value=0, max_value=120, step=5, key="param_seuil_intervalle_court")
+
+# Préchargement du dernier fichier connu (une seule fois par processus, si activé)
+lancer_prechargement()
 
 uploaded_file = st.file_uploader("Choisissez un fichier Excel (.xls, .xlsx)", type=["xls", "xlsx"])
 
-onglet = st.text_input("Nom de l'onglet (ex: 'Enregistrement ')", value="Enregistrement ")
+ONGLET_DEFAUT = "Enregistrement "
+onglet = ONGLET_DEFAUT
+
+if uploaded_file is not None or session_restauree is not None:
+    if uploaded_file is not None:
+        donnees_fichier = uploaded_file.getvalue()
+        cle_fichier = empreinte_octets(donnees_fichier)
+        nom_fichier = uploaded_file.name
+    else:
+        # Session restaurée : données de l'instantané, sans fichier Excel ni analyse
+        donnees_fichier = None
+        meta_restauree = session_restauree['meta']
+        cle_fichier, onglet, nom_fichier = meta_restauree['cle_fichier'], meta_restauree['onglet'], meta_restauree['nom_fichier']
+        st.info(f"📂 Session restaurée : {nom_fichier}, onglet « {onglet.strip()} » (instantané du {session_restauree['cree_le']})")
+    
+    if donnees_fichier is not None:
+        # Découverte des onglets de pointage (premières lignes de chaque onglet seulement)
+        try:
+            onglets_detectes = cache.obtenir_ou_calculer(
+                ("onglets", cle_fichier),
+                lambda: utils.decouvrir_onglets(donnees_fichier)
+            )
+        except Exception:
+            onglets_detectes = []
+        if onglets_detectes:
+            infos_onglets = {o['onglet']: o for o in onglets_detectes}
+            def decrire_onglet(nom):
+                infos = infos_onglets[nom]
+                if infos['pointage']:
+                    return f"{nom.strip()} ✅ (période {infos['periode']}, {infos['nb_jours']} jours)"
+                return f"{nom.strip()} (aucun pointage détecté)"
+            options_onglets = list(infos_onglets)
+            onglet = st.selectbox(
+                "Onglet de pointage",
+                options=options_onglets,
+                index=options_onglets.index(ONGLET_DEFAUT) if ONGLET_DEFAUT in infos_onglets and not onglets_detectes[0]['pointage'] else 0,
+                format_func=decrire_onglet,
+                help="Les onglets contenant une période et une ligne des jours sont proposés en premier."
+            )
+            if not onglets_detectes[0]['pointage']:
+                st.warning("Aucun onglet de pointage n'a été reconnu automatiquement : vérifiez l'onglet choisi.")
+        else:
+            onglet = st.text_input("Nom de l'onglet (ex: 'Enregistrement ')", value=ONGLET_DEFAUT)
 
-if uploaded_file is not None:
     try:
         # Calculer les seuils mensuels réels ici, une fois qu'on a les paramètres
         SEUIL_MENSUEL_CUISINE = seuil_hebdo_cuisine * 4.33
         SEUIL_MENSUEL_SALLE = seuil_hebdo_salle * 4.33
         SEUIL_DEFAUT_MOYEN = (SEUIL_MENSUEL_CUISINE + SEUIL_MENSUEL_SALLE) / 2
         
+        # Aperçu d'un fichier pas encore analysé : seules les premières lignes sont lues dans
+        # la session, l'analyse complète passe ensuite par le pool (voir obtenir_analyse)
+        lecture = None
+        if donnees_fichier is not None and apercu_rapide and not analyse_disponible(cle_fichier, onglet):
+            lecture = utils.LecturePointages(donnees_fichier, onglet)
+            try:
+                apercu = lecture.apercu()
+            except ValueError as e:
+                st.error(f"L'onglet « {onglet.strip()} » ne semble pas être un onglet de pointage : {e}")
+                st.stop()
+            with st.expander("👀 Aperçu rapide du fichier", expanded=True):
+                jours_apercu = apercu['jours']
+                st.markdown(f"**Période détectée :** {apercu['periode']} • **{len(jours_apercu)} jours** en colonnes "
+                            f"(du {jours_apercu[0]} au {jours_apercu[-1]})")
+                if not apercu['employes'].empty:
+                    echantillon = apercu['employes'].pivot_table(
+                        index=['emp_id', 'name', 'department'], columns='date', values='hours_worked', aggfunc='sum'
+                    )
+                    echantillon.columns = pd.to_datetime(echantillon.columns).strftime('%d/%m')
+                    st.caption(f"{apercu['nb_blocs']} premiers employés ({apercu['nb_lignes_lues']} lignes lues)")
+                    st.dataframe(echantillon, use_container_width=True)
+            if apercu['mois'] and mois_num not in apercu['mois'] and not montrer_toutes_donnees:
+                st.warning(f"⚠️ La période du fichier ({apercu['periode']}) ne couvre pas le mois de {mois_choisi}.")
+                st.info("Choisissez le mois du fichier dans la barre latérale, ou activez l'option 'Montrer toutes les données'.")
+                st.stop()
+        
         with st.spinner('Analyse du fichier en cours...'):
-            resultat_df = traiter_fichier(uploaded_file, onglet)
+            # Le résultat est partagé entre sessions : ne jamais le modifier sans copie
+            try:
+                if donnees_fichier is None:
+                    resultat_df = session_restauree['tables']['jours']
+                else:
+                    resultat_df = obtenir_analyse(donnees_fichier, onglet, cle_fichier, st.session_state.id_session, lecture)
+            except DelaiDepasse:
+                st.error("L'analyse du fichier a pris trop de temps (serveur chargé). Réessayez dans quelques instants.")
+                st.stop()
+            except executeur.FileAnalysesPleine as e:
+                st.warning(f"{e}. Patientez jusqu'à la fin des analyses déjà lancées.")
+                st.stop()
+        if donnees_fichier is not None:
+            enregistrer_fichier(donnees_fichier, onglet, nom_fichier, cle_fichier)
+        
+        def lire_intervalles():
+            """Intervalles entrée–sortie, issus de la même analyse (ou du même instantané) que les données"""
+            if donnees_fichier is None:
+                return session_restauree['tables']['intervalles']
+            return obtenir_intervalles(donnees_fichier, onglet, cle_fichier, st.session_state.id_session)
         
         if not resultat_df.empty:
             st.success("Traitement terminé avec succès!")
             
-            # Conversion et filtrage par mois
-            resultat_df['date'] = pd.to_datetime(resultat_df['date'])
-            resultat_df['mois'] = resultat_df['date'].dt.month
-            
             # Filtrer par mois si spécifié
             filtered_df = resultat_df.copy()
             if mois_num:
-                filtered_df = resultat_df[resultat_df['mois'] == mois_num]
+                filtered_df = resultat_df[resultat_df['mois'] == mois_num].copy()
                 
             if filtered_df.empty:
                 if montrer_toutes_donnees:
                     st.warning(f"Aucune donnée disponible pour {mois_choisi}. Affichage de toutes les données.")
-                    filtered_df = resultat_df
+                    filtered_df = resultat_df.copy()
                 else:
                     st.warning(f"⚠️ Aucune donnée disponible pour le mois de {mois_choisi}.")
                     st.info("Pour voir toutes les données, activez l'option 'Montrer toutes les données' dans la barre latérale.")
@@ -98,6 +263,10 @@ if uploaded_file is not None:
                                 st.metric(label=f"Mois {i+1}", value=mois_nom)
                     st.stop()
             
+            # Registre des employés : rôle enregistré, heures de contrat et dates de validité
+            registre_employes = registre.charger_registre()
+            roles_registre = registre.roles_du_registre(registre_employes)
+            
             # --- Section pour assigner les rôles ---
             st.subheader("Assigner les rôles (Cuisine/Salle)")
             roles_updated = False
@@ -117,7 +286,10 @@ if uploaded_file is not None:
                         if st.session_state.employee_roles[emp_id] == "Salle":
                             default_role_index = 1
                     else:
-                        st.session_state.employee_roles[emp_id] = "Cuisine"
+                        # Rôle par défaut : celui du registre s'il est connu
+                        st.session_state.employee_roles[emp_id] = roles_registre.get(emp_id, "Cuisine")
+                        if st.session_state.employee_roles[emp_id] == "Salle":
+                            default_role_index = 1
                     with cols_roles[col_idx % 2]:
                         selected_role = st.selectbox(
                             f"Rôle pour {emp_name} (ID: {emp_id})",
@@ -137,18 +309,119 @@ if uploaded_file is not None:
             if roles_updated:
                  st.experimental_rerun()
             
-            # Appliquer les modifications manuelles aux données
-            def apply_manual_adjustments(df):
-                """Applique les modifications manuelles aux heures travaillées"""
-                df_adjusted = df.copy()
-                for key, new_hours in st.session_state.manual_adjustments.items():
-                    emp_id, date_str = key.split('|')
-                    mask = (df_adjusted['emp_id'] == emp_id) & (df_adjusted['date'].dt.strftime('%Y-%m-%d') == date_str)
-                    df_adjusted.loc[mask, 'hours_worked'] = new_hours
-                return df_adjusted
+            # --- Registre des employés (contrats individuels) ---
+            with st.expander("📇 Registre des employés (contrats)"):
+                st.markdown("*Heures de contrat hebdomadaires (temps partiel 24h, 35h...) et dates de validité. "
+                            "Sans heures de contrat, le seuil du rôle s'applique.*")
+                employes_fichier = filtered_df[['emp_id']].drop_duplicates()
+                nouveaux = employes_fichier[~employes_fichier['emp_id'].isin(registre_employes['emp_id'])]
+                registre_affiche = pd.concat([
+                    registre_employes,
+                    nouveaux.assign(role=nouveaux['emp_id'].map(st.session_state.employee_roles))
+                ], ignore_index=True)[registre.COLONNES_REGISTRE]
+                registre_edite = st.data_editor(
+                    registre_affiche,
+                    num_rows="dynamic",
+                    use_container_width=True,
+                    key="editeur_registre",
+                    column_config={
+                        'emp_id': st.column_config.TextColumn("ID Employé", required=True),
+                        'role': st.column_config.SelectboxColumn("Rôle", options=registre.ROLES_REGISTRE),
+                        'heures_contrat_hebdo': st.column_config.NumberColumn(
+                            "Heures contrat / semaine", min_value=0.0, max_value=60.0, step=0.5),
+                        'date_debut': st.column_config.DateColumn("Début de validité", format="DD/MM/YYYY"),
+                        'date_fin': st.column_config.DateColumn("Fin de validité", format="DD/MM/YYYY"),
+                        'site': st.column_config.TextColumn("Site"),
+                    }
+                )
+                if st.button("💾 Enregistrer le registre"):
+                    registre_employes = registre.enregistrer_registre(registre_edite)
+                    # Les rôles enregistrés remplacent ceux choisis dans cette session
+                    for emp_id, role in registre.roles_du_registre(registre_employes).items():
+                        st.session_state.employee_roles[emp_id] = role
+                        st.session_state.pop(f"role_{emp_id}", None)
+                    st.success("Registre enregistré.")
+                    st.experimental_rerun()
+            
+            # Identifiant de la version des données ajustées de cette session (clé de cache)
+            version_donnees = (
+                cle_fichier, onglet, mois_num, montrer_toutes_donnees,
+                tuple(sorted(st.session_state.employee_roles.items())),
+                tuple(sorted(st.session_state.manual_adjustments.items()))
+            )
             
-            # Appliquer les ajustements manuels
-            adjusted_df = apply_manual_adjustments(filtered_df)
+            # --- Données et agrégats sans modification : une seule copie partagée par les sessions ---
+            base_agregats = version_donnees[:-1]
+            partage = cache.obtenir_ou_calculer(
+                ("agregats", base_agregats),
+                lambda: {
+                    'donnees': filtered_df,
+                    # Positions des lignes de chaque journée (emp_id, date)
+                    'lignes': filtered_df.groupby(['emp_id', 'date']).indices,
+                    'cube': cube.CubeAgregats(filtered_df),
+                }
+            )
+            # La session ne garde que ses modifications : elle utilise les objets partagés tant
+            # qu'elle n'en a pas, puis une copie des seules heures (copie sur écriture) ;
+            # chaque modification ne met à jour que les lignes et l'employé concernés
+            etat_agregats = st.session_state.get('agregats')
+            if etat_agregats is None or etat_agregats['base'] != base_agregats:
+                etat_agregats = {
+                    'base': base_agregats,
+                    'donnees': partage['donnees'],
+                    'lignes': partage['lignes'],
+                    'cube': partage['cube'],
+                    'prive': False,
+                    'ajustements': {},
+                    'resume': None,
+                }
+                st.session_state.agregats = etat_agregats
+            ajustements_appliques = etat_agregats['ajustements']
+            modifications = [
+                key for key in set(ajustements_appliques) | set(st.session_state.manual_adjustments)
+                if ajustements_appliques.get(key) != st.session_state.manual_adjustments.get(key)
+            ]
+            if modifications and not etat_agregats['prive']:
+                donnees_session = etat_agregats['donnees'].copy(deep=False)
+                donnees_session['hours_worked'] = donnees_session['hours_worked'].to_numpy(copy=True)
+                etat_agregats['donnees'] = donnees_session
+                etat_agregats['cube'] = etat_agregats['cube'].copie_modifiable()
+                etat_agregats['prive'] = True
+            adjusted_df = etat_agregats['donnees']
+            colonne_heures = adjusted_df.columns.get_loc('hours_worked')
+            for key in modifications:
+                nouvelle_valeur = st.session_state.manual_adjustments.get(key)
+                emp_id, date_str = key.split('|')
+                lignes = etat_agregats['lignes'].get((emp_id, pd.Timestamp(date_str)))
+                if lignes is not None:
+                    adjusted_df.iloc[lignes, colonne_heures] = (
+                        partage['donnees']['hours_worked'].to_numpy()[lignes] if nouvelle_valeur is None else nouvelle_valeur
+                    )
+                ecarts = etat_agregats['cube'].appliquer_ajustement(emp_id, date_str, nouvelle_valeur)
+                if etat_agregats['resume'] is not None:
+                    etat_agregats['resume'].appliquer_ecarts(date_str, ecarts)
+            etat_agregats['ajustements'] = dict(st.session_state.manual_adjustments)
+            agregats = etat_agregats['cube']
+            
+            # Seuils de chaque employé (contrat du registre, sinon rôle) sur toute la période,
+            # mois par mois ; ceux du dernier mois servent à la prévision de fin de mois
+            dates_periode = adjusted_df['date']
+            debut_periode = dates_periode.min().replace(day=1)
+            fin_periode = dates_periode.max() + pd.offsets.MonthEnd(0)
+            seuils_hebdo_roles = {"Cuisine": seuil_hebdo_cuisine, "Salle": seuil_hebdo_salle}
+            seuils_employes = registre.resoudre_seuils(
+                agregats.employe.reset_index(), registre_employes, seuils_hebdo_roles,
+                (seuil_hebdo_cuisine + seuil_hebdo_salle) / 2, debut_periode, fin_periode
+            )
+            nb_mois_periode = len(registre.decouper_en_mois(debut_periode, fin_periode))
+            if nb_mois_periode > 1:
+                seuils_fin_mois = registre.resoudre_seuils(
+                    agregats.employe.reset_index(), registre_employes, seuils_hebdo_roles,
+                    (seuil_hebdo_cuisine + seuil_hebdo_salle) / 2, fin_periode.replace(day=1), fin_periode
+                )
+            else:
+                seuils_fin_mois = seuils_employes
+            version_registre = empreinte_dataframe(registre_employes)
             
             # --- Section d'édition manuelle des heures ---
             st.subheader("🔧 Édition manuelle des heures")
@@ -174,6 +447,15 @@ if uploaded_file is not None:
                     if not emp_data.empty:
                         st.write(f"**Heures actuelles pour {emp_data.iloc[0]['name']}:**")
                         
+                        def enregistrer_modification(key, heures_origine):
+                            """Enregistre (ou retire) la modification saisie, avant la réexécution de la page"""
+                            nouvelles_heures = st.session_state[f"edit_{key}"]
+                            # Tolérance pour les erreurs de virgule flottante
+                            if abs(nouvelles_heures - heures_origine) > 0.01:
+                                st.session_state.manual_adjustments[key] = nouvelles_heures
+                            else:
+                                st.session_state.manual_adjustments.pop(key, None)
+                        
                         # Créer une interface d'édition pour chaque jour
                         cols = st.columns(3)
                         col_idx = 0
@@ -194,25 +476,33 @@ if uploaded_file is not None:
                                     value=float(current_value),
                                     step=0.25,
                                     key=f"edit_{key}",
-                                    help=f"Heures originales: {row['hours_worked']:.2f}h"
+                                    help=f"Heures originales: {row['hours_worked']:.2f}h",
+                                    # Enregistrée avant la réexécution : résumé et statuts à jour aussitôt
+                                    on_change=enregistrer_modification,
+                                    args=(key, row['hours_worked'])
                                 )
                                 
-                                # Sauvegarder la modification si différente de l'original
-                                if abs(new_hours - row['hours_worked']) > 0.01:  # Tolérance pour les erreurs de virgule flottante
-                                    st.session_state.manual_adjustments[key] = new_hours
+                                if key in st.session_state.manual_adjustments:
                                     st.success(f"✓ Modifié")
-                                elif key in st.session_state.manual_adjustments and abs(new_hours - row['hours_worked']) <= 0.01:
-                                    # Restaurer à la valeur originale
-                                    del st.session_state.manual_adjustments[key]
                                 
                             col_idx += 1
                         
+                        # Total par semaine (avec modifications) depuis les agrégats
+                        if selected_emp_id in agregats.employe_semaine.index.get_level_values('emp_id'):
+                            semaines = agregats.employe_semaine.loc[selected_emp_id].reset_index()
+                            semaines['semaine'] = semaines['semaine'].dt.strftime('%d/%m/%Y')
+                            st.dataframe(
+                                semaines.rename(columns={'semaine': 'Semaine du', 'heures': 'Heures', 'nb_jours': 'Jours'}),
+                                use_container_width=True
+                            )
+                        
                         # Bouton pour réinitialiser toutes les modifications de cet employé
                         if st.button(f"Réinitialiser toutes les heures de {emp_data.iloc[0]['name']}", key=f"reset_{selected_emp_id}"):
                             keys_to_remove = [k for k in st.session_state.manual_adjustments.keys() 
                                             if k.startswith(f"{selected_emp_id}|")]
                             for k in keys_to_remove:
                                 del st.session_state.manual_adjustments[k]
+                                st.session_state.pop(f"edit_{k}", None)
                             st.experimental_rerun()
                 
                 # Afficher le résumé des modifications
@@ -221,11 +511,11 @@ if uploaded_file is not None:
                     modifications_data = []
                     for key, new_hours in st.session_state.manual_adjustments.items():
                         emp_id, date_str = key.split('|')
-                        emp_name = filtered_df[filtered_df['emp_id'] == emp_id]['name'].iloc[0]
-                        original_hours = filtered_df[
-                            (filtered_df['emp_id'] == emp_id) & 
-                            (filtered_df['date'].dt.strftime('%Y-%m-%d') == date_str)
-                        ]['hours_worked'].iloc[0]
+                        lignes = etat_agregats['lignes'].get((emp_id, pd.Timestamp(date_str)))
+                        if lignes is None:
+                            continue
+                        emp_name = filtered_df['name'].iat[lignes[0]]
+                        original_hours = filtered_df['hours_worked'].iat[lignes[0]]
                         
                         modifications_data.append({
                             'Employé': emp_name,
@@ -239,99 +529,252 @@ if uploaded_file is not None:
                         st.dataframe(pd.DataFrame(modifications_data), use_container_width=True)
                         
                         if st.button("🗑️ Réinitialiser toutes les modifications"):
+                            for k in st.session_state.manual_adjustments:
+                                st.session_state.pop(f"edit_{k}", None)
                             st.session_state.manual_adjustments = {}
                             st.experimental_rerun()
             
             # --- Affichage des données journalières (avec modifications) ---
             st.subheader(f"Aperçu des heures calculées - {mois_choisi}")
             
-            # Ajouter une colonne pour indiquer les modifications
-            display_df = adjusted_df.copy()
-            display_df['Modifié'] = False
-            for key in st.session_state.manual_adjustments.keys():
-                emp_id, date_str = key.split('|')
-                mask = (display_df['emp_id'] == emp_id) & (display_df['date'].dt.strftime('%Y-%m-%d') == date_str)
-                display_df.loc[mask, 'Modifié'] = True
+            # Drapeaux d'anomalies calculés sur toute la table (journées longues, pointages
+            # impairs ou illisibles, intervalles très courts, doublons supprimés)
+            anomalies_df = anomalies.detecter_anomalies(adjusted_df, {
+                'heures_max_jour': seuil_journee_longue,
+                'intervalle_min_minutes': seuil_intervalle_court,
+            })
             
-            # Appliquer un style conditionnel pour les valeurs > 12h
-            def highlight_aberrant_hours(val):
-                """Style pour mettre en rouge les heures > 12"""
-                if isinstance(val, (int, float)) and val > 12:
-                    return 'background-color: #ffcccc; color: red; font-weight: bold'
-                return ''
+            # Index de la table (filtres, tris), reconstruit seulement quand les données changent
+            etat_apercu = st.session_state.get('apercu')
+            if etat_apercu is None or etat_apercu['version'] != version_donnees:
+                display_df = adjusted_df[['emp_id', 'name', 'department', 'date', 'hours_worked', 'Role']].copy()
+                # Colonne indiquant les journées modifiées à la main
+                cles_modifiees = [tuple(key.split('|')) for key in st.session_state.manual_adjustments]
+                display_df['Modifié'] = pd.MultiIndex.from_arrays(
+                    [display_df['emp_id'], display_df['date'].dt.strftime('%Y-%m-%d')]
+                ).isin(cles_modifiees)
+                etat_apercu = {
+                    'version': version_donnees,
+                    'index': pagination.IndexTable(display_df, ['emp_id', 'department', 'Role', 'Modifié']),
+                }
+                st.session_state.apercu = etat_apercu
+            index_apercu = etat_apercu['index']
+            noms_employes = dict(zip(adjusted_df['emp_id'], adjusted_df['name']))
             
-            # Créer un dataframe stylé
-            styled_df = display_df[['emp_id', 'name', 'department', 'date', 'hours_worked', 'Role', 'Modifié']].style.applymap(highlight_aberrant_hours, subset=['hours_worked'])
+            with st.expander("Filtres et tri", expanded=False):
+                col_f1, col_f2, col_f3 = st.columns(3)
+                with col_f1:
+                    filtre_employes = st.multiselect(
+                        "Employés", options=index_apercu.valeurs('emp_id'),
+                        format_func=lambda e: f"{noms_employes.get(e, e)} ({e})"
+                    )
+                    filtre_modifie = st.selectbox("Modifications", options=["Toutes les journées", "Modifiées", "Non modifiées"])
+                with col_f2:
+                    filtre_departements = st.multiselect("Départements", options=index_apercu.valeurs('department'))
+                    filtre_roles = st.multiselect("Rôles", options=index_apercu.valeurs('Role'))
+                with col_f3:
+                    premiere_date, derniere_date = index_apercu.bornes_dates()
+                    periode_apercu = st.date_input(
+                        "Période", value=(premiere_date.date(), derniere_date.date()),
+                        min_value=premiere_date.date(), max_value=derniere_date.date()
+                    )
+                    colonnes_tri = {'date': "Date", 'emp_id': "ID Employé", 'name': "Nom",
+                                    'department': "Département", 'hours_worked': "Heures", 'Role': "Rôle"}
+                    tri_apercu = st.selectbox("Trier par", options=[None] + list(colonnes_tri),
+                                              format_func=lambda c: "Ordre du fichier" if c is None else colonnes_tri[c])
+                    tri_croissant = st.checkbox("Ordre croissant", value=True)
             
+            # Période partielle (une seule date choisie) : pas de borne de fin
+            periode_apercu = tuple(periode_apercu) if isinstance(periode_apercu, (list, tuple)) else (periode_apercu,)
+            positions_apercu = index_apercu.selectionner(
+                {
+                    'emp_id': filtre_employes,
+                    'department': filtre_departements,
+                    'Role': filtre_roles,
+                    'Modifié': {"Modifiées": [True], "Non modifiées": [False]}.get(filtre_modifie),
+                },
+                date_debut=periode_apercu[0] if periode_apercu else None,
+                date_fin=periode_apercu[1] if len(periode_apercu) > 1 else None,
+                tri=tri_apercu,
+                croissant=tri_croissant
+            )
+            
+            col_taille, col_page = st.columns(2)
+            with col_taille:
+                taille_page = st.selectbox("Lignes par page", options=[25, 50, 100, 250], index=1)
+            nb_pages = max(1, -(-len(positions_apercu) // taille_page))
+            with col_page:
+                numero_page = st.number_input(f"Page (sur {nb_pages})", min_value=1, max_value=nb_pages, value=1, step=1)
+            page_apercu = index_apercu.page(positions_apercu, numero_page, taille_page)
+            debut_page = (numero_page - 1) * taille_page
+            st.caption(f"Lignes {debut_page + 1 if len(page_apercu) else 0}–{debut_page + len(page_apercu)} "
+                       f"sur {len(positions_apercu)} (table complète: {index_apercu.nb_lignes} lignes)")
+            
+            # Style calculé et envoyé pour la seule page visible
+            styled_df = anomalies.styler_anomalies(page_apercu.style, anomalies_df)
             st.dataframe(styled_df, use_container_width=True)
             
-            # --- Préparation du CSV (avec données ajustées) ---
-            csv = adjusted_df.to_csv(index=False)
-            st.download_button(
-                label=f"Télécharger le CSV - {mois_choisi}",
-                data=csv,
-                file_name=f"heures_journalieres_{mois_choisi.lower()}.csv",
-                mime="text/csv"
+            # --- Anomalies de pointage ---
+            st.subheader("🚩 Anomalies de pointage")
+            regles_choisies = st.multiselect(
+                "Types d'anomalies à afficher",
+                options=list(anomalies.REGLES_ANOMALIES),
+                default=list(anomalies.REGLES_ANOMALIES),
+                format_func=lambda code: anomalies.REGLES_ANOMALIES[code]
             )
+            table_anomalies = anomalies.table_anomalies(anomalies_df, regles_choisies)
+            if table_anomalies.empty:
+                st.success("Aucune anomalie détectée pour ces critères.")
+            else:
+                st.caption(f"{len(table_anomalies)} anomalies sur {table_anomalies['emp_id'].nunique()} employés")
+                st.dataframe(table_anomalies, use_container_width=True)
             
             # --- Résumé par employé (avec données ajustées) ---
             st.subheader(f"Résumé par employé - {mois_choisi}")
-            resume = adjusted_df.groupby(['emp_id', 'name', 'department', 'Role'])['hours_worked'].agg(['sum', 'mean', 'count']).reset_index()
-            resume.columns = ['ID Employé', 'Nom', 'Département', 'Role', 'Heures Totales', 'Moyenne Quotidienne', 'Jours Travaillés']
-            
-            # Définir le seuil individuel basé sur le rôle et les SEUILS MENSUELS calculés
-            def get_seuil(role):
-                if role == "Cuisine":
-                    return SEUIL_MENSUEL_CUISINE
-                elif role == "Salle":
-                    return SEUIL_MENSUEL_SALLE
-                else:
-                    # Utiliser la moyenne des seuils comme fallback pour "Non Assigné"
-                    return SEUIL_DEFAUT_MOYEN 
+            # Seuil individuel : contrat du registre s'il existe, sinon rôle et SEUILS MENSUELS calculés
+            # (la moyenne des seuils sert de fallback pour "Non Assigné").
+            # Le résumé est construit une fois par jeu de paramètres, puis chaque modification
+            # manuelle ne met à jour que la ligne de l'employé concerné (voir plus haut).
+            cle_resume = ("resume", version_donnees, version_registre, seuil_hebdo_cuisine, seuil_hebdo_salle, marge_alerte)
+            parametres_resume = cle_resume[2:]
+            if etat_agregats['resume'] is None or etat_agregats.get('parametres_resume') != parametres_resume:
+                etat_agregats['resume'] = resume_incremental.ResumeIncremental(
+                    agregats,
+                    {"Cuisine": SEUIL_MENSUEL_CUISINE * nb_mois_periode, "Salle": SEUIL_MENSUEL_SALLE * nb_mois_periode},
+                    SEUIL_DEFAUT_MOYEN * nb_mois_periode,
+                    marge_alerte,
+                    seuils_employes['Seuil Individuel'],
+                    seuils_employes['Seuil Hebdo']
+                )
+                etat_agregats['parametres_resume'] = parametres_resume
+            suivi_resume = etat_agregats['resume']
+            resume = suivi_resume.resume
+            nb_contrats = int(seuils_employes['Contrat'].sum())
+            if nb_contrats:
+                st.caption(f"{nb_contrats} employé(s) avec un seuil issu de leur contrat (registre).")
             
-            resume['Seuil Individuel'] = resume['Role'].apply(get_seuil)
+            # Afficher le résumé mis à jour (inchangé)
+            st.dataframe(resume[['ID Employé', 'Nom', 'Département', 'Role', 'Heures Totales', 'Seuil Individuel', 'Heures Supp', 'Heures Restantes', 'Statut', 'Moyenne Quotidienne', 'Jours Travaillés']
+                                + [c for c in ['Heures Nuit', 'Heures Dimanche', 'Heures Férié'] if c in resume.columns]])
             
-            # Calculs basés sur le seuil individuel (inchangés)
-            resume['Heures Supp'] = resume.apply(lambda x: max(0, x['Heures Totales'] - x['Seuil Individuel']), axis=1)
-            resume['Heures Restantes'] = resume.apply(lambda x: max(0, x['Seuil Individuel'] - x['Heures Totales']), axis=1)
-            resume['Statut'] = resume.apply(
-                lambda x: determiner_statut(x['Heures Totales'], x['Seuil Individuel'], marge_alerte), 
-                axis=1
-            )
+            # --- Simulation de seuils : comparer des politiques sans recalculer les totaux ---
+            with st.expander("🧪 Simulation de seuils (scénarios)"):
+                st.markdown("*Compare des combinaisons de seuils hebdomadaires et de marges d'alerte. "
+                            "Les employés sous contrat (registre) gardent leur seuil individuel.*")
+                with st.form("form_simulation"):
+                    col_sim1, col_sim2 = st.columns(2)
+                    with col_sim1:
+                        plage_cuisine = st.slider("Seuils Cuisine (h/semaine)", 30.0, 50.0, (38.0, 44.0), step=0.5)
+                        plage_salle = st.slider("Seuils Salle (h/semaine)", 30.0, 50.0, (35.0, 41.0), step=0.5)
+                    with col_sim2:
+                        pas_simulation = st.number_input("Pas (heures)", min_value=0.5, max_value=5.0, value=1.0, step=0.5)
+                        marges_simulation = st.multiselect("Marges d'alerte (heures)", options=list(range(1, 21)),
+                                                           default=sorted({5, int(marge_alerte), 15}))
+                    lancer_simulation = st.form_submit_button("Comparer les scénarios")
+                if lancer_simulation:
+                    st.session_state.simulation_demandee = True
+                if st.session_state.get('simulation_demandee') and marges_simulation:
+                    # Totaux triés une fois par version des données (puis partagés via le cache)
+                    simulateur = cache.obtenir_ou_calculer(
+                        ("simulation", version_donnees, version_registre),
+                        lambda: simulation.SimulateurSeuils(
+                            agregats.totaux_employes(),
+                            seuils_employes.loc[seuils_employes['Contrat'], 'Seuil Individuel']
+                        )
+                    )
+                    grille = simulation.grille_scenarios(
+                        {
+                            "Cuisine": np.arange(plage_cuisine[0], plage_cuisine[1] + 1e-9, pas_simulation),
+                            "Salle": np.arange(plage_salle[0], plage_salle[1] + 1e-9, pas_simulation),
+                        },
+                        marges_simulation,
+                        # Seuils des rôles sur toute la période, comme ceux des contrats
+                        semaines_par_mois=4.33 * nb_mois_periode
+                    )
+                    scenarios = simulateur.comparer(grille)
+                    scenarios['Actuel'] = (
+                        np.isclose(scenarios['Cuisine (h/sem)'], seuil_hebdo_cuisine)
+                        & np.isclose(scenarios['Salle (h/sem)'], seuil_hebdo_salle)
+                        & (scenarios['marge'] == marge_alerte)
+                    )
+                    st.caption(f"{len(scenarios)} scénarios comparés pour {simulateur.nb_employes} employés.")
+                    st.dataframe(
+                        scenarios[['Cuisine (h/sem)', 'Salle (h/sem)', 'marge', 'Heures Supp',
+                                   'Dépassement', 'Alerte', 'Normal', 'Actuel']]
+                        .rename(columns={'marge': "Marge d'alerte"})
+                        .sort_values('Heures Supp'),
+                        use_container_width=True, hide_index=True
+                    )
             
-            # Afficher le résumé mis à jour (inchangé)
-            st.dataframe(resume[['ID Employé', 'Nom', 'Département', 'Role', 'Heures Totales', 'Seuil Individuel', 'Heures Supp', 'Heures Restantes', 'Statut', 'Moyenne Quotidienne', 'Jours Travaillés']])
+            # --- Export (généré uniquement sur demande, puis mis en cache) ---
+            col_format, col_export = st.columns(2)
+            with col_format:
+                format_export = st.selectbox(
+                    "Format d'export",
+                    options=list(export.FORMATS_EXPORT),
+                    format_func=lambda f: export.FORMATS_EXPORT[f]['libelle']
+                )
+            with col_export:
+                if st.button("Préparer l'export"):
+                    st.session_state.export_demande = format_export
+                if st.session_state.get('export_demande') == format_export:
+                    infos_format = export.FORMATS_EXPORT[format_export]
+                    if format_export in ('paie_employe', 'paie_departement'):
+                        donnees_export = export.preparer_classeur_paie(
+                            resume, adjusted_df, format_export.split('_', 1)[1], cle_resume
+                        )
+                        nom_export = f"paie_{mois_choisi.lower()}_{format_export.split('_', 1)[1]}.{infos_format['extension']}"
+                    elif format_export == 'resume':
+                        donnees_export = export.preparer_export(resume, format_export, cle_resume)
+                        nom_export = f"resume_heures_{mois_choisi.lower()}.{infos_format['extension']}"
+                    else:
+                        donnees_export = export.preparer_export(
+                            adjusted_df, format_export, version_donnees, export.COLONNES_EXPORT_JOURNALIER
+                        )
+                        nom_export = f"heures_journalieres_{mois_choisi.lower()}.{infos_format['extension']}"
+                    # L'export est lu depuis son fichier temporaire au moment de l'envoi
+                    with donnees_export.ouvrir() as fichier_export:
+                        st.download_button(
+                            label=f"Télécharger - {mois_choisi}",
+                            data=fichier_export,
+                            file_name=nom_export,
+                            mime=infos_format['mime']
+                        )
+            
+            # --- Instantané de la session : données analysées, rôles, modifications et paramètres ---
+            with st.expander("💾 Enregistrer la session (instantané)"):
+                st.markdown("*Fichier compact à recharger plus tard depuis la barre latérale : "
+                            "la session reprend sans le fichier Excel ni nouvelle analyse.*")
+                if st.button("Préparer l'instantané"):
+                    donnees_instantane = instantane.ecrire_instantane(
+                        {'jours': resultat_df, 'intervalles': lire_intervalles()},
+                        {
+                            'roles': dict(st.session_state.employee_roles),
+                            'ajustements': dict(st.session_state.manual_adjustments),
+                            'parametres': {nom: st.session_state[f"param_{nom}"] for nom in PARAMETRES_DEFAUT},
+                        },
+                        {'cle_fichier': cle_fichier, 'onglet': onglet, 'nom_fichier': nom_fichier}
+                    )
+                    st.caption(f"Instantané: {len(donnees_instantane) / 1024:.0f} Ko")
+                    st.download_button(
+                        label="Télécharger l'instantané",
+                        data=donnees_instantane,
+                        file_name=f"{nom_fichier.rsplit('.', 1)[0]}_{mois_choisi.lower()}.{instantane.EXTENSION}",
+                        mime="application/octet-stream"
+                    )
             
             # --- Affichage des statuts visuels ---
             st.subheader("Statut des heures supplémentaires")
             statut_df = resume.sort_values('Heures Totales', ascending=False)
             # Appel inchangé, la fonction utilise maintenant les données du df
-            afficher_statut_employes(statut_df)
+            visualisation.afficher_statut_employes(statut_df)
             
             # --- Analyse du rythme hebdomadaire ---
             st.subheader("📈 Analyse du rythme hebdomadaire (derniers jours)")
             st.markdown("*Projection basée sur le rythme des derniers jours travaillés*")
             
-            # Fonction pour obtenir le seuil hebdo selon le rôle
-            def get_seuil_hebdo(role):
-                if role == "Cuisine":
-                    return seuil_hebdo_cuisine
-                elif role == "Salle":
-                    return seuil_hebdo_salle
-                else:
-                    return (seuil_hebdo_cuisine + seuil_hebdo_salle) / 2
-            
-            # Analyser chaque employé
-            rythme_analyses = []
-            for _, emp_resume in resume.iterrows():
-                emp_id = emp_resume['ID Employé']
-                emp_data = adjusted_df[adjusted_df['emp_id'] == emp_id]
-                seuil_hebdo = get_seuil_hebdo(emp_resume['Role'])
-                
-                analyse = analyser_rythme_hebdomadaire(emp_data, seuil_hebdo, emp_resume['Role'])
-                if analyse:
-                    analyse['nom'] = emp_resume['Nom']
-                    rythme_analyses.append(analyse)
+            # Rythme de chaque employé (seuil hebdo du contrat ou du rôle), tenu à jour avec le résumé
+            rythme_analyses = suivi_resume.rythmes()
             
             if rythme_analyses:
                 # Trier par statut (risque en premier)
@@ -381,105 +824,31 @@ if uploaded_file is not None:
             else:
                 st.info("Pas assez de données pour analyser le rythme hebdomadaire (minimum 3 jours requis).")
             
+            # --- Prévision de fin de mois ---
+            st.subheader("🔮 Prévision de fin de mois")
+            st.markdown("*Projection selon les heures déjà faites, les jours restants du mois et le profil de chaque employé par jour de la semaine*")
+            prevision_df = prevision.prevoir_fin_de_mois(
+                adjusted_df,
+                seuils_fin_mois['Seuil Individuel'],
+                SEUIL_DEFAUT_MOYEN
+            )
+            nb_depassements_prevus = int((prevision_df['statut_prevision'] == prevision.STATUT_PREVU).sum())
+            if nb_depassements_prevus:
+                st.warning(f"⚠️ {nb_depassements_prevus} employé(s) devraient dépasser leur seuil avant la fin du mois.")
+            st.dataframe(
+                prevision_df.rename(columns={
+                    'emp_id': 'ID Employé', 'name': 'Nom', 'heures_a_date': 'Heures à date',
+                    'jours_restants': 'Jours restants', 'projection_fin_mois': 'Projection fin de mois',
+                    'seuil': 'Seuil Individuel', 'heures_supp_prevues': 'Heures Supp prévues',
+                    'date_depassement': 'Date de dépassement', 'statut_prevision': 'Prévision'
+                }),
+                use_container_width=True
+            )
+            
             # Bouton pour imprimer le statut des employés
             if st.button("🖨️ Imprimer les statuts des employés", key="print_status"):
-                # Générer le contenu HTML à imprimer directement avec les données
-                html_content = f"""
-                <html>
-                <head>
-                    <title>Statut des Employés</title>
-                    <style>
-                        body {{ font-family: Arial, sans-serif; margin: 15px; }}
-                        .header {{ text-align: center; margin-bottom: 20px; }}
-                        .header h1 {{ font-size: 1.5em; margin: 10px 0; }}
-                        .header p {{ font-size: 0.9em; margin: 5px 0; }}
-                        .status-grid {{ 
-                            display: grid; 
-                            grid-template-columns: repeat(auto-fit, minmax(200px, 1fr)); 
-                            gap: 10px; 
-                            max-height: 70vh;
-                            overflow: hidden;
-                        }}
-                        .status-item {{ 
-                            border: 2px solid; 
-                            padding: 8px; 
-                            border-radius: 6px; 
-                            font-size: 0.85em;
-                            margin-bottom: 0;
-                        }}
-                        .status-item p {{ margin: 3px 0; line-height: 1.2; }}
-                        .legend {{ margin-top: 15px; text-align: center; }}
-                        .legend-items {{ display: flex; justify-content: center; gap: 20px; font-weight: bold; font-size: 0.9em; }}
-                        @media print {{ 
-                            body {{ margin: 10px; font-size: 12px; }} 
-                            .header h1 {{ font-size: 1.3em; }}
-                            .status-grid {{ 
-                                grid-template-columns: repeat(auto-fit, minmax(180px, 1fr));
-                                gap: 8px;
-                                page-break-inside: avoid;
-                            }}
-                            .status-item {{ 
-                                padding: 6px; 
-                                font-size: 0.8em;
-                                break-inside: avoid;
-                            }}
-                            .legend {{ margin-top: 10px; }}
-                        }}
-                    </style>
-                </head>
-                <body>
-                    <div class="header">
-                        <h1>Statut des heures supplémentaires</h1>
-                        <p>Généré le {datetime.now().strftime('%d/%m/%Y à %H:%M')} - Mois: {mois_choisi}</p>
-                    </div>
-                    <div class="status-grid">
-                """
-                
-                # Ajouter chaque employé avec son statut
-                for index, row in statut_df.iterrows():
-                    statut = row['Statut']
-                    couleurs = {
-                        "Normal": "#4CAF50",
-                        "Alerte": "#FFA500", 
-                        "Dépassement": "#FF5733"
-                    }
-                    icones = {
-                        "Normal": "🟢",
-                        "Alerte": "🟠",
-                        "Dépassement": "🔴"
-                    }
-                    
-                    couleur = couleurs.get(statut, "#FFFFFF")
-                    icone = icones.get(statut, "")
-                    
-                    html_content += f"""
-                        <div class="status-item" style="border-color: {couleur};">
-                            <p style="font-weight: bold; margin-bottom: 8px;">{icone} {row['Nom']}</p>
-                            <p style="margin-bottom: 5px;">{row['Heures Totales']:.1f}h / {row['Seuil Individuel']:.1f}h</p>
-                            <p style="margin-bottom: 0px;">{row['Heures Restantes']:.1f}h restantes</p>
-                            <p style="margin-bottom: 0px; font-size: 0.9em; color: #666;">Rôle: {row['Role']}</p>
-                        </div>
-                    """
-                
-                html_content += """
-                    </div>
-                    <div class="legend">
-                        <div class="legend-items">
-                            <div>🟢 Normal</div>
-                            <div>🟠 Proche du quota</div>
-                            <div>🔴 Dépassement</div>
-                        </div>
-                    </div>
-                    <script>
-                        window.onload = function() {
-                            setTimeout(function() {
-                                window.print();
-                            }, 100);
-                        }
-                    </script>
-                </body>
-                </html>
-                """
+                # Rapport HTML généré une fois par version des données puis repris du cache
+                html_content = export.generer_rapport_impression(statut_df, mois_choisi, cle_resume)
                 
                 # Créer un bouton de téléchargement HTML pour l'impression
                 st.download_button(
@@ -508,7 +877,7 @@ if uploaded_file is not None:
             
             # --- Graphiques --- 
             st.subheader("Visualisations")
-            tab1, tab2, tab3 = st.tabs(["Heures totales par employé", "Heures par département", "Tendance journalière"])
+            tab1, tab2, tab3, tab4 = st.tabs(["Heures totales par employé", "Heures par département", "Tendance journalière", "Couverture"])
             
             # Utiliser la moyenne des seuils pour la ligne de référence globale des graphiques
             seuil_ref_graphiques = SEUIL_DEFAUT_MOYEN
@@ -518,14 +887,20 @@ if uploaded_file is not None:
             with tab1:
                 st.subheader(f"Heures totales travaillées par employé - {mois_choisi}")
                 
-                # Filtrer les données ajustées par rôle
-                df_cuisine_adj = adjusted_df[adjusted_df['Role'] == 'Cuisine']
-                df_salle_adj = adjusted_df[adjusted_df['Role'] == 'Salle']
+                # Heures par rôle sur le mois, lues dans les agrégats
+                heures_par_role = agregats.role_mois.groupby(level='Role')['heures'].sum()
+                cols_roles_mois = st.columns(max(len(heures_par_role), 1))
+                for col, (role, heures) in zip(cols_roles_mois, heures_par_role.items()):
+                    with col:
+                        st.metric(label=f"Heures {role}", value=f"{heures:.1f}h")
+                roles_presents = set(heures_par_role.index)
                 
                 # Créer et afficher le graphique pour la Cuisine
-                if not df_cuisine_adj.empty:
+                if 'Cuisine' in roles_presents:
                     st.subheader("👨‍🍳 Employés Cuisine")
-                    chart_cuisine = creer_graphique_heures_par_employe(df_cuisine_adj, SEUIL_MENSUEL_CUISINE, "Cuisine")
+                    chart_cuisine = visualisation.creer_graphique_heures_par_employe(
+                        None, SEUIL_MENSUEL_CUISINE * nb_mois_periode, "Cuisine", cube=agregats,
+                        seuils_employes=seuils_employes['Seuil Individuel'])
                     st.altair_chart(chart_cuisine, use_container_width=True)
                 else:
                     st.info("Aucune donnée pour les employés de Cuisine ce mois-ci.")
@@ -533,9 +908,11 @@ if uploaded_file is not None:
                 st.divider()
                 
                 # Créer et afficher le graphique pour la Salle
-                if not df_salle_adj.empty:
+                if 'Salle' in roles_presents:
                     st.subheader("💁 Employés Salle")
-                    chart_salle = creer_graphique_heures_par_employe(df_salle_adj, SEUIL_MENSUEL_SALLE, "Salle")
+                    chart_salle = visualisation.creer_graphique_heures_par_employe(
+                        None, SEUIL_MENSUEL_SALLE * nb_mois_periode, "Salle", cube=agregats,
+                        seuils_employes=seuils_employes['Seuil Individuel'])
                     st.altair_chart(chart_salle, use_container_width=True)
                 else:
                     st.info("Aucune donnée pour les employés de Salle ce mois-ci.")
@@ -543,7 +920,7 @@ if uploaded_file is not None:
             with tab2:
                 st.subheader(f"Heures travaillées par département - {mois_choisi}")
                 # Passer la moyenne des seuils comme référence visuelle avec données ajustées
-                chart1, chart_combo, pie = creer_graphiques_par_departement(adjusted_df, seuil_ref_graphiques)
+                chart1, chart_combo, pie = visualisation.creer_graphiques_par_departement(adjusted_df, seuil_ref_graphiques, cube=agregats)
                 st.altair_chart(chart1, use_container_width=True)
                 st.altair_chart(chart_combo, use_container_width=True)
                 st.altair_chart(pie, use_container_width=True)
@@ -551,9 +928,43 @@ if uploaded_file is not None:
             with tab3:
                 st.subheader(f"Tendance des heures travaillées par jour - {mois_choisi}")
                 # Passer la moyenne journalière indicative comme référence avec données ajustées
-                chart, heatmap = creer_graphiques_tendance_journaliere(adjusted_df, heures_jour_ref)
+                chart, heatmap = visualisation.creer_graphiques_tendance_journaliere(adjusted_df, heures_jour_ref, cube=agregats)
                 st.altair_chart(chart, use_container_width=True)
                 st.altair_chart(heatmap, use_container_width=True)
+            
+            with tab4:
+                st.subheader(f"Couverture des effectifs - {mois_choisi}")
+                st.markdown("*Nombre moyen de personnes présentes par heure, d'après les pointages d'entrée et de sortie "
+                            "(les modifications manuelles d'heures n'y figurent pas)*")
+                
+                def calculer_couverture():
+                    # Intervalles produits par la même analyse que les données journalières
+                    intervalles = lire_intervalles()
+                    intervalles = intervalles[intervalles['date'].isin(filtered_df['date'].unique())]
+                    departements = dict(zip(filtered_df['emp_id'], filtered_df['department']))
+                    intervalles = intervalles.assign(
+                        department=intervalles['emp_id'].map(departements),
+                        Role=intervalles['emp_id'].map(st.session_state.employee_roles).fillna("Non Assigné")
+                    )
+                    return couverture.courbe_couverture(intervalles, ['department', 'Role'])
+                
+                # Courbe calculée une fois par fichier, mois et rôles (partagée via le cache)
+                courbe_couverture = cache.obtenir_ou_calculer(("couverture", base_agregats), calculer_couverture)
+                dimensions_couverture = {None: "Tous les employés", 'department': "Département", 'Role': "Rôle"}
+                col_c1, col_c2 = st.columns(2)
+                with col_c1:
+                    dimension_couverture = st.selectbox("Regrouper par", options=list(dimensions_couverture),
+                                                        format_func=dimensions_couverture.get)
+                titre_couverture = "Effectif présent par jour et par heure"
+                if dimension_couverture is not None:
+                    with col_c2:
+                        valeur_couverture = st.selectbox(dimensions_couverture[dimension_couverture],
+                                                         options=sorted(courbe_couverture[dimension_couverture].unique()))
+                    courbe_couverture = courbe_couverture[courbe_couverture[dimension_couverture] == valeur_couverture]
+                    titre_couverture += f" - {valeur_couverture}"
+                profil_couverture = couverture.profil_hebdomadaire(courbe_couverture)
+                st.altair_chart(visualisation.creer_heatmap_couverture(profil_couverture, titre_couverture),
+                                use_container_width=True)
         else:
             st.warning("Aucune donnée trouvée dans le fichier.")
     
@@ -571,12 +982,19 @@ with st.expander("À propos de l'application"):
     
     **Comment utiliser l'application:**
     1. Téléchargez votre fichier Excel de pointage.
-    2. Vérifiez ou modifiez le nom de l'onglet si nécessaire.
+    2. Vérifiez l'onglet de pointage détecté automatiquement (ou choisissez-en un autre).
     3. **Ajustez les seuils hebdomadaires pour la Cuisine et la Salle dans la barre latérale.**
     4. Définissez la marge d'alerte.
-    5. **Assignez le rôle (Cuisine/Salle) à chaque employé dans la section dédiée.**
+    5. **Assignez le rôle (Cuisine/Salle) à chaque employé dans la section dédiée**, et renseignez les heures de contrat des temps partiels dans le registre des employés.
     6. **Modifiez manuellement les heures si nécessaire** (pour corriger les problèmes de pointeuse après minuit).
     7. L'application calculera les heures travaillées et le statut des heures supplémentaires basé sur le rôle et les seuils définis.
     8. Visualisez les résumés, statuts et graphiques (incluant les modifications manuelles).
-    9. Téléchargez le résultat détaillé au format CSV.
-    """) 
\ No newline at end of file
+    9. Téléchargez le résultat détaillé (CSV, Parquet, JSON lines) ou le résumé seul.
+    """) 
+
+    stats_cache = cache.statistiques()
+    st.caption(
+        f"Cache serveur : {stats_cache['entrees']} entrées, "
+        f"{stats_cache['taille_octets'] / 1024 / 1024:.1f} / {stats_cache['budget_octets'] / 1024 / 1024:.0f} Mo • "
+        f"{stats_cache['hits']} hits / {stats_cache['misses']} misses"
+    )
\ No newline at end of file
@@ -0,0 +1,205 @@
+import hashlib
+import os
+import sys
+import threading
+import types
+from collections import OrderedDict
+
+# Budget mémoire global du cache (en Mo), partagé par toutes les sessions du serveur
+BUDGET_MEMOIRE_MO = float(os.environ.get("HEURES_CACHE_BUDGET_MO", "512"))
+
+
+def empreinte_octets(donnees):
+    """
+    Calcule l'empreinte SHA-256 d'un contenu binaire (fichier téléversé).
+    """
+    return hashlib.sha256(donnees).hexdigest()
+
+
+def empreinte_dataframe(df):
+    """
+    Calcule une empreinte stable du contenu d'un DataFrame (valeurs et colonnes).
+    """
+    import pandas as pd
+
+    h = hashlib.sha256()
+    h.update("|".join(map(str, df.columns)).encode("utf-8"))
+    if not df.empty:
+        h.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return h.hexdigest()
+
+
+def taille_objet(obj, _vus=None):
+    """
+    Estime la taille mémoire d'un objet mis en cache (en octets).
+
+    Les DataFrames, Series, index et tableaux numpy sont mesurés par leur contenu ; les
+    conteneurs et les attributs des autres objets (`__dict__`, `__slots__`) sont parcourus,
+    chaque objet n'étant compté qu'une fois. Un objet peut aussi donner sa propre taille
+    par une méthode `taille_memoire()`.
+    """
+    _vus = set() if _vus is None else _vus
+    if id(obj) in _vus:
+        return 0
+    _vus.add(id(obj))
+
+    if hasattr(type(obj), "taille_memoire"):
+        return int(obj.taille_memoire())
+    # pandas et numpy ne sont importés que s'ils sont déjà chargés : inutile de les charger pour mesurer
+    pd = sys.modules.get("pandas")
+    if pd is not None:
+        if isinstance(obj, pd.DataFrame):
+            return int(obj.memory_usage(index=True, deep=True).sum())
+        if isinstance(obj, (pd.Series, pd.Index)):
+            return int(obj.memory_usage(deep=True))
+    np = sys.modules.get("numpy")
+    if np is not None and isinstance(obj, np.ndarray):
+        if obj.dtype == object:
+            return obj.nbytes + sum(taille_objet(v, _vus) for v in obj.ravel())
+        return obj.nbytes
+    if isinstance(obj, (bytes, bytearray, str, int, float, bool, type(None))):
+        return sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(taille_objet(k, _vus) + taille_objet(v, _vus) for k, v in obj.items())
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return sys.getsizeof(obj) + sum(taille_objet(v, _vus) for v in obj)
+    if isinstance(obj, (type, types.ModuleType, types.FunctionType, types.MethodType)):
+        return sys.getsizeof(obj)
+    # Autres objets (agrégats, simulateurs...) : leurs attributs
+    taille = sys.getsizeof(obj)
+    if hasattr(obj, "__dict__"):
+        taille += taille_objet(vars(obj), _vus)
+    for nom in getattr(type(obj), "__slots__", ()):
+        if hasattr(obj, nom):
+            taille += taille_objet(getattr(obj, nom), _vus)
+    return taille
+
+
+class CachePartage:
+    """
+    Cache LRU partagé par toutes les sessions du processus.
+
+    Les valeurs stockées (DataFrames analysés, agrégats dérivés) sont partagées
+    en lecture seule : un appelant qui veut les modifier doit d'abord en faire une copie.
+    Quand le budget mémoire est dépassé, les entrées les moins récemment utilisées
+    sont évincées.
+    """
+
+    def __init__(self, budget_octets):
+        self.budget_octets = int(budget_octets)
+        self._entrees = OrderedDict()  # cle -> (valeur, taille)
+        self._en_cours = {}  # cle -> threading.Event, pour ne calculer qu'une fois une même clé
+        self._verrou = threading.Lock()
+        self.taille_totale = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __contains__(self, cle):
+        with self._verrou:
+            return cle in self._entrees
+
+    def obtenir(self, cle, defaut=None):
+        """Renvoie la valeur associée à la clé (et la marque comme récente), ou `defaut`."""
+        with self._verrou:
+            if cle in self._entrees:
+                self._entrees.move_to_end(cle)
+                self.hits += 1
+                return self._entrees[cle][0]
+            self.misses += 1
+            return defaut
+
+    def stocker(self, cle, valeur):
+        """Ajoute ou remplace une entrée, puis évince selon le budget mémoire."""
+        taille = taille_objet(valeur)
+        with self._verrou:
+            if cle in self._entrees:
+                self.taille_totale -= self._entrees.pop(cle)[1]
+            if taille > self.budget_octets:
+                # Trop volumineux pour être partagé : on ne le garde pas
+                return valeur
+            self._entrees[cle] = (valeur, taille)
+            self.taille_totale += taille
+            while self.taille_totale > self.budget_octets and self._entrees:
+                _, (_, taille_evincee) = self._entrees.popitem(last=False)
+                self.taille_totale -= taille_evincee
+                self.evictions += 1
+        return valeur
+
+    def obtenir_ou_calculer(self, cle, fonction):
+        """
+        Renvoie la valeur en cache pour `cle`, ou la calcule avec `fonction()` et la stocke.
+
+        Si plusieurs sessions demandent la même clé en même temps, une seule la calcule
+        et les autres attendent son résultat.
+        """
+        while True:
+            with self._verrou:
+                if cle in self._entrees:
+                    self._entrees.move_to_end(cle)
+                    self.hits += 1
+                    return self._entrees[cle][0]
+                evenement = self._en_cours.get(cle)
+                if evenement is None:
+                    self.misses += 1
+                    evenement = threading.Event()
+                    self._en_cours[cle] = evenement
+                    calculateur = True
+                else:
+                    calculateur = False
+            if not calculateur:
+                evenement.wait()
+                with self._verrou:
+                    if cle in self._entrees:
+                        self._entrees.move_to_end(cle)
+                        self.hits += 1
+                        return self._entrees[cle][0]
+                # Le calcul a échoué ou la valeur a été évincée : on recommence
+                continue
+            try:
+                return self.stocker(cle, fonction())
+            finally:
+                with self._verrou:
+                    self._en_cours.pop(cle, None)
+                evenement.set()
+
+    def invalider(self, predicat):
+        """Supprime les entrées dont la clé vérifie `predicat(cle)`."""
+        with self._verrou:
+            for cle in [c for c in self._entrees if predicat(c)]:
+                self.taille_totale -= self._entrees.pop(cle)[1]
+
+    def vider(self):
+        """Supprime toutes les entrées (les compteurs sont conservés)."""
+        with self._verrou:
+            self._entrees.clear()
+            self.taille_totale = 0
+
+    def statistiques(self):
+        """Renvoie l'état du cache : taille, budget, nombre d'entrées, hits/misses."""
+        with self._verrou:
+            total = self.hits + self.misses
+            return {
+                'entrees': len(self._entrees),
+                'taille_octets': self.taille_totale,
+                'budget_octets': self.budget_octets,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'taux_hits': self.hits / total if total else 0.0,
+            }
+
+
+_cache = None
+_verrou_cache = threading.Lock()
+
+
+def obtenir_cache():
+    """
+    Renvoie le cache partagé du processus (créé au premier appel).
+    """
+    global _cache
+    with _verrou_cache:
+        if _cache is None:
+            _cache = CachePartage(BUDGET_MEMOIRE_MO * 1024 * 1024)
+        return _cache
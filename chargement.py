@@ -0,0 +1,248 @@
+import importlib
+import io
+import json
+import os
+import subprocess
+import sys
+import threading
+import types
+from datetime import datetime
+
+from cache_partage import obtenir_cache, empreinte_octets
+
+# Dossier local où sont conservés les fichiers téléversés (désactivé si vide)
+DOSSIER_DONNEES = os.environ.get("HEURES_DOSSIER_DONNEES", "")
+# Précharger au démarrage le dernier fichier du dossier local dans le cache
+PRECHARGEMENT = os.environ.get("HEURES_PRECHARGEMENT", "0") == "1"
+# Budget de temps d'import des modules chargés avant tout téléversement (en ms)
+BUDGET_IMPORT_MS = float(os.environ.get("HEURES_BUDGET_IMPORT_MS", "600"))
+
+# Modules importés dès l'affichage de la page, et modules qui doivent rester paresseux
+MODULES_DEMARRAGE = ["streamlit", "cache_partage", "chargement"]
+MODULES_PARESSEUX = ["pandas", "altair", "utils", "visualisation", "export", "anomalies", "prevision", "cube", "registre", "majorations", "executeur", "pagination", "simulation", "couverture", "resume_incremental", "instantane"]
+
+
+class ModuleParesseux(types.ModuleType):
+    """
+    Module importé seulement au premier accès à l'un de ses attributs.
+    """
+
+    def __init__(self, nom):
+        super().__init__(nom)
+        self._nom_reel = nom
+        self._module = None
+
+    def _charger(self):
+        if self._module is None:
+            self._module = importlib.import_module(self._nom_reel)
+        return self._module
+
+    def __getattr__(self, attribut):
+        return getattr(self._charger(), attribut)
+
+    def __dir__(self):
+        return dir(self._charger())
+
+
+def module_paresseux(nom):
+    """
+    Renvoie le module s'il est déjà importé, sinon un proxy qui l'importera à la demande.
+    """
+    if nom in sys.modules:
+        return sys.modules[nom]
+    return ModuleParesseux(nom)
+
+
+def charger_donnees(donnees, nom_onglet, lecture=None):
+    """
+    Analyse le contenu d'un fichier Excel et prépare les colonnes de date.
+
+    Args:
+        lecture (utils.LecturePointages): Lecture déjà commencée (aperçu), poursuivie sans
+                                          relire le fichier (analyse dans le thread courant)
+
+    Returns:
+        tuple: (jours, intervalles), voir utils.analyser_fichier
+    """
+    import pandas as pd
+    from utils import LecturePointages
+
+    lecture = lecture or LecturePointages(io.BytesIO(donnees), nom_onglet)
+    df, intervalles = lecture.terminer()
+    if not df.empty:
+        df['date'] = pd.to_datetime(df['date'])
+        df['mois'] = df['date'].dt.month
+    return df, intervalles
+
+
+def analyse_disponible(cle_fichier, nom_onglet):
+    """
+    Indique si l'analyse d'un fichier est déjà dans le cache partagé.
+    """
+    return ("analyse", cle_fichier, nom_onglet) in obtenir_cache()
+
+
+def _obtenir_analyse_complete(donnees, nom_onglet, cle_fichier, session, lecture):
+    cle_fichier = cle_fichier or empreinte_octets(donnees)
+
+    def _calculer():
+        from executeur import obtenir_executeur
+
+        executeur = obtenir_executeur()
+        if executeur is None:
+            return charger_donnees(donnees, nom_onglet, lecture)
+        if lecture is not None:
+            # L'aperçu n'a lu que les premières lignes : l'analyse complète part au pool
+            lecture.fermer()
+        return executeur.analyser(donnees, nom_onglet, session or "anonyme", (cle_fichier, nom_onglet))
+
+    return obtenir_cache().obtenir_ou_calculer(("analyse", cle_fichier, nom_onglet), _calculer)
+
+
+def obtenir_analyse(donnees, nom_onglet, cle_fichier=None, session=None, lecture=None):
+    """
+    Renvoie l'analyse d'un fichier depuis le cache partagé, en la calculant si besoin.
+
+    Le calcul est confié au pool de processus d'analyse (voir executeur.py), dans la file
+    de la session appelante, y compris après un aperçu (`lecture`, alors abandonnée).
+    Il a lieu dans le thread courant si le pool est désactivé ; une lecture déjà commencée
+    pour un aperçu est alors poursuivie sans relire le fichier.
+    Le DataFrame renvoyé est partagé entre sessions : ne jamais le modifier sans copie.
+    """
+    return _obtenir_analyse_complete(donnees, nom_onglet, cle_fichier, session, lecture)[0]
+
+
+def obtenir_intervalles(donnees, nom_onglet, cle_fichier=None, session=None):
+    """
+    Renvoie les intervalles entrée–sortie d'un fichier (une ligne par couple de pointages).
+
+    Ils sont produits par la même analyse que obtenir_analyse et partagés de la même façon.
+    """
+    return _obtenir_analyse_complete(donnees, nom_onglet, cle_fichier, session, None)[1]
+
+
+def enregistrer_fichier(donnees, nom_onglet, nom_fichier, cle_fichier=None):
+    """
+    Conserve un fichier téléversé dans le dossier local (si configuré) pour le préchargement.
+    """
+    if not DOSSIER_DONNEES:
+        return None
+    cle_fichier = cle_fichier or empreinte_octets(donnees)
+    os.makedirs(DOSSIER_DONNEES, exist_ok=True)
+    chemin = os.path.join(DOSSIER_DONNEES, f"{cle_fichier}.bin")
+    if not os.path.exists(chemin):
+        with open(chemin, "wb") as f:
+            f.write(donnees)
+    # Les métadonnées sont réécrites à chaque fois : leur date sert à trouver le plus récent
+    with open(os.path.join(DOSSIER_DONNEES, f"{cle_fichier}.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            'onglet': nom_onglet,
+            'nom_fichier': nom_fichier,
+            'enregistre_le': datetime.now().isoformat(timespec='seconds'),
+        }, f, ensure_ascii=False)
+    return chemin
+
+
+def dernier_fichier():
+    """
+    Renvoie (contenu, onglet, clé) du fichier le plus récemment utilisé du dossier local, ou None.
+    """
+    if not DOSSIER_DONNEES or not os.path.isdir(DOSSIER_DONNEES):
+        return None
+    metas = [os.path.join(DOSSIER_DONNEES, f) for f in os.listdir(DOSSIER_DONNEES) if f.endswith(".json")]
+    if not metas:
+        return None
+    meta_recente = max(metas, key=os.path.getmtime)
+    cle_fichier = os.path.basename(meta_recente)[:-len(".json")]
+    chemin = os.path.join(DOSSIER_DONNEES, f"{cle_fichier}.bin")
+    if not os.path.exists(chemin):
+        return None
+    with open(meta_recente, encoding="utf-8") as f:
+        meta = json.load(f)
+    with open(chemin, "rb") as f:
+        return f.read(), meta['onglet'], cle_fichier
+
+
+_prechargement_lance = False
+_verrou_prechargement = threading.Lock()
+
+
+def lancer_prechargement():
+    """
+    Précharge en arrière-plan le fichier le plus récent du dossier local dans le cache.
+
+    N'agit qu'une fois par processus et seulement si HEURES_PRECHARGEMENT=1 ;
+    la page reste utilisable pendant le préchargement.
+    """
+    global _prechargement_lance
+    with _verrou_prechargement:
+        if _prechargement_lance or not PRECHARGEMENT:
+            return None
+        _prechargement_lance = True
+
+    def _precharger():
+        fichier = dernier_fichier()
+        if fichier is None:
+            return
+        donnees, nom_onglet, cle_fichier = fichier
+        try:
+            # Importer aussi la pile graphique pendant que personne n'attend
+            importlib.import_module("visualisation")
+            obtenir_analyse(donnees, nom_onglet, cle_fichier, session="prechargement")
+        except Exception as e:
+            print(f"Préchargement impossible: {e}", file=sys.stderr)
+
+    thread = threading.Thread(target=_precharger, name="prechargement", daemon=True)
+    thread.start()
+    return thread
+
+
+def mesurer_imports(modules=None):
+    """
+    Mesure, dans un interpréteur neuf, le temps d'import des modules de démarrage.
+
+    Returns:
+        dict: 'durees_ms' (par module), 'total_ms', et 'charges' (modules paresseux
+              qui se retrouvent importés malgré tout)
+    """
+    modules = modules or MODULES_DEMARRAGE
+    code = (
+        "import json, sys, time\n"
+        f"modules = {modules!r}\n"
+        f"paresseux = {MODULES_PARESSEUX!r}\n"
+        "durees = {}\n"
+        "for m in modules:\n"
+        "    t = time.perf_counter()\n"
+        "    __import__(m)\n"
+        "    durees[m] = (time.perf_counter() - t) * 1000\n"
+        "print(json.dumps({'durees_ms': durees, 'total_ms': sum(durees.values()),\n"
+        "                  'charges': [m for m in paresseux if m in sys.modules]}))\n"
+    )
+    sortie = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True, text=True, check=True
+    )
+    return json.loads(sortie.stdout.strip().splitlines()[-1])
+
+
+def verifier_budget_import(budget_ms=BUDGET_IMPORT_MS):
+    """
+    Vérifie que les imports de démarrage tiennent dans le budget et restent paresseux.
+
+    Returns:
+        tuple: (ok, mesures)
+    """
+    mesures = mesurer_imports()
+    ok = mesures['total_ms'] <= budget_ms and not mesures['charges']
+    return ok, mesures
+
+
+if __name__ == "__main__":
+    ok, mesures = verifier_budget_import()
+    for module, duree in mesures['durees_ms'].items():
+        print(f"{module:<20} {duree:8.1f} ms")
+    print(f"{'total':<20} {mesures['total_ms']:8.1f} ms (budget: {BUDGET_IMPORT_MS:.0f} ms)")
+    if mesures['charges']:
+        print(f"Modules importés trop tôt: {', '.join(mesures['charges'])}")
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+
+# Durée d'un créneau de la courbe de couverture (en minutes, diviseur de 24h)
+PAS_CRENEAU_MINUTES = 30
+
+JOURS_SEMAINE = ["Lundi", "Mardi", "Mercredi", "Jeudi", "Vendredi", "Samedi", "Dimanche"]
+
+MINUTE_NS = 60 * 10**9
+MINUTES_JOUR = 24 * 60
+
+
+def _presence_cumulee(debuts, fins, instants):
+    """
+    Balayage des extrémités triées : pour chaque instant t, renvoie le nombre de présents
+    en t et le temps de présence cumulé (personnes × minutes) jusqu'à t.
+
+    Avec les entrées s et les sorties e triées, les présents en t sont #{s <= t} - #{e <= t}
+    et la présence cumulée est Σ (t - s)+ - Σ (t - e)+, obtenue par sommes préfixes.
+    """
+    debuts = np.sort(debuts)
+    fins = np.sort(fins)
+    cumul_debuts = np.concatenate([[0.0], np.cumsum(debuts)])
+    cumul_fins = np.concatenate([[0.0], np.cumsum(fins)])
+    k = np.searchsorted(debuts, instants, side='right')
+    j = np.searchsorted(fins, instants, side='right')
+    presents = k - j
+    cumul = (k * instants - cumul_debuts[k]) - (j * instants - cumul_fins[j])
+    return presents, cumul
+
+
+def courbe_couverture(intervalles, par=None, pas_minutes=PAS_CRENEAU_MINUTES):
+    """
+    Calcule l'effectif présent par créneau horaire à partir des intervalles de présence.
+
+    Le calcul balaye les entrées et sorties triées de chaque groupe (recherche dichotomique
+    des bornes de créneaux), sans boucle sur les créneaux ni sur les intervalles.
+
+    Args:
+        intervalles (pd.DataFrame): Colonnes 'date' (jour du pointage d'entrée), 'debut' et
+                                    'fin' (minutes depuis minuit de ce jour), voir
+                                    utils.table_intervalles, et les colonnes de `par`
+        par (list): Colonnes de regroupement (ex: ['department', 'Role'])
+        pas_minutes (int): Durée d'un créneau
+
+    Returns:
+        pd.DataFrame: Colonnes de `par`, 'creneau' (début du créneau), 'effectif_moyen'
+                      (personnes présentes en moyenne sur le créneau) et 'effectif_debut'
+                      (personnes présentes au début du créneau)
+    """
+    par = list(par or [])
+    colonnes = par + ['creneau', 'effectif_moyen', 'effectif_debut']
+    if intervalles.empty:
+        return pd.DataFrame(columns=colonnes)
+
+    # Instants absolus en minutes, créneaux couvrant les journées entières de la période
+    jours = pd.DatetimeIndex(intervalles['date']).normalize().asi8 // MINUTE_NS
+    debuts = jours + intervalles['debut'].to_numpy(dtype=float)
+    fins = jours + intervalles['fin'].to_numpy(dtype=float)
+    premier = np.floor(debuts.min() / MINUTES_JOUR) * MINUTES_JOUR
+    dernier = np.ceil(fins.max() / MINUTES_JOUR) * MINUTES_JOUR
+    bornes = np.arange(premier, dernier + pas_minutes, pas_minutes)
+    creneaux = pd.to_datetime(bornes[:-1].astype('int64') * MINUTE_NS)
+
+    groupes = intervalles.groupby(par, sort=True).indices if par else {(): np.arange(len(intervalles))}
+    resultats = []
+    for cle, positions in groupes.items():
+        presents, cumul = _presence_cumulee(debuts[positions], fins[positions], bornes)
+        groupe = pd.DataFrame({
+            'creneau': creneaux,
+            'effectif_moyen': np.diff(cumul) / pas_minutes,
+            'effectif_debut': presents[:-1],
+        })
+        for colonne, valeur in zip(par, cle if isinstance(cle, tuple) else (cle,)):
+            groupe[colonne] = valeur
+        resultats.append(groupe)
+    return pd.concat(resultats, ignore_index=True)[colonnes]
+
+
+def profil_hebdomadaire(couverture, par=None):
+    """
+    Ramène la courbe de couverture à une semaine type (jour de la semaine × heure).
+
+    Args:
+        couverture (pd.DataFrame): Résultat de courbe_couverture
+        par (list): Colonnes de regroupement à conserver (les autres groupes sont additionnés)
+
+    Returns:
+        pd.DataFrame: Colonnes de `par`, 'jour_semaine' (0 = lundi), 'jour' (libellé), 'heure',
+                      'effectif_moyen' (moyenne sur les jours de la période) et 'effectif_max'
+                      (plus fort effectif observé en début de créneau)
+    """
+    par = list(par or [])
+    colonnes = par + ['jour_semaine', 'jour', 'heure', 'effectif_moyen', 'effectif_max']
+    if couverture.empty:
+        return pd.DataFrame(columns=colonnes)
+    # Groupes retirés : les effectifs s'additionnent créneau par créneau
+    par_creneau = couverture.groupby(par + ['creneau'], sort=False)[['effectif_moyen', 'effectif_debut']].sum().reset_index()
+    creneaux = pd.DatetimeIndex(par_creneau['creneau'])
+    par_creneau['jour_semaine'] = creneaux.dayofweek
+    par_creneau['heure'] = creneaux.hour
+    # Chaque jour de la période a tous ses créneaux : la moyenne des créneaux d'une même
+    # heure et d'un même jour de la semaine est la moyenne sur les jours de la période
+    profil = par_creneau.groupby(par + ['jour_semaine', 'heure']).agg(
+        effectif_moyen=('effectif_moyen', 'mean'), effectif_max=('effectif_debut', 'max')
+    ).reset_index()
+    profil['effectif_moyen'] = profil['effectif_moyen'].round(2)
+    profil['jour'] = profil['jour_semaine'].map(dict(enumerate(JOURS_SEMAINE)))
+    return profil[colonnes]
@@ -0,0 +1,131 @@
+import copy
+
+import pandas as pd
+
+from majorations import COLONNES_MAJOREES
+
+
+class CubeAgregats:
+    """
+    Agrégats précalculés une fois par version des données, partagés par le résumé et les graphiques.
+
+    Tables disponibles (sommes d'heures 'heures', nombre de lignes 'nb', comptes distincts 'nb_employes') :
+        employe_jour        (emp_id, date)        + name, department, Role
+        employe_semaine     (emp_id, semaine)     heures, nb_jours
+        employe             (emp_id, name, department, Role)  + heures majorées (nuit, dimanche, férié)
+        departement_jour    (department, date)
+        departement         (department)
+        role_mois           (Role, mois)
+        jour                (date)
+
+    Une modification manuelle d'une journée met à jour uniquement les lignes concernées
+    de chaque table (voir appliquer_ajustement), sur une copie obtenue par copie_modifiable
+    quand le cube est partagé entre sessions.
+    """
+
+    # Tables dont la colonne 'heures' change avec les modifications manuelles
+    TABLES = ('employe_jour', 'employe_semaine', 'employe', 'departement_jour', 'departement', 'role_mois', 'jour')
+
+    def __init__(self, df):
+        """
+        Args:
+            df (pd.DataFrame): Données journalières avec 'emp_id', 'name', 'department',
+                               'Role', 'date' (datetime) et 'hours_worked' (et les colonnes
+                               d'heures majorées si elles sont présentes)
+        """
+        self.colonnes_majorees = [c for c in COLONNES_MAJOREES if c in df.columns]
+        base = df[['emp_id', 'name', 'department', 'Role', 'date', 'hours_worked'] + self.colonnes_majorees]
+        groupes = base.groupby(['emp_id', 'date', 'name', 'department', 'Role'], sort=True)
+        ej = groupes['hours_worked'].agg(heures='sum', nb='count')
+        if self.colonnes_majorees:
+            ej = ej.join(groupes[self.colonnes_majorees].sum())
+        ej = ej.reset_index()
+        ej['heures_origine'] = ej['heures']
+        ej['semaine'] = ej['date'].dt.to_period('W').dt.start_time
+        ej['mois'] = ej['date'].dt.to_period('M').dt.start_time
+
+        self.employe_semaine = (ej.groupby(['emp_id', 'semaine'])
+                                .agg(heures=('heures', 'sum'), nb_jours=('date', 'nunique')))
+        self.employe = (ej.groupby(['emp_id', 'name', 'department', 'Role'])
+                        .agg(heures=('heures', 'sum'), nb=('nb', 'sum'),
+                             **{c: (c, 'sum') for c in self.colonnes_majorees}))
+        self.departement_jour = (ej.groupby(['department', 'date'])
+                                 .agg(heures=('heures', 'sum'), nb=('nb', 'sum'), nb_employes=('name', 'nunique')))
+        self.departement = (ej.groupby('department')
+                            .agg(heures=('heures', 'sum'), nb=('nb', 'sum'), nb_employes=('name', 'nunique')))
+        self.role_mois = (ej.groupby(['Role', 'mois'])
+                          .agg(heures=('heures', 'sum'), nb=('nb', 'sum'), nb_employes=('emp_id', 'nunique')))
+        self.jour = ej.groupby('date').agg(heures=('heures', 'sum'), nb=('nb', 'sum'))
+
+        self.employe_jour = ej.set_index(['emp_id', 'date'])
+        # Position de chaque (emp_id, date) dans employe_jour, pour les mises à jour
+        self._positions = ej.groupby(['emp_id', 'date']).indices
+
+    def appliquer_ajustement(self, emp_id, date, nouvelles_heures):
+        """
+        Fixe les heures d'une journée (comme apply_manual_adjustments) et répercute l'écart
+        sur les seules lignes concernées des autres tables.
+
+        Args:
+            emp_id (str): Identifiant de l'employé
+            date (datetime-like): Jour modifié
+            nouvelles_heures (float | None): Heures par ligne ; None rétablit les heures d'origine
+
+        Returns:
+            dict: Écart appliqué par ligne du résumé (emp_id, name, department, Role) ;
+                  vide si la journée est inconnue
+        """
+        positions = self._positions.get((emp_id, pd.Timestamp(date)))
+        if positions is None:
+            return {}
+        ej = self.employe_jour
+        ecarts = {}
+        for pos in positions:
+            ligne = ej.iloc[pos]
+            if nouvelles_heures is None:
+                cible = ligne['heures_origine']
+            else:
+                cible = float(nouvelles_heures) * ligne['nb']
+            delta = cible - ligne['heures']
+            if delta == 0:
+                continue
+            ej.iat[pos, ej.columns.get_loc('heures')] = cible
+            self.employe_semaine.loc[(emp_id, ligne['semaine']), 'heures'] += delta
+            cle_employe = (emp_id, ligne['name'], ligne['department'], ligne['Role'])
+            self.employe.loc[cle_employe, 'heures'] += delta
+            self.departement_jour.loc[(ligne['department'], ligne.name[1]), 'heures'] += delta
+            self.departement.loc[ligne['department'], 'heures'] += delta
+            self.role_mois.loc[(ligne['Role'], ligne['mois']), 'heures'] += delta
+            self.jour.loc[ligne.name[1], 'heures'] += delta
+            ecarts[cle_employe] = ecarts.get(cle_employe, 0.0) + delta
+        return ecarts
+
+    def copie_modifiable(self):
+        """
+        Renvoie une copie du cube à laquelle appliquer des modifications, ce cube restant intact.
+
+        Seules les colonnes 'heures' sont copiées ; les autres colonnes et les positions
+        des journées restent partagées (copie sur écriture).
+        """
+        copie = copy.copy(self)
+        for nom in self.TABLES:
+            table = getattr(self, nom).copy(deep=False)
+            table['heures'] = table['heures'].to_numpy(copy=True)
+            setattr(copie, nom, table)
+        return copie
+
+    def totaux_employes(self):
+        """
+        Totaux par employé au format du résumé (voir utils.classer_resume).
+        """
+        totaux = self.employe.reset_index()
+        return pd.DataFrame({
+            'ID Employé': totaux['emp_id'],
+            'Nom': totaux['name'],
+            'Département': totaux['department'],
+            'Role': totaux['Role'],
+            'Heures Totales': totaux['heures'],
+            'Moyenne Quotidienne': totaux['heures'] / totaux['nb'],
+            'Jours Travaillés': totaux['nb'],
+            **{COLONNES_MAJOREES[c]: totaux[c] for c in self.colonnes_majorees},
+        })
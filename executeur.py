@@ -0,0 +1,222 @@
+import multiprocessing
+import os
+import sys
+import threading
+import types
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as DelaiDepasse
+from concurrent.futures.process import BrokenProcessPool
+
+# Nombre de processus d'analyse partagés par toutes les sessions (0 : analyse dans la session)
+NB_PROCESSUS = int(os.environ.get("HEURES_PROCESSUS_ANALYSE", str(min(4, os.cpu_count() or 1))))
+# Délai maximal d'attente d'une analyse, file d'attente comprise (en secondes)
+DELAI_ANALYSE = float(os.environ.get("HEURES_DELAI_ANALYSE_S", "300"))
+# Nombre maximal d'analyses en attente pour une même session
+MAX_PAR_SESSION = int(os.environ.get("HEURES_ANALYSES_PAR_SESSION", "4"))
+
+
+class FileAnalysesPleine(Exception):
+    """La session a déjà trop d'analyses en attente."""
+
+
+@contextmanager
+def _sans_script_principal():
+    # Avec "spawn", chaque nouveau processus réexécute le script principal (__main__) ;
+    # sous Streamlit, ce serait app.py. Un __main__ vide le temps du lancement l'évite :
+    # les processus n'ont besoin que de ce module.
+    principal = sys.modules.get("__main__")
+    sys.modules["__main__"] = types.ModuleType("__main__")
+    try:
+        yield
+    finally:
+        sys.modules["__main__"] = principal
+
+
+def _analyser(donnees, nom_onglet):
+    # Exécuté dans un processus du pool : import local pour garder le module léger
+    from chargement import charger_donnees
+
+    return charger_donnees(donnees, nom_onglet)
+
+
+class ExecuteurAnalyses:
+    """
+    Pool borné de processus d'analyse, partagé par toutes les sessions du serveur.
+
+    Chaque session a sa propre file d'attente ; dès qu'un processus se libère, les files
+    sont servies à tour de rôle, si bien qu'une session qui téléverse plusieurs gros
+    fichiers ne fait pas attendre les autres. Une même analyse (fichier, onglet) demandée
+    par plusieurs sessions n'est lancée qu'une fois.
+    """
+
+    def __init__(self, nb_processus=NB_PROCESSUS, max_par_session=MAX_PAR_SESSION):
+        self.nb_processus = max(1, int(nb_processus))
+        self.max_par_session = max_par_session
+        self._pool = None
+        self._files = OrderedDict()  # session -> deque de (cle, donnees, nom_onglet, futur)
+        self._futurs = {}  # cle -> Future, analyses en attente ou en cours
+        self._attentes = {}  # Future -> nombre d'appels à analyser() qui attendent son résultat
+        self._places = self.nb_processus
+        self._condition = threading.Condition()
+        self._distributeur = None
+        self._ferme = False
+
+    def soumettre(self, donnees, nom_onglet, session="anonyme", cle=None):
+        """
+        Place une analyse dans la file de la session.
+
+        Returns:
+            Future: Résultat de chargement.charger_donnees(donnees, nom_onglet) (jours, intervalles)
+        """
+        cle = cle if cle is not None else (id(donnees), nom_onglet)
+        with self._condition:
+            if self._ferme:
+                raise RuntimeError("Exécuteur d'analyses fermé")
+            futur = self._futurs.get(cle)
+            if futur is not None:
+                return futur
+            file = self._files.setdefault(session, deque())
+            if len(file) >= self.max_par_session:
+                raise FileAnalysesPleine(f"Trop d'analyses en attente pour cette session ({len(file)})")
+            futur = Future()
+            file.append((cle, donnees, nom_onglet, futur))
+            self._futurs[cle] = futur
+            if self._distributeur is None:
+                self._distributeur = threading.Thread(target=self._distribuer, name="analyses", daemon=True)
+                self._distributeur.start()
+            self._condition.notify_all()
+        futur.add_done_callback(lambda _: self._oublier(cle, futur))
+        return futur
+
+    def analyser(self, donnees, nom_onglet, session="anonyme", cle=None, delai=DELAI_ANALYSE):
+        """
+        Soumet une analyse et attend son résultat.
+
+        Raises:
+            concurrent.futures.TimeoutError: Analyse non terminée dans le délai (elle est
+                retirée de la file si elle n'avait pas encore commencé et qu'aucune autre
+                session n'attend la même analyse)
+        """
+        # Soumission et inscription sous le même verrou : une analyse partagée ne peut pas
+        # être annulée entre le moment où une session la récupère et celui où elle l'attend
+        with self._condition:
+            futur = self.soumettre(donnees, nom_onglet, session, cle)
+            self._attentes[futur] = self._attentes.get(futur, 0) + 1
+        try:
+            return futur.result(timeout=delai)
+        except DelaiDepasse:
+            with self._condition:
+                if self._attentes[futur] == 1:
+                    futur.cancel()
+            raise
+        finally:
+            with self._condition:
+                self._attentes[futur] -= 1
+                if not self._attentes[futur]:
+                    del self._attentes[futur]
+
+    def etat(self):
+        """Renvoie le nombre de processus, d'analyses en cours et en attente par session."""
+        with self._condition:
+            return {
+                'processus': self.nb_processus,
+                'en_cours': self.nb_processus - self._places,
+                'en_attente': {session: len(file) for session, file in self._files.items()},
+            }
+
+    def fermer(self):
+        with self._condition:
+            self._ferme = True
+            for file in self._files.values():
+                for _, _, _, futur in file:
+                    futur.cancel()
+            self._files.clear()
+            self._condition.notify_all()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _oublier(self, cle, futur):
+        with self._condition:
+            if self._futurs.get(cle) is futur:
+                del self._futurs[cle]
+
+    def _prochaine_analyse(self):
+        # Tourniquet : la première session de la file passe, puis repasse en dernière position
+        while self._files:
+            session, file = next(iter(self._files.items()))
+            cle, donnees, nom_onglet, futur = file.popleft()
+            if file:
+                self._files.move_to_end(session)
+            else:
+                del self._files[session]
+            # Une analyse abandonnée (délai dépassé) n'occupe pas de processus
+            if futur.set_running_or_notify_cancel():
+                return donnees, nom_onglet, futur
+        return None
+
+    def _distribuer(self):
+        while True:
+            with self._condition:
+                while not self._ferme and (self._places == 0 or not self._files):
+                    self._condition.wait()
+                if self._ferme:
+                    return
+                analyse = self._prochaine_analyse()
+                if analyse is None:
+                    continue
+                self._places -= 1
+            donnees, nom_onglet, futur = analyse
+            try:
+                # Les processus du pool sont démarrés à la demande, lors d'une soumission
+                with _sans_script_principal():
+                    resultat = self._obtenir_pool().submit(_analyser, donnees, nom_onglet)
+            except (BrokenProcessPool, RuntimeError) as e:
+                # Processus tombé (ex: mémoire) : le pool sera recréé pour l'analyse suivante
+                self._pool = None
+                self._liberer_place()
+                futur.set_exception(e)
+                continue
+            resultat.add_done_callback(lambda r, futur=futur: self._terminer(r, futur))
+
+    def _terminer(self, resultat, futur):
+        self._liberer_place()
+        try:
+            futur.set_result(resultat.result())
+        except BrokenProcessPool as e:
+            self._pool = None
+            futur.set_exception(e)
+        except Exception as e:
+            futur.set_exception(e)
+
+    def _liberer_place(self):
+        with self._condition:
+            self._places += 1
+            self._condition.notify_all()
+
+    def _obtenir_pool(self):
+        if self._pool is None:
+            # "spawn" : pas de fork d'un serveur multi-thread
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.nb_processus,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pool
+
+
+_executeur = None
+_verrou_executeur = threading.Lock()
+
+
+def obtenir_executeur():
+    """
+    Renvoie l'exécuteur d'analyses du processus (créé au premier appel), ou None
+    si HEURES_PROCESSUS_ANALYSE=0.
+    """
+    global _executeur
+    if NB_PROCESSUS <= 0:
+        return None
+    with _verrou_executeur:
+        if _executeur is None:
+            _executeur = ExecuteurAnalyses(NB_PROCESSUS)
+        return _executeur
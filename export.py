@@ -0,0 +1,419 @@
+import io
+import os
+import tempfile
+from datetime import datetime
+
+from cache_partage import obtenir_cache, empreinte_dataframe
+from majorations import COLONNES_MAJOREES
+
+# Nombre de lignes converties à la fois lors de la génération d'un export
+TAILLE_BLOC_EXPORT = 5000
+
+MIME_XLSX = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+FORMATS_EXPORT = {
+    'csv': {'libelle': "CSV (détail journalier)", 'mime': "text/csv", 'extension': "csv"},
+    'parquet': {'libelle': "Parquet (détail journalier)", 'mime': "application/octet-stream", 'extension': "parquet"},
+    'jsonl': {'libelle': "JSON lines (détail journalier)", 'mime': "application/x-ndjson", 'extension': "jsonl"},
+    'resume': {'libelle': "CSV (résumé par employé uniquement)", 'mime': "text/csv", 'extension': "csv"},
+    'paie_employe': {'libelle': "Classeur de paie Excel (une feuille par employé)", 'mime': MIME_XLSX, 'extension': "xlsx"},
+    'paie_departement': {'libelle': "Classeur de paie Excel (une feuille par département)", 'mime': MIME_XLSX, 'extension': "xlsx"},
+}
+
+# Colonnes du détail journalier exportées, dans cet ordre (celles qui sont présentes) ;
+# les colonnes de diagnostic de l'analyse (nb_pointages, doublons_retires...) restent internes
+COLONNES_EXPORT_JOURNALIER = ['emp_id', 'name', 'department', 'Role', 'date', 'mois', 'hours_worked'] + list(COLONNES_MAJOREES)
+
+# Colonnes de la feuille de synthèse du classeur de paie
+COLONNES_SYNTHESE_PAIE = ['ID Employé', 'Nom', 'Département', 'Role', 'Heures Totales', 'Seuil Individuel', 'Heures Supp', 'Statut']
+
+COULEURS_STATUT = {
+    "Normal": "#4CAF50",
+    "Alerte": "#FFA500",
+    "Dépassement": "#FF5733"
+}
+ICONES_STATUT = {
+    "Normal": "🟢",
+    "Alerte": "🟠",
+    "Dépassement": "🔴"
+}
+
+
+def _blocs(df, taille_bloc):
+    for debut in range(0, len(df), taille_bloc):
+        yield df.iloc[debut:debut + taille_bloc]
+
+
+def _iterer_csv(df, taille_bloc):
+    # En-tête une seule fois, puis les lignes bloc par bloc
+    yield df.iloc[:0].to_csv(index=False).encode("utf-8")
+    for bloc in _blocs(df, taille_bloc):
+        yield bloc.to_csv(index=False, header=False).encode("utf-8")
+
+
+def _iterer_jsonl(df, taille_bloc):
+    for bloc in _blocs(df, taille_bloc):
+        yield bloc.to_json(orient="records", lines=True, date_format="iso", force_ascii=False).encode("utf-8")
+
+
+def _iterer_parquet(df, taille_bloc):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError("L'export Parquet nécessite le paquet 'pyarrow'.")
+
+    tampon = io.BytesIO()
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    with pq.ParquetWriter(tampon, schema) as writer:
+        for bloc in _blocs(df, taille_bloc):
+            writer.write_table(pa.Table.from_pandas(bloc, schema=schema, preserve_index=False))
+            # Rendre ce qui a déjà été écrit puis vider le tampon
+            yield tampon.getvalue()
+            tampon.seek(0)
+            tampon.truncate()
+    yield tampon.getvalue()
+
+
+def iterer_export(df, format_export, taille_bloc=TAILLE_BLOC_EXPORT):
+    """
+    Génère un export par morceaux (bytes), sans construire le fichier complet en une fois.
+
+    Args:
+        df (pd.DataFrame): Données à exporter (détail journalier ou résumé)
+        format_export (str): Clé de FORMATS_EXPORT
+        taille_bloc (int): Nombre de lignes converties par morceau
+
+    Yields:
+        bytes: Morceaux successifs du fichier
+    """
+    if format_export in ('csv', 'resume'):
+        return _iterer_csv(df, taille_bloc)
+    if format_export == 'jsonl':
+        return _iterer_jsonl(df, taille_bloc)
+    if format_export == 'parquet':
+        return _iterer_parquet(df, taille_bloc)
+    raise ValueError(f"Format d'export inconnu: {format_export}")
+
+
+def ecrire_export(df, format_export, destination, taille_bloc=TAILLE_BLOC_EXPORT):
+    """
+    Écrit un export dans un fichier ouvert en binaire, morceau par morceau.
+    """
+    for morceau in iterer_export(df, format_export, taille_bloc):
+        destination.write(morceau)
+
+
+class FichierExport:
+    """
+    Export écrit dans un fichier temporaire, supprimé quand l'objet est libéré (par exemple
+    à son éviction du cache partagé) : le cache ne garde que le chemin, pas le contenu.
+    La taille du fichier compte dans le budget du cache (voir taille_memoire), si bien que
+    les exports sur disque restent bornés par ce budget.
+    """
+
+    def __init__(self, chemin):
+        self.chemin = chemin
+        self.taille = os.path.getsize(chemin)
+
+    def taille_memoire(self):
+        """Taille comptée par le cache partagé : celle du fichier (voir cache_partage.taille_objet)."""
+        return self.taille
+
+    def ouvrir(self):
+        """Ouvre le fichier en lecture binaire (à fermer par l'appelant)."""
+        return open(self.chemin, "rb")
+
+    def __del__(self):
+        try:
+            os.remove(self.chemin)
+        except OSError:
+            pass
+
+
+def _generer_sur_disque(ecrire, extension):
+    # Écriture morceau par morceau dans un fichier temporaire, jamais en un seul objet en mémoire
+    descripteur, chemin = tempfile.mkstemp(prefix="heures_export_", suffix=f".{extension}")
+    try:
+        with os.fdopen(descripteur, "wb") as destination:
+            ecrire(destination)
+    except BaseException:
+        os.remove(chemin)
+        raise
+    return FichierExport(chemin)
+
+
+def preparer_export(df, format_export, cle=None, colonnes=None):
+    """
+    Renvoie un export, généré seulement au premier appel puis mis en cache.
+
+    Args:
+        df (pd.DataFrame): Données à exporter
+        format_export (str): Clé de FORMATS_EXPORT
+        cle (hashable): Identifiant de la version des données ; par défaut l'empreinte de `df`
+        colonnes (list): Colonnes exportées, dans cet ordre, parmi celles présentes
+                         (ex: COLONNES_EXPORT_JOURNALIER) ; toutes par défaut
+
+    Returns:
+        FichierExport: Fichier temporaire contenant l'export
+    """
+    cle = cle if cle is not None else empreinte_dataframe(df)
+    colonnes = tuple(c for c in colonnes if c in df.columns) if colonnes is not None else None
+
+    def _generer():
+        donnees = df if colonnes is None else df[list(colonnes)]
+        return _generer_sur_disque(
+            lambda destination: ecrire_export(donnees, format_export, destination),
+            FORMATS_EXPORT[format_export]['extension']
+        )
+
+    return obtenir_cache().obtenir_ou_calculer(("export", format_export, cle, colonnes), _generer)
+
+
+def _nom_feuille(nom, deja_pris):
+    # Excel limite les noms de feuille à 31 caractères, sans les caractères []:*?/\
+    base = "".join("_" if c in '[]:*?/\\' else c for c in str(nom)).strip() or "Feuille"
+    base = base[:31]
+    candidat, n = base, 2
+    while candidat.lower() in deja_pris:
+        suffixe = f" ({n})"
+        candidat = base[:31 - len(suffixe)] + suffixe
+        n += 1
+    deja_pris.add(candidat.lower())
+    return candidat
+
+
+def ecrire_classeur_paie(resume, detail, destination, detail_par='employe'):
+    """
+    Écrit le classeur de paie (.xlsx) en mode mémoire constante.
+
+    Une feuille "Synthèse" reprend les colonnes du résumé (Heures Supp calculées par formule,
+    heures de nuit, du dimanche et fériées, ligne de totaux), puis une feuille de détail
+    par employé ou par département.
+    Les lignes sont écrites dans l'ordre et vidées sur disque au fil de l'eau.
+
+    Args:
+        resume (pd.DataFrame): Résumé par employé (voir utils.calculer_resume)
+        detail (pd.DataFrame): Données journalières ('emp_id', 'name', 'department', 'date', 'hours_worked',
+                               et les heures majorées si elles sont présentes)
+        destination: Chemin ou fichier binaire ouvert en écriture
+        detail_par (str): 'employe' ou 'departement'
+    """
+    try:
+        import xlsxwriter
+    except ImportError:
+        raise ValueError("L'export Excel nécessite le paquet 'xlsxwriter'.")
+    if detail_par not in ('employe', 'departement'):
+        raise ValueError(f"Découpage du détail inconnu: {detail_par}")
+
+    classeur = xlsxwriter.Workbook(destination, {'constant_memory': True})
+    fmt_entete = classeur.add_format({'bold': True, 'bg_color': '#F0F2F6', 'border': 1})
+    fmt_heures = classeur.add_format({'num_format': '0.00'})
+    fmt_total = classeur.add_format({'bold': True, 'num_format': '0.00', 'top': 1})
+    fmt_libelle_total = classeur.add_format({'bold': True, 'top': 1})
+    fmt_date = classeur.add_format({'num_format': 'dd/mm/yyyy'})
+    noms_pris = set()
+
+    # --- Synthèse ---
+    # Heures majorées présentes dans le résumé, écrites après les colonnes de base
+    colonnes_majorees = [c for c in COLONNES_MAJOREES.values() if c in resume.columns]
+    feuille = classeur.add_worksheet(_nom_feuille("Synthèse", noms_pris))
+    feuille.freeze_panes(1, 0)
+    feuille.set_column(0, 3, 18)
+    feuille.set_column(4, 7 + len(colonnes_majorees), 16)
+    feuille.write_row(0, 0, COLONNES_SYNTHESE_PAIE + colonnes_majorees, fmt_entete)
+    ligne = 0
+    for ligne, valeurs in enumerate(resume[COLONNES_SYNTHESE_PAIE + colonnes_majorees].itertuples(index=False), start=1):
+        emp_id, nom, departement, role, total, seuil, _, statut = valeurs[:8]
+        feuille.write_string(ligne, 0, str(emp_id))
+        feuille.write_string(ligne, 1, str(nom))
+        feuille.write_string(ligne, 2, str(departement))
+        feuille.write_string(ligne, 3, str(role))
+        feuille.write_number(ligne, 4, float(total), fmt_heures)
+        feuille.write_number(ligne, 5, float(seuil), fmt_heures)
+        # Les heures supp restent recalculées par Excel si le seuil est corrigé à la main
+        feuille.write_formula(ligne, 6, f"=MAX(0,E{ligne + 1}-F{ligne + 1})", fmt_heures,
+                              max(0.0, float(total) - float(seuil)))
+        feuille.write_string(ligne, 7, str(statut))
+        for col, valeur in enumerate(valeurs[8:], start=8):
+            feuille.write_number(ligne, col, float(valeur), fmt_heures)
+    if ligne:
+        feuille.write_string(ligne + 1, 0, "Total", fmt_libelle_total)
+        feuille.write_formula(ligne + 1, 4, f"=SUM(E2:E{ligne + 1})", fmt_total,
+                              float(resume['Heures Totales'].sum()))
+        feuille.write_formula(ligne + 1, 6, f"=SUM(G2:G{ligne + 1})", fmt_total,
+                              float(resume['Heures Supp'].sum()))
+        for col, colonne in enumerate(colonnes_majorees, start=8):
+            lettre = chr(ord('A') + col)
+            feuille.write_formula(ligne + 1, col, f"=SUM({lettre}2:{lettre}{ligne + 1})", fmt_total,
+                                  float(resume[colonne].sum()))
+
+    # --- Détail ---
+    if detail_par == 'employe':
+        cle_groupe, colonnes, titres = ['emp_id', 'name'], ['date', 'department', 'hours_worked'], ["Date", "Département", "Heures"]
+    else:
+        cle_groupe, colonnes, titres = ['department'], ['date', 'emp_id', 'name', 'hours_worked'], ["Date", "ID Employé", "Nom", "Heures"]
+    col_heures = len(colonnes) - 1
+    majorees_detail = [c for c in COLONNES_MAJOREES if c in detail.columns]
+    colonnes = colonnes + majorees_detail
+    titres = titres + [COLONNES_MAJOREES[c].replace("Heures ", "") for c in majorees_detail]
+    detail_trie = detail.sort_values(cle_groupe + ['date'], kind='stable')
+
+    for groupe, lignes in detail_trie.groupby(cle_groupe, sort=False):
+        groupe = groupe if isinstance(groupe, tuple) else (groupe,)
+        titre = f"{groupe[1]} ({groupe[0]})" if detail_par == 'employe' else groupe[0]
+        feuille = classeur.add_worksheet(_nom_feuille(titre, noms_pris))
+        feuille.freeze_panes(1, 0)
+        feuille.set_column(0, len(colonnes) - 1, 16)
+        feuille.write_row(0, 0, titres, fmt_entete)
+        ligne = 0
+        for ligne, valeurs in enumerate(lignes[colonnes].itertuples(index=False), start=1):
+            for col, valeur in enumerate(valeurs):
+                if col == 0:
+                    feuille.write_datetime(ligne, col, valeur.to_pydatetime(), fmt_date)
+                elif col >= col_heures:
+                    feuille.write_number(ligne, col, float(valeur), fmt_heures)
+                else:
+                    feuille.write_string(ligne, col, str(valeur))
+        feuille.write_string(ligne + 1, 0, "Total", fmt_libelle_total)
+        for col in range(col_heures, len(colonnes)):
+            lettre = chr(ord('A') + col)
+            feuille.write_formula(ligne + 1, col, f"=SUM({lettre}2:{lettre}{ligne + 1})", fmt_total,
+                                  float(lignes[colonnes[col]].sum()))
+
+    classeur.close()
+
+
+def preparer_classeur_paie(resume, detail, detail_par='employe', cle=None):
+    """
+    Renvoie le classeur de paie (.xlsx), généré au premier appel puis mis en cache.
+
+    Args:
+        resume (pd.DataFrame): Résumé par employé
+        detail (pd.DataFrame): Données journalières ajustées
+        detail_par (str): 'employe' ou 'departement'
+        cle (hashable): Identifiant de la version des données ; par défaut l'empreinte des deux tables
+
+    Returns:
+        FichierExport: Fichier temporaire contenant le classeur
+    """
+    cle = cle if cle is not None else (empreinte_dataframe(resume), empreinte_dataframe(detail))
+
+    def _generer():
+        return _generer_sur_disque(
+            lambda destination: ecrire_classeur_paie(resume, detail, destination, detail_par), "xlsx"
+        )
+
+    return obtenir_cache().obtenir_ou_calculer(("classeur_paie", detail_par, cle), _generer)
+
+
+def generer_rapport_impression(statut_df, mois_choisi, cle=None):
+    """
+    Génère (ou reprend du cache) le rapport HTML imprimable des statuts des employés.
+
+    La date de génération est ajoutée à chaque appel, hors de la partie mise en cache.
+
+    Args:
+        statut_df (pd.DataFrame): Résumé trié, avec les colonnes 'Nom', 'Heures Totales',
+                                  'Seuil Individuel', 'Heures Restantes', 'Statut', 'Role'
+        mois_choisi (str): Nom du mois affiché dans l'en-tête
+        cle (hashable): Identifiant de la version des données ; par défaut l'empreinte de `statut_df`
+
+    Returns:
+        str: Document HTML complet
+    """
+    cle = cle if cle is not None else empreinte_dataframe(statut_df)
+    debut, fin = obtenir_cache().obtenir_ou_calculer(
+        ("rapport_impression", mois_choisi, cle),
+        lambda: _construire_rapport_impression(statut_df, mois_choisi)
+    )
+    return f"{debut}{datetime.now().strftime('%d/%m/%Y à %H:%M')}{fin}"
+
+
+def _construire_rapport_impression(statut_df, mois_choisi):
+    # Renvoie le document en deux parties, avant et après la date de génération
+    debut = """
+                <html>
+                <head>
+                    <title>Statut des Employés</title>
+                    <style>
+                        body { font-family: Arial, sans-serif; margin: 15px; }
+                        .header { text-align: center; margin-bottom: 20px; }
+                        .header h1 { font-size: 1.5em; margin: 10px 0; }
+                        .header p { font-size: 0.9em; margin: 5px 0; }
+                        .status-grid {
+                            display: grid;
+                            grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
+                            gap: 10px;
+                            max-height: 70vh;
+                            overflow: hidden;
+                        }
+                        .status-item {
+                            border: 2px solid;
+                            padding: 8px;
+                            border-radius: 6px;
+                            font-size: 0.85em;
+                            margin-bottom: 0;
+                        }
+                        .status-item p { margin: 3px 0; line-height: 1.2; }
+                        .legend { margin-top: 15px; text-align: center; }
+                        .legend-items { display: flex; justify-content: center; gap: 20px; font-weight: bold; font-size: 0.9em; }
+                        @media print {
+                            body { margin: 10px; font-size: 12px; }
+                            .header h1 { font-size: 1.3em; }
+                            .status-grid {
+                                grid-template-columns: repeat(auto-fit, minmax(180px, 1fr));
+                                gap: 8px;
+                                page-break-inside: avoid;
+                            }
+                            .status-item {
+                                padding: 6px;
+                                font-size: 0.8em;
+                                break-inside: avoid;
+                            }
+                            .legend { margin-top: 10px; }
+                        }
+                    </style>
+                </head>
+                <body>
+                    <div class="header">
+                        <h1>Statut des heures supplémentaires</h1>
+                        <p>Généré le """
+    morceaux = [f""" - Mois: {mois_choisi}</p>
+                    </div>
+                    <div class="status-grid">
+                """]
+
+    # Une carte par employé, assemblées en une seule fois à la fin
+    for nom, heures, seuil, restantes, role, statut in zip(
+            statut_df['Nom'], statut_df['Heures Totales'], statut_df['Seuil Individuel'],
+            statut_df['Heures Restantes'], statut_df['Role'], statut_df['Statut']):
+        morceaux.append(f"""
+                        <div class="status-item" style="border-color: {COULEURS_STATUT.get(statut, "#FFFFFF")};">
+                            <p style="font-weight: bold; margin-bottom: 8px;">{ICONES_STATUT.get(statut, "")} {nom}</p>
+                            <p style="margin-bottom: 5px;">{heures:.1f}h / {seuil:.1f}h</p>
+                            <p style="margin-bottom: 0px;">{restantes:.1f}h restantes</p>
+                            <p style="margin-bottom: 0px; font-size: 0.9em; color: #666;">Rôle: {role}</p>
+                        </div>
+                    """)
+
+    morceaux.append("""
+                    </div>
+                    <div class="legend">
+                        <div class="legend-items">
+                            <div>🟢 Normal</div>
+                            <div>🟠 Proche du quota</div>
+                            <div>🔴 Dépassement</div>
+                        </div>
+                    </div>
+                    <script>
+                        window.onload = function() {
+                            setTimeout(function() {
+                                window.print();
+                            }, 100);
+                        }
+                    </script>
+                </body>
+                </html>
+                """)
+    return debut, "".join(morceaux)
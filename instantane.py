@@ -0,0 +1,128 @@
+import hashlib
+import json
+import struct
+import zlib
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# Extension des fichiers d'instantané de session
+EXTENSION = "heures"
+
+# Signature en tête de fichier et version du format (incrémentée à chaque changement de format)
+SIGNATURE = b"HEURESNP"
+VERSION_FORMAT = 1
+
+# Signature, version (uint16) et taille de l'en-tête JSON (uint32), en little-endian
+_PREAMBULE = struct.Struct("<8sHI")
+_TAILLE_EMPREINTE = hashlib.sha256().digest_size
+
+
+def _encoder_colonne(serie):
+    # Colonnes numériques, booléennes et dates : octets bruts du tableau numpy ;
+    # colonnes texte : dictionnaire des valeurs (JSON) et codes entiers
+    valeurs = serie.to_numpy()
+    if valeurs.dtype.kind in "biufcmM":
+        valeurs = np.ascontiguousarray(valeurs)
+        return {'codage': 'brut', 'dtype': valeurs.dtype.str}, [valeurs.tobytes()]
+    codes, dictionnaire = pd.factorize(serie, use_na_sentinel=True)
+    dictionnaire = json.dumps(list(dictionnaire), ensure_ascii=False, default=str).encode("utf-8")
+    codes = codes.astype("<i4")
+    return {'codage': 'dictionnaire', 'taille_dictionnaire': len(dictionnaire)}, [dictionnaire, codes.tobytes()]
+
+
+def _decoder_colonne(descripteur, corps, position, nb_lignes):
+    if descripteur['codage'] == 'brut':
+        dtype = np.dtype(descripteur['dtype'])
+        fin = position + nb_lignes * dtype.itemsize
+        return np.frombuffer(corps, dtype=dtype, count=nb_lignes, offset=position), fin
+    fin_dictionnaire = position + descripteur['taille_dictionnaire']
+    dictionnaire = np.array(json.loads(corps[position:fin_dictionnaire].decode("utf-8")) + [None], dtype=object)
+    fin = fin_dictionnaire + nb_lignes * 4
+    codes = np.frombuffer(corps, dtype="<i4", count=nb_lignes, offset=fin_dictionnaire)
+    # Code -1 (valeur manquante) : dernier élément du dictionnaire, None
+    return dictionnaire[codes], fin
+
+
+def ecrire_instantane(tables, etat, meta=None, niveau_compression=6):
+    """
+    Écrit un instantané de session : tables en colonnes compressées, état et métadonnées.
+
+    Format : signature, version du format, en-tête JSON (métadonnées, état de la session,
+    description des colonnes), corps compressé (zlib) des colonnes, puis l'empreinte
+    SHA-256 de tout ce qui précède.
+
+    Args:
+        tables (dict): Nom -> DataFrame (ex: données journalières, intervalles)
+        etat (dict): État de la session, sérialisable en JSON (rôles, modifications, paramètres)
+        meta (dict): Métadonnées libres (fichier d'origine, onglet...)
+        niveau_compression (int): Niveau zlib (1 à 9)
+
+    Returns:
+        bytes: Contenu du fichier d'instantané
+    """
+    morceaux = []
+    description = {}
+    for nom, df in tables.items():
+        colonnes = []
+        for colonne in df.columns:
+            descripteur, octets = _encoder_colonne(df[colonne])
+            colonnes.append({'nom': colonne, **descripteur})
+            morceaux.extend(octets)
+        description[nom] = {'nb_lignes': len(df), 'colonnes': colonnes}
+
+    entete = json.dumps({
+        'cree_le': datetime.now().isoformat(timespec='seconds'),
+        'meta': meta or {},
+        'etat': etat,
+        'tables': description,
+    }, ensure_ascii=False, default=str).encode("utf-8")
+    contenu = (_PREAMBULE.pack(SIGNATURE, VERSION_FORMAT, len(entete)) + entete
+               + zlib.compress(b"".join(morceaux), niveau_compression))
+    return contenu + hashlib.sha256(contenu).digest()
+
+
+def lire_instantane(donnees):
+    """
+    Relit un instantané écrit par ecrire_instantane, sans aucune analyse de fichier Excel.
+
+    Args:
+        donnees (bytes): Contenu du fichier d'instantané
+
+    Returns:
+        dict: 'tables' (nom -> DataFrame), 'etat', 'meta' et 'cree_le'
+
+    Raises:
+        ValueError: Fichier qui n'est pas un instantané, corrompu, ou d'une version plus récente
+    """
+    donnees = bytes(donnees)
+    if len(donnees) < _PREAMBULE.size + _TAILLE_EMPREINTE:
+        raise ValueError("Fichier trop court pour être un instantané.")
+    signature, version, taille_entete = _PREAMBULE.unpack_from(donnees)
+    if signature != SIGNATURE:
+        raise ValueError("Ce fichier n'est pas un instantané de session.")
+    contenu, empreinte = donnees[:-_TAILLE_EMPREINTE], donnees[-_TAILLE_EMPREINTE:]
+    if hashlib.sha256(contenu).digest() != empreinte:
+        raise ValueError("Instantané corrompu (empreinte SHA-256 invalide).")
+    if version > VERSION_FORMAT:
+        raise ValueError(f"Instantané au format {version}, non pris en charge (format {VERSION_FORMAT} au plus).")
+
+    debut_corps = _PREAMBULE.size + taille_entete
+    entete = json.loads(contenu[_PREAMBULE.size:debut_corps].decode("utf-8"))
+    corps = zlib.decompress(contenu[debut_corps:])
+
+    tables = {}
+    position = 0
+    for nom, description in entete['tables'].items():
+        nb_lignes = description['nb_lignes']
+        colonnes = {}
+        for descripteur in description['colonnes']:
+            colonnes[descripteur['nom']], position = _decoder_colonne(descripteur, corps, position, nb_lignes)
+        tables[nom] = pd.DataFrame(colonnes, index=pd.RangeIndex(nb_lignes))
+    return {
+        'tables': tables,
+        'etat': entete['etat'],
+        'meta': entete['meta'],
+        'cree_le': entete['cree_le'],
+    }
@@ -0,0 +1,136 @@
+import os
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+# Calendrier des jours fériés : "france" ou "alsace-moselle" (Vendredi saint et 26 décembre en plus)
+CALENDRIER_FERIES = os.environ.get("HEURES_CALENDRIER_FERIES", "france")
+# Jours fériés locaux supplémentaires, au format AAAA-MM-JJ séparés par des virgules
+FERIES_SUPPLEMENTAIRES = os.environ.get("HEURES_FERIES_SUPPLEMENTAIRES", "")
+# Plage des heures de nuit, au format "début-fin" en heures (ex: "22-6" pour 22h00–06h00)
+PLAGE_NUIT = os.environ.get("HEURES_PLAGE_NUIT", "22-6")
+
+# Colonnes ajoutées aux données journalières et libellés correspondants du résumé
+COLONNES_MAJOREES = {
+    'heures_nuit': "Heures Nuit",
+    'heures_dimanche': "Heures Dimanche",
+    'heures_ferie': "Heures Férié",
+}
+
+MINUTES_JOUR = 24 * 60
+
+
+def date_paques(annee):
+    """
+    Calcule la date du dimanche de Pâques (calendrier grégorien, algorithme de Meeus).
+    """
+    a = annee % 19
+    b, c = divmod(annee, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    mois, jour = divmod(h + l - 7 * m + 114, 31)
+    return date(annee, mois, jour + 1)
+
+
+def jours_feries(annees, calendrier=None, supplementaires=None):
+    """
+    Renvoie les jours fériés des années demandées.
+
+    Args:
+        annees (iterable): Années à couvrir
+        calendrier (str): "france" ou "alsace-moselle" (par défaut CALENDRIER_FERIES)
+        supplementaires (str | iterable): Jours fériés locaux en plus (par défaut FERIES_SUPPLEMENTAIRES)
+
+    Returns:
+        pd.DatetimeIndex: Jours fériés triés
+    """
+    calendrier = (calendrier or CALENDRIER_FERIES).strip().lower()
+    if calendrier not in ("france", "alsace-moselle"):
+        raise ValueError(f"Calendrier de jours fériés inconnu: {calendrier}")
+    supplementaires = FERIES_SUPPLEMENTAIRES if supplementaires is None else supplementaires
+    if isinstance(supplementaires, str):
+        supplementaires = [s for s in supplementaires.split(",") if s.strip()]
+
+    jours = []
+    for annee in annees:
+        paques = date_paques(int(annee))
+        jours += [
+            date(annee, 1, 1),                   # Jour de l'an
+            paques + timedelta(days=1),          # Lundi de Pâques
+            date(annee, 5, 1),                   # Fête du travail
+            date(annee, 5, 8),                   # Victoire 1945
+            paques + timedelta(days=39),         # Ascension
+            paques + timedelta(days=50),         # Lundi de Pentecôte
+            date(annee, 7, 14),                  # Fête nationale
+            date(annee, 8, 15),                  # Assomption
+            date(annee, 11, 1),                  # Toussaint
+            date(annee, 11, 11),                 # Armistice
+            date(annee, 12, 25),                 # Noël
+        ]
+        if calendrier == "alsace-moselle":
+            jours += [paques - timedelta(days=2), date(annee, 12, 26)]
+    feries = pd.DatetimeIndex(jours).append(pd.to_datetime([s.strip() for s in supplementaires]))
+    return feries.unique().sort_values()
+
+
+def _plage_nuit(plage):
+    debut, fin = (float(h) for h in plage.split("-"))
+    return int(debut * 60), int(fin * 60)
+
+
+def _chevauchement(debut, fin, debut_plage, fin_plage):
+    # Minutes communes entre [debut, fin) et [debut_plage, fin_plage), élément par élément
+    return np.clip(np.minimum(fin, fin_plage) - np.maximum(debut, debut_plage), 0, None)
+
+
+def ventiler_intervalles(intervalles, feries=None, plage_nuit=None):
+    """
+    Répartit chaque intervalle de présence entre les plages majorées (nuit, dimanche, férié),
+    pour tous les intervalles à la fois.
+
+    Les plages se cumulent : une heure travaillée un dimanche soir à 23h compte à la fois
+    en heures de nuit et en heures du dimanche (chaque majoration a son propre taux).
+    Un intervalle qui passe minuit est réparti entre ses deux jours calendaires.
+
+    Args:
+        intervalles (pd.DataFrame): Colonnes 'date' (jour du pointage d'entrée, datetime),
+                                    'debut' et 'fin' (minutes depuis minuit de ce jour,
+                                    fin > debut, fin < 48h)
+        feries (pd.DatetimeIndex): Jours fériés ; par défaut ceux des années concernées
+        plage_nuit (str): Plage de nuit "début-fin" (par défaut PLAGE_NUIT)
+
+    Returns:
+        pd.DataFrame: Même index, colonnes 'heures_nuit', 'heures_dimanche', 'heures_ferie'
+    """
+    dates = pd.DatetimeIndex(intervalles['date']).normalize()
+    debut = intervalles['debut'].to_numpy(dtype=float)
+    fin = intervalles['fin'].to_numpy(dtype=float)
+    if feries is None:
+        feries = jours_feries(range(dates.year.min(), dates.year.max() + 2)) if len(dates) else pd.DatetimeIndex([])
+
+    # Nuit : fenêtres de la veille, du jour et du lendemain (cas d'une plage qui passe minuit)
+    debut_nuit, fin_nuit = _plage_nuit(plage_nuit or PLAGE_NUIT)
+    minutes_nuit = np.zeros(len(debut))
+    for k in (-1, 0, 1):
+        origine = k * MINUTES_JOUR
+        fin_fenetre = origine + fin_nuit + (MINUTES_JOUR if debut_nuit > fin_nuit else 0)
+        minutes_nuit += _chevauchement(debut, fin, origine + debut_nuit, fin_fenetre)
+
+    # Dimanche et férié : part de l'intervalle sur le jour du pointage et sur le lendemain
+    minutes_jour = _chevauchement(debut, fin, 0, MINUTES_JOUR)
+    minutes_lendemain = _chevauchement(debut, fin, MINUTES_JOUR, 2 * MINUTES_JOUR)
+    lendemains = dates + pd.Timedelta(days=1)
+    minutes_dimanche = minutes_jour * (dates.dayofweek == 6) + minutes_lendemain * (lendemains.dayofweek == 6)
+    minutes_ferie = minutes_jour * dates.isin(feries) + minutes_lendemain * lendemains.isin(feries)
+
+    return pd.DataFrame({
+        'heures_nuit': minutes_nuit / 60,
+        'heures_dimanche': minutes_dimanche / 60,
+        'heures_ferie': minutes_ferie / 60,
+    }, index=intervalles.index)
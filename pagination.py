@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+
+
+class IndexTable:
+    """
+    Index d'une table affichée par pages : filtres et tris sont résolus sur des tableaux
+    de positions, et seule la page visible est extraite de la table.
+
+    Construit une fois par version des données ; les ordres de tri sont calculés au premier
+    usage de chaque colonne puis conservés.
+    """
+
+    def __init__(self, df, colonnes_filtres, colonne_date='date'):
+        """
+        Args:
+            df (pd.DataFrame): Table complète (n'est pas copiée : ne pas la modifier ensuite)
+            colonnes_filtres (list): Colonnes filtrables par valeur (ex: 'emp_id', 'Role', 'Modifié')
+            colonne_date (str): Colonne datetime filtrable par intervalle
+        """
+        self.df = df
+        self.nb_lignes = len(df)
+        # Positions des lignes par valeur, pour chaque colonne filtrable
+        self._groupes = {col: df.groupby(col, sort=True).indices for col in colonnes_filtres}
+        self.colonne_date = colonne_date
+        dates = df[colonne_date].to_numpy(dtype='datetime64[ns]')
+        self._ordre_dates = np.argsort(dates, kind='stable')
+        self._dates_triees = dates[self._ordre_dates]
+        self._ordres = {}
+
+    def valeurs(self, colonne):
+        """Valeurs distinctes (triées) d'une colonne filtrable."""
+        return list(self._groupes[colonne])
+
+    def bornes_dates(self):
+        """Première et dernière date de la table."""
+        if not self.nb_lignes:
+            return None, None
+        return pd.Timestamp(self._dates_triees[0]), pd.Timestamp(self._dates_triees[-1])
+
+    def _ordre(self, colonne, croissant):
+        if colonne not in self._ordres:
+            self._ordres[colonne] = np.argsort(self.df[colonne].to_numpy(), kind='stable')
+        ordre = self._ordres[colonne]
+        # Ordre décroissant : l'ordre croissant parcouru à l'envers
+        return ordre if croissant else ordre[::-1]
+
+    def selectionner(self, filtres=None, date_debut=None, date_fin=None, tri=None, croissant=True):
+        """
+        Renvoie les positions des lignes retenues, dans l'ordre d'affichage.
+
+        Args:
+            filtres (dict): colonne -> valeurs acceptées (liste vide ou None : pas de filtre)
+            date_debut, date_fin (datetime-like): Bornes incluses de l'intervalle de dates
+            tri (str): Colonne de tri (ordre de la table si None)
+            croissant (bool): Sens du tri
+
+        Returns:
+            np.ndarray: Positions (iloc) des lignes retenues
+        """
+        masque = np.ones(self.nb_lignes, dtype=bool)
+        for colonne, valeurs in (filtres or {}).items():
+            if not valeurs:
+                continue
+            groupes = self._groupes[colonne]
+            retenues = np.zeros(self.nb_lignes, dtype=bool)
+            for valeur in valeurs:
+                positions = groupes.get(valeur)
+                if positions is not None:
+                    retenues[positions] = True
+            masque &= retenues
+        if date_debut is not None or date_fin is not None:
+            # Recherche dichotomique des bornes dans les dates triées
+            debut = 0 if date_debut is None else np.searchsorted(
+                self._dates_triees, np.datetime64(pd.Timestamp(date_debut).normalize(), 'ns'), side='left')
+            fin = self.nb_lignes if date_fin is None else np.searchsorted(
+                self._dates_triees, np.datetime64(pd.Timestamp(date_fin).normalize(), 'ns'), side='right')
+            dans_intervalle = np.zeros(self.nb_lignes, dtype=bool)
+            dans_intervalle[self._ordre_dates[debut:fin]] = True
+            masque &= dans_intervalle
+
+        if tri is None:
+            return np.flatnonzero(masque)
+        ordre = self._ordre(tri, croissant)
+        return ordre[masque[ordre]]
+
+    def page(self, positions, numero, taille):
+        """
+        Extrait une page de la table.
+
+        Args:
+            positions (np.ndarray): Résultat de selectionner
+            numero (int): Numéro de page (à partir de 1)
+            taille (int): Nombre de lignes par page
+
+        Returns:
+            pd.DataFrame: Lignes de la page, avec leur index d'origine
+        """
+        debut = (max(int(numero), 1) - 1) * taille
+        return self.df.iloc[positions[debut:debut + taille]]
@@ -0,0 +1,104 @@
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows : pas de verrou entre processus
+    fcntl = None
+
+# Fichier où sont conservés les plans d'analyse des formats de pointeuse déjà rencontrés
+FICHIER_PLANS = os.environ.get(
+    "HEURES_FICHIER_PLANS",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "plans_analyse.json")
+)
+
+_plans = None
+_verrou = threading.Lock()
+
+
+def _lire_fichier():
+    try:
+        with open(FICHIER_PLANS, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _charger():
+    global _plans
+    if _plans is None:
+        _plans = _lire_fichier() or {}
+    return _plans
+
+
+@contextmanager
+def _verrou_fichier():
+    # Verrou entre processus (pool d'analyse) le temps de relire puis remplacer le fichier
+    if fcntl is None:
+        yield
+        return
+    try:
+        f = open(f"{FICHIER_PLANS}.verrou", "a")
+    except OSError:
+        yield
+        return
+    with f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _modifier(modification):
+    # Les processus du pool d'analyse ont chacun leurs plans en mémoire : le fichier est relu
+    # pour ne pas écraser les plans enregistrés entre-temps par un autre processus, puis
+    # remplacé d'un coup par un fichier temporaire propre à cet appel
+    global _plans
+    with _verrou_fichier():
+        plans = _lire_fichier()
+        if plans is None:
+            plans = dict(_charger())
+        modification(plans)
+        _plans = plans
+        temporaire = None
+        try:
+            with tempfile.NamedTemporaryFile(
+                "w", encoding="utf-8", dir=os.path.dirname(os.path.abspath(FICHIER_PLANS)),
+                prefix=".plans_", suffix=".tmp", delete=False
+            ) as f:
+                temporaire = f.name
+                json.dump(plans, f, ensure_ascii=False, indent=2)
+            os.replace(temporaire, FICHIER_PLANS)
+        except OSError:
+            # Dossier en lecture seule : la modification reste connue pour la durée du processus
+            if temporaire is not None and os.path.exists(temporaire):
+                os.remove(temporaire)
+
+
+def obtenir_plan(empreinte):
+    """
+    Renvoie le plan d'analyse connu pour une empreinte de mise en page, ou None.
+    """
+    with _verrou:
+        plan = _charger().get(empreinte)
+        return dict(plan) if plan is not None else None
+
+
+def enregistrer_plan(empreinte, plan):
+    """
+    Mémorise le plan d'analyse d'une nouvelle mise en page (en mémoire et sur disque).
+    """
+    with _verrou:
+        _modifier(lambda plans: plans.__setitem__(empreinte, dict(plan)))
+
+
+def oublier_plan(empreinte):
+    """
+    Retire un plan devenu invalide (le format sera de nouveau détecté au prochain fichier).
+    """
+    with _verrou:
+        _modifier(lambda plans: plans.pop(empreinte, None))
@@ -0,0 +1,135 @@
+import argparse
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Libellés des statuts de prévision
+STATUT_ATTEINT = "Dépassement atteint"
+STATUT_PREVU = "Dépassement prévu"
+STATUT_SOUS_SEUIL = "Sous le seuil"
+
+
+def prevoir_fin_de_mois(df, seuils, seuil_defaut, date_reference=None):
+    """
+    Projette, pour tous les employés à la fois, le total d'heures en fin de mois et la date
+    à laquelle chacun devrait dépasser son seuil mensuel.
+
+    La projection part des heures déjà faites dans le mois, puis ajoute pour chaque jour
+    calendaire restant la moyenne de l'employé pour ce jour de la semaine (jours non
+    travaillés inclus). Si un jour de la semaine n'a pas encore été observé, la moyenne
+    journalière globale de l'employé est utilisée.
+
+    Args:
+        df (pd.DataFrame): Données journalières ('emp_id', 'name', 'date', 'hours_worked')
+        seuils (dict | pd.Series): Seuil mensuel par emp_id
+        seuil_defaut (float): Seuil pour les employés absents de `seuils`
+        date_reference (datetime-like): Dernier jour connu ; par défaut la dernière date des données
+
+    Returns:
+        pd.DataFrame: Une ligne par employé, triée par date de dépassement
+    """
+    colonnes = ['emp_id', 'name', 'heures_a_date', 'jours_restants', 'projection_fin_mois',
+                'seuil', 'heures_supp_prevues', 'date_depassement', 'statut_prevision']
+    if df.empty:
+        return pd.DataFrame(columns=colonnes)
+
+    dates = pd.to_datetime(df['date'])
+    date_reference = pd.Timestamp(date_reference) if date_reference is not None else dates.max()
+    date_reference = date_reference.normalize()
+    debut_mois = date_reference.replace(day=1)
+    fin_mois = debut_mois + pd.offsets.MonthEnd(0)
+
+    # Seulement le mois de la date de référence, jusqu'à cette date
+    masque = (dates >= debut_mois) & (dates <= date_reference)
+    donnees = pd.DataFrame({
+        'emp_id': df['emp_id'][masque].to_numpy(),
+        'date': dates[masque].to_numpy(),
+        'hours_worked': df['hours_worked'][masque].to_numpy(dtype=float),
+    })
+    employes = df[['emp_id', 'name']].drop_duplicates('emp_id').set_index('emp_id')['name']
+    ids = employes.index
+
+    # Heures à date et répartition par jour de la semaine (employés × 7)
+    heures_a_date = donnees.groupby('emp_id')['hours_worked'].sum().reindex(ids, fill_value=0.0)
+    donnees['jour_semaine'] = donnees['date'].dt.dayofweek
+    heures_par_jour_semaine = (
+        donnees.pivot_table(index='emp_id', columns='jour_semaine', values='hours_worked', aggfunc='sum')
+        .reindex(index=ids, columns=range(7)).fillna(0.0).to_numpy()
+    )
+    jours_ecoules = pd.date_range(debut_mois, date_reference, freq='D')
+    occurrences = np.bincount(jours_ecoules.dayofweek, minlength=7).astype(float)
+    moyenne_globale = heures_a_date.to_numpy() / max(len(jours_ecoules), 1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        profil = np.where(occurrences > 0, heures_par_jour_semaine / occurrences, moyenne_globale[:, None])
+
+    # Projection sur les jours restants (employés × jours)
+    jours_restants = pd.date_range(date_reference + pd.Timedelta(days=1), fin_mois, freq='D')
+    attendu = profil[:, jours_restants.dayofweek]
+    cumul_projete = heures_a_date.to_numpy()[:, None] + np.cumsum(attendu, axis=1)
+    projection = cumul_projete[:, -1] if len(jours_restants) else heures_a_date.to_numpy()
+
+    seuil = pd.Series(seuils, dtype=float).reindex(ids).fillna(seuil_defaut).to_numpy()
+
+    # Date de dépassement déjà atteinte (cumul réel) ...
+    donnees = donnees.sort_values(['emp_id', 'date'])
+    donnees['cumul'] = donnees.groupby('emp_id')['hours_worked'].cumsum()
+    donnees['seuil'] = pd.Series(seuil, index=ids).reindex(donnees['emp_id']).to_numpy()
+    depassements_reels = donnees[donnees['cumul'] > donnees['seuil']].groupby('emp_id')['date'].min()
+    date_reelle = depassements_reels.reindex(ids)
+
+    # ... ou prévue (premier jour restant où le cumul projeté dépasse le seuil)
+    au_dessus = cumul_projete > seuil[:, None]
+    a_depasser = au_dessus.any(axis=1) if len(jours_restants) else np.zeros(len(ids), dtype=bool)
+    date_prevue = pd.Series(pd.NaT, index=ids, dtype='datetime64[ns]')
+    if len(jours_restants):
+        premier = au_dessus.argmax(axis=1)
+        date_prevue[a_depasser] = jours_restants[premier[a_depasser]]
+
+    deja_depasse = date_reelle.notna().to_numpy()
+    resultat = pd.DataFrame({
+        'emp_id': ids,
+        'name': employes.to_numpy(),
+        'heures_a_date': heures_a_date.to_numpy(),
+        'jours_restants': len(jours_restants),
+        'projection_fin_mois': projection.round(2),
+        'seuil': seuil,
+        'heures_supp_prevues': np.maximum(projection - seuil, 0).round(2),
+        'date_depassement': date_reelle.where(deja_depasse, date_prevue).to_numpy(),
+        'statut_prevision': np.select([deja_depasse, a_depasser], [STATUT_ATTEINT, STATUT_PREVU], STATUT_SOUS_SEUIL),
+    })
+    return resultat.sort_values(['date_depassement', 'projection_fin_mois'], ascending=[True, False],
+                                na_position='last').reset_index(drop=True)[colonnes]
+
+
+if __name__ == "__main__":
+    # Exécution planifiée (ex: chaque nuit) : prévision pour tous les employés d'un fichier
+    parser = argparse.ArgumentParser(description="Prévision des heures en fin de mois")
+    parser.add_argument("fichier", help="Fichier Excel de pointage")
+    parser.add_argument("--onglet", default="Enregistrement ")
+    parser.add_argument("--seuil-hebdo-cuisine", type=float, default=42.0,
+                        help="Seuil hebdomadaire du rôle Cuisine")
+    parser.add_argument("--seuil-hebdo-salle", type=float, default=39.0,
+                        help="Seuil hebdomadaire du rôle Salle")
+    parser.add_argument("--date", default=None, help="Date de référence (AAAA-MM-JJ)")
+    args = parser.parse_args()
+
+    import registre
+    from utils import traiter_fichier
+
+    donnees = traiter_fichier(args.fichier, args.onglet)
+    date_reference = pd.Timestamp(args.date) if args.date else pd.to_datetime(donnees['date']).max()
+    # Seuils du mois de la date de référence, comme dans l'application : contrat du
+    # registre des employés, sinon seuil du rôle enregistré
+    registre_employes = registre.charger_registre()
+    roles = registre.roles_du_registre(registre_employes)
+    employes = donnees[['emp_id']].drop_duplicates()
+    employes['Role'] = employes['emp_id'].map(roles).fillna("Non Assigné")
+    seuil_hebdo_defaut = (args.seuil_hebdo_cuisine + args.seuil_hebdo_salle) / 2
+    seuils = registre.resoudre_seuils(
+        employes, registre_employes,
+        {"Cuisine": args.seuil_hebdo_cuisine, "Salle": args.seuil_hebdo_salle}, seuil_hebdo_defaut,
+        date_reference.replace(day=1), date_reference + pd.offsets.MonthEnd(0)
+    )
+    prevision = prevoir_fin_de_mois(donnees, seuils['Seuil Individuel'], seuil_hebdo_defaut * 4.33, date_reference)
+    prevision.to_csv(sys.stdout, index=False)
@@ -0,0 +1,161 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# Fichier du registre des employés (contrats, rôles, sites)
+FICHIER_REGISTRE = os.environ.get(
+    "HEURES_FICHIER_REGISTRE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "registre_employes.csv")
+)
+
+# Colonnes du registre : une ligne par contrat (un employé peut avoir plusieurs contrats successifs)
+COLONNES_REGISTRE = ['emp_id', 'role', 'heures_contrat_hebdo', 'date_debut', 'date_fin', 'site']
+ROLES_REGISTRE = ["Cuisine", "Salle"]
+
+
+def registre_vide():
+    """Renvoie un registre sans aucune ligne, avec les bons types de colonnes."""
+    return normaliser_registre(pd.DataFrame(columns=COLONNES_REGISTRE))
+
+
+def normaliser_registre(registre):
+    """
+    Remet un registre (lu sur disque ou saisi dans l'interface) au format attendu.
+
+    Args:
+        registre (pd.DataFrame): Registre avec tout ou partie des COLONNES_REGISTRE
+
+    Returns:
+        pd.DataFrame: Colonnes COLONNES_REGISTRE, dates en datetime, heures en float,
+                      lignes sans identifiant retirées
+    """
+    registre = registre.reindex(columns=COLONNES_REGISTRE).copy()
+    registre['emp_id'] = registre['emp_id'].astype("string").str.strip()
+    registre = registre[registre['emp_id'].notna() & (registre['emp_id'] != "")]
+    registre['emp_id'] = registre['emp_id'].astype(object)
+    registre['role'] = registre['role'].where(registre['role'].isin(ROLES_REGISTRE))
+    registre['heures_contrat_hebdo'] = pd.to_numeric(registre['heures_contrat_hebdo'], errors='coerce')
+    registre['date_debut'] = pd.to_datetime(registre['date_debut'], errors='coerce')
+    registre['date_fin'] = pd.to_datetime(registre['date_fin'], errors='coerce')
+    registre['site'] = registre['site'].astype(object).where(registre['site'].notna(), None)
+    return registre.sort_values(['emp_id', 'date_debut'], na_position='first').reset_index(drop=True)
+
+
+def charger_registre(chemin=None):
+    """
+    Lit le registre des employés ; renvoie un registre vide si le fichier n'existe pas encore.
+    """
+    try:
+        registre = pd.read_csv(chemin or FICHIER_REGISTRE, dtype={'emp_id': str, 'role': str, 'site': str})
+    except (OSError, pd.errors.EmptyDataError):
+        return registre_vide()
+    return normaliser_registre(registre)
+
+
+def enregistrer_registre(registre, chemin=None):
+    """
+    Écrit le registre sur disque (remplacement atomique du fichier).
+
+    Returns:
+        pd.DataFrame: Le registre normalisé tel qu'il a été écrit
+    """
+    chemin = chemin or FICHIER_REGISTRE
+    registre = normaliser_registre(registre)
+    temporaire = f"{chemin}.tmp"
+    registre.to_csv(temporaire, index=False, date_format="%Y-%m-%d")
+    os.replace(temporaire, chemin)
+    return registre
+
+
+def roles_du_registre(registre):
+    """
+    Renvoie le rôle enregistré de chaque employé (celui de son contrat le plus récent).
+    """
+    roles = registre.dropna(subset=['role']).drop_duplicates('emp_id', keep='last')
+    return dict(zip(roles['emp_id'], roles['role']))
+
+
+def decouper_en_mois(debut_periode, fin_periode):
+    """
+    Découpe une période en mois calendaires.
+
+    Returns:
+        list: (premier jour, dernier jour) de chaque mois, bornés à la période
+    """
+    debut_periode = pd.Timestamp(debut_periode).normalize()
+    fin_periode = pd.Timestamp(fin_periode).normalize()
+    mois = []
+    debut = debut_periode
+    while debut <= fin_periode:
+        fin = min(debut + pd.offsets.MonthEnd(0), fin_periode)
+        mois.append((debut, fin))
+        debut = fin + pd.Timedelta(days=1)
+    return mois
+
+
+def resoudre_seuils(employes, registre, seuils_hebdo_par_role, seuil_hebdo_defaut,
+                    debut_periode, fin_periode, semaines_par_mois=4.33):
+    """
+    Résout en une seule jointure le seuil de chaque employé pour la période analysée.
+
+    Le seuil est calculé mois par mois puis additionné (période de plusieurs mois avec
+    "Montrer toutes les données"). Pour chaque mois, un employé dont un contrat du registre
+    (avec heures hebdomadaires) couvre le mois reçoit le seuil de son contrat, au prorata des
+    jours couverts (entrée ou sortie en cours de mois) ; plusieurs contrats successifs sur le
+    mois sont additionnés. Les autres mois, et les autres employés, ont le seuil de leur rôle.
+
+    Args:
+        employes (pd.DataFrame): Une ligne par employé avec 'emp_id' et 'Role'
+        registre (pd.DataFrame): Registre normalisé (voir charger_registre)
+        seuils_hebdo_par_role (dict): Seuil hebdomadaire par rôle
+        seuil_hebdo_defaut (float): Seuil hebdomadaire des rôles absents de `seuils_hebdo_par_role`
+        debut_periode, fin_periode (datetime-like): Premier et dernier jour de la période
+        semaines_par_mois (float): Conversion des heures hebdomadaires en heures mensuelles
+
+    Returns:
+        pd.DataFrame: Indexé par emp_id, colonnes 'Seuil Hebdo', 'Seuil Individuel' (seuil
+                      de la période, mensuel pour un seul mois) et 'Contrat' (True si le seuil
+                      vient du registre pour au moins un mois)
+    """
+    debut_periode = pd.Timestamp(debut_periode).normalize()
+    fin_periode = pd.Timestamp(fin_periode).normalize()
+
+    employes = employes[['emp_id', 'Role']].drop_duplicates('emp_id')
+    seuil_role = employes['Role'].map(seuils_hebdo_par_role).fillna(seuil_hebdo_defaut).astype(float).to_numpy()
+
+    # Contrats avec heures, croisés avec les employés présents (une seule jointure)
+    contrats = registre.dropna(subset=['heures_contrat_hebdo'])
+    contrats = employes[['emp_id']].merge(contrats, on='emp_id', how='inner')
+    debut_contrat = contrats['date_debut'].fillna(debut_periode)
+    fin_contrat = contrats['date_fin'].fillna(fin_periode)
+
+    seuil_periode = np.zeros(len(employes))
+    contrat = np.zeros(len(employes), dtype=bool)
+    heures_recentes = pd.Series(np.nan, index=employes['emp_id'])
+    for debut_mois, fin_mois in decouper_en_mois(debut_periode, fin_periode):
+        jours_mois = (fin_mois - debut_mois).days + 1
+        debut = debut_contrat.clip(lower=debut_mois)
+        fin = fin_contrat.clip(upper=fin_mois)
+        jours = ((fin - debut).dt.days + 1).clip(lower=0)
+        couverts = contrats.assign(jours=jours, heures_ponderees=contrats['heures_contrat_hebdo'] * jours)
+        couverts = couverts[couverts['jours'] > 0]
+        par_employe = couverts.groupby('emp_id').agg(
+            heures_ponderees=('heures_ponderees', 'sum'),
+            heures_recentes=('heures_contrat_hebdo', 'last')
+        ).reindex(employes['emp_id'])
+        contrat_mois = par_employe['heures_ponderees'].notna().to_numpy()
+        seuil_periode += np.where(
+            contrat_mois,
+            par_employe['heures_ponderees'].to_numpy() / jours_mois * semaines_par_mois,
+            seuil_role * semaines_par_mois
+        )
+        contrat |= contrat_mois
+        # Heures hebdomadaires du contrat le plus récent de la période
+        heures_recentes = par_employe['heures_recentes'].combine_first(heures_recentes)
+
+    return pd.DataFrame({
+        'Seuil Hebdo': np.where(contrat, heures_recentes.to_numpy(), seuil_role),
+        'Seuil Individuel': seuil_periode,
+        'Contrat': contrat,
+    }, index=pd.Index(employes['emp_id'], name='emp_id'))
@@ -0,0 +1,112 @@
+import pandas as pd
+
+import utils
+
+# Nombre de derniers jours travaillés retenus pour le rythme hebdomadaire
+JOURS_RYTHME = 7
+
+
+class ResumeIncremental:
+    """
+    Résumé par employé tenu à jour modification par modification.
+
+    Construit une fois à partir des agrégats (totaux, nombre de jours et fenêtre des derniers
+    jours travaillés de chaque employé) ; l'écart d'heures d'une journée modifiée ne touche
+    ensuite que la ligne du résumé concernée : total, moyenne, heures supp et restantes,
+    statut et rythme hebdomadaire.
+
+    Les lignes du résumé sont identifiées par (emp_id, name, department, Role), comme dans
+    CubeAgregats.employe : un même emp_id peut en avoir plusieurs.
+
+    Une modification ne change que des heures : les jours travaillés, donc les fenêtres
+    des derniers jours, restent les mêmes.
+    """
+
+    def __init__(self, agregats, seuils_par_role, seuil_defaut, marge_alerte, seuils_employes, seuils_hebdo):
+        """
+        Args:
+            agregats (cube.CubeAgregats): Agrégats des données ajustées
+            seuils_par_role, seuil_defaut, marge_alerte, seuils_employes: Voir utils.classer_resume
+            seuils_hebdo (pd.Series): Seuil hebdomadaire par emp_id, pour le rythme
+        """
+        self.marge_alerte = marge_alerte
+        self.resume = utils.classer_resume(
+            agregats.totaux_employes(), seuils_par_role, seuil_defaut, marge_alerte, seuils_employes
+        ).reset_index(drop=True)
+        cles = zip(self.resume['ID Employé'], self.resume['Nom'], self.resume['Département'], self.resume['Role'])
+        self._positions = {cle: pos for pos, cle in enumerate(cles)}
+        # Lignes du résumé de chaque employé, qui partagent sa fenêtre des derniers jours
+        self._lignes_employe = {}
+        for cle in self._positions:
+            self._lignes_employe.setdefault(cle[0], []).append(cle)
+        self._colonnes = {colonne: self.resume.columns.get_loc(colonne) for colonne in (
+            'Heures Totales', 'Moyenne Quotidienne', 'Jours Travaillés', 'Seuil Individuel',
+            'Heures Supp', 'Heures Restantes', 'Statut', 'Nom', 'Role'
+        )}
+        self._seuils_hebdo = seuils_hebdo
+
+        # Derniers jours travaillés de chaque employé (employe_jour est trié par employé et date)
+        jours = agregats.employe_jour.reset_index()[['emp_id', 'date', 'heures']]
+        fenetres = jours.groupby('emp_id').tail(JOURS_RYTHME).groupby('emp_id').agg(
+            heures=('heures', 'sum'), nb_jours=('date', 'size'), debut=('date', 'min'), fin=('date', 'max')
+        )
+        self._fenetres = fenetres.to_dict('index')
+        self._rythmes = {cle: self._evaluer_rythme(cle) for cle in self._positions}
+
+    def _ligne(self, cle, colonne):
+        return self.resume.iat[self._positions[cle], self._colonnes[colonne]]
+
+    def _evaluer_rythme(self, cle):
+        fenetre = self._fenetres.get(cle[0])
+        if fenetre is None:
+            return None
+        analyse = utils.evaluer_rythme(
+            fenetre['heures'], fenetre['nb_jours'], self._seuils_hebdo[cle[0]],
+            self._ligne(cle, 'Role'), fenetre['debut'], fenetre['fin']
+        )
+        if analyse:
+            analyse['nom'] = self._ligne(cle, 'Nom')
+        return analyse
+
+    def appliquer_ecarts(self, date, ecarts):
+        """
+        Répercute les écarts d'une journée modifiée (résultat de CubeAgregats.appliquer_ajustement).
+        """
+        for cle, delta in ecarts.items():
+            self.appliquer_delta(cle, date, delta)
+
+    def appliquer_delta(self, cle, date, delta):
+        """
+        Répercute l'écart d'heures d'une journée sur une ligne du résumé et le rythme de l'employé.
+
+        Args:
+            cle (tuple): Ligne du résumé (emp_id, name, department, Role)
+            date (datetime-like): Jour modifié
+            delta (float): Écart d'heures de cette ligne
+        """
+        pos = self._positions.get(cle)
+        if pos is None or delta == 0:
+            return
+        col = self._colonnes
+        total = self.resume.iat[pos, col['Heures Totales']] + delta
+        seuil = self.resume.iat[pos, col['Seuil Individuel']]
+        self.resume.iat[pos, col['Heures Totales']] = total
+        self.resume.iat[pos, col['Moyenne Quotidienne']] = total / self.resume.iat[pos, col['Jours Travaillés']]
+        self.resume.iat[pos, col['Heures Supp']] = max(total - seuil, 0.0)
+        self.resume.iat[pos, col['Heures Restantes']] = max(seuil - total, 0.0)
+        self.resume.iat[pos, col['Statut']] = utils.determiner_statut(total, seuil, self.marge_alerte)
+
+        # Rythme : seulement si la journée fait partie des derniers jours travaillés de l'employé,
+        # fenêtre commune à toutes ses lignes du résumé
+        fenetre = self._fenetres.get(cle[0])
+        if fenetre is not None and pd.Timestamp(date) >= fenetre['debut']:
+            fenetre['heures'] += delta
+            for cle_ligne in self._lignes_employe[cle[0]]:
+                self._rythmes[cle_ligne] = self._evaluer_rythme(cle_ligne)
+
+    def rythmes(self):
+        """
+        Renvoie les analyses de rythme hebdomadaire (voir utils.evaluer_rythme), avec le
+        nom de l'employé, dans l'ordre du résumé.
+        """
+        return [self._rythmes[cle] for cle in self._positions if self._rythmes.get(cle)]
@@ -0,0 +1,344 @@
+import argparse
+import itertools
+import json
+import os
+import threading
+import urllib.error
+import urllib.request
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as DelaiDepasse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+from cache_partage import obtenir_cache, empreinte_octets
+from chargement import obtenir_analyse
+from executeur import FileAnalysesPleine
+
+# Nombre de semaines par mois utilisé pour passer des seuils hebdomadaires aux seuils mensuels
+SEMAINES_PAR_MOIS = 4.33
+# Délai maximal d'attente d'un résultat (en secondes)
+DELAI_REPONSE = 120
+
+
+class FileSaturee(Exception):
+    """La file d'attente du service est pleine : le client doit réessayer plus tard."""
+
+
+class RequeteInvalide(ValueError):
+    """Paramètres de requête invalides."""
+
+
+# Valeur par défaut distinguant une entrée absente du cache d'un résultat None
+_ABSENT = object()
+
+
+def _erreurs_lecture():
+    """
+    Exceptions levées par les bibliothèques de lecture sur un fichier Excel malformé.
+
+    Returns:
+        tuple: Classes d'exceptions à signaler comme une erreur du fichier envoyé (422)
+    """
+    import zipfile
+    import zlib
+    from xml.etree.ElementTree import ParseError
+    from openpyxl.utils.exceptions import InvalidFileException
+
+    erreurs = [zipfile.BadZipFile, zlib.error, ParseError, EOFError, InvalidFileException]
+    try:
+        from xlrd import XLRDError
+        erreurs.append(XLRDError)
+    except ImportError:
+        pass
+    return tuple(erreurs)
+
+
+def _flottant(parametres, nom, defaut):
+    try:
+        return float(parametres.get(nom, defaut))
+    except (TypeError, ValueError):
+        raise RequeteInvalide(f"Paramètre '{nom}' invalide")
+
+
+def _en_json(df):
+    return json.loads(df.to_json(orient="records", date_format="iso", force_ascii=False))
+
+
+def _donnees_avec_roles(donnees, parametres, session=None):
+    import pandas as pd
+
+    onglet = parametres.get("onglet", "Enregistrement ")
+    df = obtenir_analyse(donnees, onglet, session=session).copy()
+    if df.empty:
+        return df
+    if "mois" in parametres:
+        df = df[df['mois'] == int(_flottant(parametres, "mois", 0))]
+    roles = parametres.get("roles") or {}
+    if isinstance(roles, str):
+        try:
+            roles = json.loads(roles)
+        except ValueError:
+            raise RequeteInvalide("Paramètre 'roles' invalide (JSON attendu)")
+    import registre
+
+    # Rôle donné dans la requête, sinon celui du registre des employés
+    roles_registre = registre.roles_du_registre(registre.charger_registre())
+    df['Role'] = df['emp_id'].map(roles).fillna(df['emp_id'].map(roles_registre)).fillna("Non Assigné")
+    df['date'] = pd.to_datetime(df['date'])
+    return df
+
+
+def _seuils(parametres):
+    seuil_hebdo_cuisine = _flottant(parametres, "seuil_hebdo_cuisine", 42.0)
+    seuil_hebdo_salle = _flottant(parametres, "seuil_hebdo_salle", 39.0)
+    seuils_hebdo = {"Cuisine": seuil_hebdo_cuisine, "Salle": seuil_hebdo_salle}
+    return seuils_hebdo, (seuil_hebdo_cuisine + seuil_hebdo_salle) / 2
+
+
+def _seuils_employes(df, parametres):
+    """Seuils de chaque employé : contrat du registre, sinon rôle (voir registre.resoudre_seuils)."""
+    import pandas as pd
+    import registre
+
+    seuils_hebdo, seuil_hebdo_defaut = _seuils(parametres)
+    return registre.resoudre_seuils(
+        df[['emp_id', 'Role']], registre.charger_registre(), seuils_hebdo, seuil_hebdo_defaut,
+        df['date'].min().replace(day=1), df['date'].max() + pd.offsets.MonthEnd(0), SEMAINES_PAR_MOIS
+    )
+
+
+def operation_traiter(donnees, parametres, session=None):
+    """Heures journalières par employé (résultat de traiter_fichier)."""
+    onglet = parametres.get("onglet", "Enregistrement ")
+    df = obtenir_analyse(donnees, onglet, session=session)
+    return {'lignes': _en_json(df.drop(columns=['mois'], errors='ignore'))}
+
+
+def operation_resume(donnees, parametres, session=None):
+    """Résumé par employé avec seuils et statuts."""
+    import utils
+
+    df = _donnees_avec_roles(donnees, parametres, session)
+    if df.empty:
+        return {'employes': []}
+    seuils_hebdo, seuil_hebdo_defaut = _seuils(parametres)
+    resume = utils.calculer_resume(
+        df,
+        {role: seuil * SEMAINES_PAR_MOIS for role, seuil in seuils_hebdo.items()},
+        seuil_hebdo_defaut * SEMAINES_PAR_MOIS,
+        _flottant(parametres, "marge_alerte", 10),
+        _seuils_employes(df, parametres)['Seuil Individuel']
+    )
+    return {'employes': _en_json(resume)}
+
+
+def operation_rythme(donnees, parametres, session=None):
+    """Analyse du rythme hebdomadaire de chaque employé."""
+    import utils
+
+    df = _donnees_avec_roles(donnees, parametres, session)
+    if df.empty:
+        return {'employes': []}
+    seuils_hebdo = _seuils_employes(df, parametres)['Seuil Hebdo']
+    analyses = []
+    for (emp_id, nom, role), emp_data in df.groupby(['emp_id', 'name', 'Role']):
+        analyse = utils.analyser_rythme_hebdomadaire(emp_data, seuils_hebdo[emp_id], role)
+        if analyse:
+            analyses.append({'emp_id': emp_id, 'nom': nom, **analyse})
+    return {'employes': analyses}
+
+
+OPERATIONS = {
+    'traiter': operation_traiter,
+    'resume': operation_resume,
+    'rythme': operation_rythme,
+}
+
+
+class ServiceHeures:
+    """
+    Exécute les opérations sur un pool borné de travailleurs, avec une file d'attente limitée.
+
+    Au-delà de `nb_travailleurs + taille_file` requêtes en cours, les nouvelles soumissions
+    sont refusées (FileSaturee) au lieu de s'accumuler. Les résultats sont mis en cache
+    par empreinte du fichier et paramètres.
+
+    Chaque requête a sa propre file dans le pool d'analyse (voir executeur.py) : la
+    limite d'analyses en attente par session ne s'applique pas à l'ensemble du service.
+    """
+
+    def __init__(self, nb_travailleurs=4, taille_file=64):
+        self._executeur = ThreadPoolExecutor(max_workers=nb_travailleurs, thread_name_prefix="service")
+        self._places = threading.BoundedSemaphore(nb_travailleurs + taille_file)
+        self.nb_travailleurs = nb_travailleurs
+        self.taille_file = taille_file
+        self._numeros = itertools.count(1)
+
+    def soumettre(self, operation, donnees, parametres=None):
+        """
+        Soumet une opération et renvoie un Future dont le résultat est un dict sérialisable en JSON.
+        """
+        if operation not in OPERATIONS:
+            raise RequeteInvalide(f"Opération inconnue: {operation}")
+        parametres = dict(parametres or {})
+        import registre
+
+        # Une modification du registre des employés change les rôles et seuils : nouvelle clé
+        version_registre = os.path.getmtime(registre.FICHIER_REGISTRE) if os.path.exists(registre.FICHIER_REGISTRE) else None
+        cle = ("service", operation, empreinte_octets(donnees), version_registre,
+               tuple(sorted((k, str(v)) for k, v in parametres.items())))
+        cache = obtenir_cache()
+        # Une seule consultation : l'entrée peut être évincée entre un test d'appartenance et sa lecture
+        resultat = cache.obtenir(cle, _ABSENT)
+        if resultat is not _ABSENT:
+            # Résultat déjà connu : réponse immédiate, sans occuper de place dans la file
+            futur = Future()
+            futur.set_result(resultat)
+            return futur
+        if not self._places.acquire(blocking=False):
+            raise FileSaturee("Trop de requêtes en cours")
+        session = f"service-{next(self._numeros)}"
+        try:
+            futur = self._executeur.submit(
+                cache.obtenir_ou_calculer, cle, lambda: OPERATIONS[operation](donnees, parametres, session)
+            )
+        except Exception:
+            self._places.release()
+            raise
+        futur.add_done_callback(lambda _: self._places.release())
+        return futur
+
+    def executer(self, operation, donnees, parametres=None, delai=DELAI_REPONSE):
+        """Soumet une opération et attend son résultat."""
+        try:
+            return self.soumettre(operation, donnees, parametres).result(timeout=delai)
+        except FileAnalysesPleine as e:
+            # File du pool d'analyse pleine : même réponse qu'une file du service saturée
+            raise FileSaturee(str(e)) from e
+
+    def fermer(self):
+        self._executeur.shutdown(wait=True)
+
+
+class ClientLocal:
+    """
+    Client de substitution appelant directement un ServiceHeures, sans réseau.
+
+    Même interface que ClientHTTP, pour tester une intégration localement.
+    """
+
+    def __init__(self, service):
+        self.service = service
+
+    def appeler(self, operation, donnees, **parametres):
+        return self.service.executer(operation, donnees, parametres)
+
+
+class ClientHTTP:
+    """
+    Client minimal du service HTTP (bibliothèque standard uniquement).
+    """
+
+    def __init__(self, url="http://127.0.0.1:8600", delai=DELAI_REPONSE):
+        self.url = url.rstrip("/")
+        self.delai = delai
+
+    def appeler(self, operation, donnees, **parametres):
+        requete = urllib.request.Request(
+            f"{self.url}/{operation}?{urlencode(parametres)}",
+            data=donnees,
+            headers={'Content-Type': 'application/octet-stream'},
+            method="POST"
+        )
+        try:
+            with urllib.request.urlopen(requete, timeout=self.delai) as reponse:
+                return json.loads(reponse.read().decode("utf-8"))
+        except urllib.error.HTTPError as e:
+            if e.code == 503:
+                raise FileSaturee(e.read().decode("utf-8"))
+            raise
+
+
+def creer_serveur(service, hote="127.0.0.1", port=8600):
+    """
+    Crée le serveur HTTP/JSON du service.
+
+    Routes:
+        POST /traiter, /resume, /rythme  corps = fichier Excel, paramètres dans l'URL
+                                         (onglet, mois, roles en JSON, seuil_hebdo_cuisine,
+                                         seuil_hebdo_salle, marge_alerte)
+        GET  /sante                      état de la file et du cache
+    """
+    erreurs_lecture = _erreurs_lecture()
+
+    class Gestionnaire(BaseHTTPRequestHandler):
+        def _repondre(self, code, contenu, entetes=None):
+            corps = json.dumps(contenu, ensure_ascii=False).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(corps)))
+            for nom, valeur in (entetes or {}).items():
+                self.send_header(nom, valeur)
+            self.end_headers()
+            self.wfile.write(corps)
+
+        def do_GET(self):
+            if urlparse(self.path).path == "/sante":
+                self._repondre(200, {
+                    'travailleurs': service.nb_travailleurs,
+                    'taille_file': service.taille_file,
+                    'cache': obtenir_cache().statistiques(),
+                })
+            else:
+                self._repondre(404, {'erreur': "Route inconnue"})
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            operation = url.path.strip("/")
+            parametres = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            donnees = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            if not donnees:
+                self._repondre(400, {'erreur': "Fichier Excel attendu dans le corps de la requête"})
+                return
+            try:
+                self._repondre(200, service.executer(operation, donnees, parametres))
+            except FileSaturee as e:
+                self._repondre(503, {'erreur': str(e)}, {'Retry-After': "1"})
+            except RequeteInvalide as e:
+                self._repondre(400, {'erreur': str(e)})
+            except DelaiDepasse:
+                self._repondre(504, {'erreur': "Délai de traitement dépassé"})
+            except ValueError as e:
+                # Erreurs de lecture du fichier (période ou ligne des jours introuvable, onglet absent...)
+                self._repondre(422, {'erreur': str(e)})
+            except erreurs_lecture as e:
+                # Fichier malformé (archive corrompue, classeur .xls illisible...) : erreur du client
+                self._repondre(422, {'erreur': f"Fichier Excel illisible: {e}"})
+            except Exception as e:
+                self._repondre(500, {'erreur': str(e)})
+
+        def log_message(self, format, *args):
+            pass
+
+    serveur = ThreadingHTTPServer((hote, port), Gestionnaire)
+    serveur.daemon_threads = True
+    return serveur
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Service HTTP/JSON de calcul des heures")
+    parser.add_argument("--hote", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    parser.add_argument("--travailleurs", type=int, default=4)
+    parser.add_argument("--file", type=int, default=64, help="Nombre de requêtes en attente acceptées")
+    args = parser.parse_args()
+
+    service = ServiceHeures(args.travailleurs, args.file)
+    serveur = creer_serveur(service, args.hote, args.port)
+    print(f"Service à l'écoute sur http://{args.hote}:{args.port}")
+    try:
+        serveur.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        serveur.server_close()
+        service.fermer()
@@ -0,0 +1,119 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+
+# Libellé de la classe regroupant les employés dont le seuil vient de leur contrat
+CLASSE_CONTRAT = "Contrat"
+
+
+class _ClasseTriee:
+    """Totaux triés d'une classe d'employés et leurs sommes cumulées."""
+
+    def __init__(self, valeurs):
+        self.valeurs = np.sort(np.asarray(valeurs, dtype=float))
+        self.cumul = np.concatenate([[0.0], np.cumsum(self.valeurs)])
+        self.n = len(self.valeurs)
+
+    def classer(self, seuils, marges):
+        """
+        Compte, pour chaque couple (seuil, marge), les employés en dépassement et en alerte,
+        et somme les heures au-delà du seuil (recherche dichotomique, sans parcourir les employés).
+        """
+        seuils = np.asarray(seuils, dtype=float)
+        # Dépassement : total > seuil
+        k = np.searchsorted(self.valeurs, seuils, side='right')
+        nb_depassement = self.n - k
+        heures_supp = (self.cumul[-1] - self.cumul[k]) - nb_depassement * seuils
+        # Alerte : seuil - marge <= total <= seuil
+        j = np.searchsorted(self.valeurs, seuils - np.asarray(marges, dtype=float), side='left')
+        return nb_depassement, k - j, j, heures_supp
+
+
+class SimulateurSeuils:
+    """
+    Simulation des statuts pour d'autres seuils et marges, sans recalculer les totaux.
+
+    Les totaux par employé sont triés une fois par classe (rôle ; les employés sous contrat
+    du registre forment une classe à part, leur seuil ne dépendant pas des réglages).
+    Chaque scénario se résout ensuite par recherche dichotomique dans ces tableaux.
+    """
+
+    def __init__(self, totaux, seuils_contrat=None):
+        """
+        Args:
+            totaux (pd.DataFrame): Totaux par employé ('ID Employé', 'Role', 'Heures Totales'),
+                                   voir CubeAgregats.totaux_employes
+            seuils_contrat (pd.Series): Seuil mensuel des employés sous contrat, par emp_id
+        """
+        seuils_contrat = seuils_contrat if seuils_contrat is not None else pd.Series(dtype=float)
+        sous_contrat = totaux['ID Employé'].isin(seuils_contrat.index)
+        self.classes = {
+            role: _ClasseTriee(groupe['Heures Totales'])
+            for role, groupe in totaux[~sous_contrat].groupby('Role')
+        }
+        # Sous contrat : écart au seuil individuel, comparé à un seuil nul
+        contrats = totaux[sous_contrat]
+        if not contrats.empty:
+            ecarts = contrats['Heures Totales'].to_numpy() - contrats['ID Employé'].map(seuils_contrat).to_numpy()
+            self.classes[CLASSE_CONTRAT] = _ClasseTriee(ecarts)
+        self.nb_employes = len(totaux)
+
+    def comparer(self, scenarios):
+        """
+        Résout plusieurs scénarios à la fois.
+
+        Args:
+            scenarios (pd.DataFrame): Une ligne par scénario, avec une colonne de seuil mensuel
+                                      par rôle simulé, 'seuil_defaut' (autres rôles) et 'marge'
+
+        Returns:
+            pd.DataFrame: Colonnes des scénarios, puis 'Heures Supp', 'Dépassement', 'Alerte', 'Normal'
+        """
+        marges = scenarios['marge'].to_numpy(dtype=float)
+        heures_supp = np.zeros(len(scenarios))
+        comptes = {statut: np.zeros(len(scenarios), dtype=int) for statut in ("Dépassement", "Alerte", "Normal")}
+        for role, classe in self.classes.items():
+            if role == CLASSE_CONTRAT:
+                seuils = np.zeros(len(scenarios))
+            elif role in scenarios.columns:
+                seuils = scenarios[role].to_numpy(dtype=float)
+            else:
+                seuils = scenarios['seuil_defaut'].to_numpy(dtype=float)
+            nb_depassement, nb_alerte, nb_normal, supp = classe.classer(seuils, marges)
+            comptes["Dépassement"] += nb_depassement
+            comptes["Alerte"] += nb_alerte
+            comptes["Normal"] += nb_normal
+            heures_supp += supp
+        resultat = scenarios.copy()
+        resultat['Heures Supp'] = heures_supp.round(2)
+        for statut, valeurs in comptes.items():
+            resultat[statut] = valeurs
+        return resultat
+
+
+def grille_scenarios(seuils_hebdo_par_role, marges, semaines_par_mois=4.33):
+    """
+    Construit toutes les combinaisons de seuils hebdomadaires et de marges.
+
+    Le seuil des autres rôles est la moyenne des seuils des rôles simulés, comme dans le résumé.
+
+    Args:
+        seuils_hebdo_par_role (dict): Rôle -> liste des seuils hebdomadaires candidats
+        marges (list): Marges d'alerte candidates (heures)
+        semaines_par_mois (float): Conversion des seuils hebdomadaires en seuils mensuels
+
+    Returns:
+        pd.DataFrame: Une ligne par combinaison ; colonnes '<rôle> (h/sem)', '<rôle>' (seuil
+                      mensuel), 'seuil_defaut' et 'marge'
+    """
+    roles = list(seuils_hebdo_par_role)
+    lignes = []
+    for combinaison in itertools.product(*(seuils_hebdo_par_role[r] for r in roles), marges):
+        *hebdo, marge = combinaison
+        ligne = {f"{role} (h/sem)": h for role, h in zip(roles, hebdo)}
+        ligne.update({role: h * semaines_par_mois for role, h in zip(roles, hebdo)})
+        ligne['seuil_defaut'] = float(np.mean(hebdo)) * semaines_par_mois
+        ligne['marge'] = marge
+        lignes.append(ligne)
+    return pd.DataFrame(lignes)
@@ -1,7 +1,20 @@
 import pandas as pd
+import numpy as np
+import io
 import re
 from datetime import datetime, timedelta
 
+import majorations
+import plans
+
+# Nombre de lignes lues par onglet lors de la découverte des onglets de pointage
+LIGNES_DECOUVERTE = 40
+# Nombre de blocs employés analysés pour l'aperçu rapide d'un fichier
+NB_BLOCS_APERCU = 5
+
+MOTIF_PERIODE = re.compile(r"\d{4}/\d{2}/\d{2}\s*~\s*\d{2}/\d{2}")
+MOTIF_NUMERIQUE = re.compile(r"^\d+(\.\d+)?$")
+
 def lire_onglet_excel(file, nom_onglet):
     """
     Ouvre le fichier Excel et renvoie le DataFrame de l'onglet choisi.
@@ -9,31 +22,245 @@ def lire_onglet_excel(file, nom_onglet):
     df = pd.read_excel(file, sheet_name=nom_onglet)
     return df
 
-def traiter_fichier(file, nom_onglet):
-    # 1) Lecture brute, tout en str
-    df = lire_onglet_excel(file, nom_onglet)
-    df = df.fillna("").astype(str)
+def _ouvrir_xlsx(file):
+    """
+    Ouvre un classeur .xlsx en lecture seule.
+
+    Une archive sans classeur (openpyxl lève KeyError) est signalée comme un fichier illisible.
+    """
+    import openpyxl
+    try:
+        return openpyxl.load_workbook(file, read_only=True, data_only=True)
+    except KeyError as e:
+        raise ValueError(f"Fichier Excel illisible: {e}") from e
+
+def lire_premieres_lignes(file, nb_lignes=LIGNES_DECOUVERTE):
+    """
+    Lit uniquement les premières lignes de chaque onglet, sans charger tout le classeur.
+
+    Les noms d'onglets viennent des métadonnées du classeur ; pour les .xlsx les lignes
+    sont lues en flux (openpyxl en lecture seule), pour les .xls les feuilles sont
+    chargées à la demande (xlrd).
+
+    Args:
+        file: Chemin, contenu (bytes) ou fichier binaire ouvert
+        nb_lignes (int): Nombre de lignes à lire par onglet
+
+    Returns:
+        dict: nom d'onglet -> liste de lignes (listes de str)
+    """
+    if isinstance(file, (bytes, bytearray)):
+        file = io.BytesIO(file)
+    if isinstance(file, str):
+        with open(file, "rb") as f:
+            file = io.BytesIO(f.read())
+    file.seek(0)
+    signature = file.read(4)
+    file.seek(0)
+
+    def _texte(v):
+        return "" if v is None else str(v)
+
+    lignes = {}
+    if signature.startswith(b"PK"):
+        classeur = _ouvrir_xlsx(file)
+        try:
+            for nom in classeur.sheetnames:
+                feuille = classeur[nom]
+                # La dimension enregistrée dans le fichier est souvent fausse : ne pas s'y fier
+                feuille.reset_dimensions()
+                lignes[nom] = [[_texte(v) for v in ligne]
+                               for ligne in feuille.iter_rows(max_row=nb_lignes, values_only=True)]
+        finally:
+            classeur.close()
+    else:
+        import xlrd
+        classeur = xlrd.open_workbook(file_contents=file.read(), on_demand=True)
+        try:
+            for nom in classeur.sheet_names():
+                feuille = classeur.sheet_by_name(nom)
+                lignes[nom] = [[_texte(v) for v in feuille.row_values(i)]
+                               for i in range(min(nb_lignes, feuille.nrows))]
+                classeur.unload_sheet(nom)
+        finally:
+            classeur.release_resources()
+    return lignes
+
+def decouvrir_onglets(file, nb_lignes=LIGNES_DECOUVERTE):
+    """
+    Repère les onglets de pointage d'après leurs premières lignes : cellule de période
+    (YYYY/MM/DD ~ MM/DD) et ligne des jours (au moins 5 cellules numériques).
 
+    Args:
+        file: Chemin, contenu (bytes) ou fichier binaire ouvert
+        nb_lignes (int): Nombre de lignes examinées par onglet
+
+    Returns:
+        list[dict]: Un dict par onglet ('onglet', 'periode', 'ligne_jours', 'nb_jours',
+                    'pointage'), les onglets de pointage en premier
+    """
+    resultats = []
+    for nom, lignes in lire_premieres_lignes(file, nb_lignes).items():
+        periode = next((m.group(0) for ligne in lignes for c in ligne
+                        for m in [MOTIF_PERIODE.search(c)] if m), None)
+        ligne_jours, nb_jours = None, 0
+        for idx, ligne in enumerate(lignes):
+            nb = sum(bool(MOTIF_NUMERIQUE.match(c.strip())) for c in ligne[1:])
+            if nb >= 5:
+                ligne_jours, nb_jours = idx, nb
+                break
+        resultats.append({
+            'onglet': nom,
+            'periode': periode,
+            'ligne_jours': ligne_jours,
+            'nb_jours': nb_jours,
+            'pointage': periode is not None and ligne_jours is not None,
+        })
+    # Tri stable : onglets de pointage d'abord, ordre du classeur ensuite
+    return sorted(resultats, key=lambda o: not o['pointage'])
+
+def analyser_cellule_pointages(cell):
+    """
+    Calcule les heures travaillées d'une cellule de pointages (un tampon HH:MM par ligne).
+
+    Returns:
+        tuple: (heures, diagnostic) où diagnostic contient 'nb_pointages' (tampons lisibles),
+               'pointages_invalides' (tampons illisibles ignorés), 'pointage_orphelin'
+               (nombre impair : le dernier tampon est ignoré), 'intervalle_min'
+               (plus court intervalle entrée–sortie, en minutes) et 'intervalles'
+               (liste des couples (entrée, sortie) en minutes depuis minuit)
+    """
+    # plusieurs tampons séparés par saut de ligne
+    stamps = [t.strip() for t in cell.splitlines() if t.strip()]
+    # parser en datetime
+    times = []
+    invalides = 0
+    for t in stamps:
+        try:
+            times.append(datetime.strptime(t, "%H:%M"))
+        except ValueError:
+            invalides += 1
+    nb_pointages = len(times)
+    # si impair, on retire le dernier
+    if len(times) % 2 == 1:
+        times = times[:-1]
+    # sommer les intervalles (entrée–sortie)
+    total = timedelta()
+    intervalle_min = None
+    intervalles = []
+    for k in range(0, len(times), 2):
+        start, end = times[k], times[k + 1]
+        if end < start:  # passage minuit
+            end += timedelta(days=1)
+        total += (end - start)
+        minutes = (end - start).total_seconds() / 60
+        intervalle_min = minutes if intervalle_min is None else min(intervalle_min, minutes)
+        debut_minutes = start.hour * 60 + start.minute
+        intervalles.append((debut_minutes, debut_minutes + int(minutes)))
+    return total.total_seconds() / 3600, {
+        "nb_pointages": nb_pointages,
+        "pointages_invalides": invalides,
+        "pointage_orphelin": nb_pointages % 2 == 1,
+        "intervalle_min": intervalle_min if intervalle_min is not None else float("nan"),
+        "intervalles": intervalles,
+    }
+
+def empreinte_mise_en_page(df, nb_lignes=LIGNES_DECOUVERTE):
+    """
+    Calcule l'empreinte de la zone d'en-tête d'un onglet de pointage.
+
+    Pour chaque ligne avant le premier bloc employé, on retient la position et la nature
+    des cellules (libellé exact, période, nombre) ; les valeurs qui changent d'un mois à
+    l'autre (dates, nombre de jours, donc largeur de l'onglet) sont ignorées. Deux exports de la même pointeuse ont
+    donc la même empreinte.
+
+    Args:
+        df (pd.DataFrame): Onglet lu en texte (voir traiter_fichier)
+
+    Returns:
+        str: Empreinte hexadécimale
+    """
+    import hashlib
+
+    parties = []
+    for row in df.head(nb_lignes).itertuples(index=False):
+        cells = [c.strip() for c in row]
+        if any(c.startswith("Non") for c in cells):
+            break
+        signature = []
+        dans_nombres = False
+        for j, c in enumerate(cells):
+            if MOTIF_NUMERIQUE.match(c):
+                # Une suite de jours ne compte qu'une fois, quelle que soit sa longueur
+                if not dans_nombres:
+                    signature.append(f"{j}#")
+                dans_nombres = True
+                continue
+            dans_nombres = False
+            if not c:
+                continue
+            signature.append(f"{j}P" if MOTIF_PERIODE.search(c) else f"{j}T{c}")
+        parties.append(",".join(signature))
+    return hashlib.sha1("|".join(parties).encode("utf-8")).hexdigest()[:16]
+
+def _prefixe_mois(period_text):
+    m = re.search(r"(\d{4})/(\d{2})/(\d{2})\s*~\s*(\d{2})/(\d{2})", period_text)
+    year, month = m.group(1), m.group(2)
+    return f"{year}-{month}"
+
+def _jours_par_colonne(ligne_jours, col_debut=1):
+    # Mapping position de colonne -> jour du mois, à partir de la ligne des jours
+    day_by_col = {}
+    for pos, val in enumerate(ligne_jours):
+        v = str(val).strip()
+        if pos >= col_debut and MOTIF_NUMERIQUE.match(v):
+            day_by_col[pos] = int(float(v))
+    return day_by_col
+
+def _enregistrements_bloc(times_row, day_by_col, ym_prefix, emp_id, name, dept):
+    # Une ligne de résultat par jour pointé de la ligne des horaires
+    records = []
+    for col, day in day_by_col.items():
+        cell = str(times_row[col]).strip()
+        if not cell:
+            continue
+        hours, diagnostic = analyser_cellule_pointages(cell)
+        date_str = f"{ym_prefix}-{day:02d}"
+        records.append({
+            "emp_id": emp_id,
+            "name":   name,
+            "department": dept,
+            "date":   date_str,
+            "hours_worked": round(hours, 2),
+            **diagnostic
+        })
+    return records
+
+def _analyser_par_detection(df):
+    """
+    Analyse complète d'un onglet de mise en page inconnue.
+
+    Returns:
+        tuple: (records, plan) où plan décrit la mise en page trouvée (None si aucun bloc employé)
+    """
     # 2) Repérer la période (YYYY/MM/DD ~ MM/DD)
     period_text = ""
-    for cell in df.values.flatten():
+    period_pos = None
+    for pos, cell in enumerate(df.values.flatten()):
         if isinstance(cell, str) and re.search(r"\d{4}/\d{2}/\d{2}\s*~", cell):
             period_text = cell
+            period_pos = divmod(pos, df.shape[1])
             break
     if not period_text:
         raise ValueError("Période non trouvée dans le fichier.")
-
-    m = re.search(r"(\d{4})/(\d{2})/(\d{2})\s*~\s*(\d{2})/(\d{2})", period_text)
-    year, month = m.group(1), m.group(2)
-    ym_prefix = f"{year}-{month}"
+    ym_prefix = _prefixe_mois(period_text)
 
     # 3) Détection de la première "ligne des jours"
-    num_pat = re.compile(r"^\d+(\.\d+)?$")
     header_idx = None
-    for idx, row in df.iterrows():
+    for idx, row in enumerate(df.itertuples(index=False)):
         # on regarde les cellules à partir de la 2ᵉ colonne (col index 1)
-        cells = [c.strip() for c in row.tolist()[1:]]
-        num_count = sum(bool(num_pat.match(c)) for c in cells)
+        cells = [c.strip() for c in row[1:]]
+        num_count = sum(bool(MOTIF_NUMERIQUE.match(c)) for c in cells)
         if num_count >= 5:  # au moins 5 jours (pour gérer semaines partielles ou courtes périodes)
             header_idx = idx
             break
@@ -41,20 +268,16 @@ def traiter_fichier(file, nom_onglet):
         raise ValueError("Ligne des jours introuvable")
 
     # 4) Construire le mapping col→jour
-    day_by_col = {}
-    for col, val in df.iloc[header_idx].items():
-        v = str(val).strip()
-        if num_pat.match(v):
-            day_by_col[col] = int(float(v))
+    day_by_col = _jours_par_colonne(df.iloc[header_idx].tolist(), col_debut=0)
 
     # 5) On travaille à partir de la ligne juste après
     sub = df.iloc[header_idx + 1 :].reset_index(drop=True)
 
     records = []
+    labels = None
     i = 0
     while i < len(sub):
-        row = sub.iloc[i]
-        tokens = [c.strip() for c in row.tolist()]
+        tokens = [c.strip() for c in sub.iloc[i].tolist()]
         # Repérer un bloc "Non :"
         non_pos = next((j for j, t in enumerate(tokens) if t.startswith("Non")), None)
         if non_pos is not None:
@@ -66,52 +289,315 @@ def traiter_fichier(file, nom_onglet):
             # Département
             dep_pos = next((j for j, t in enumerate(tokens) if t.startswith("Département")), None)
             dept = tokens[dep_pos + 2] if dep_pos is not None and len(tokens) > dep_pos + 2 else ""
+            if labels is None:
+                labels = (non_pos, nom_pos, dep_pos)
             # Ligne suivante = pointages
             if i + 1 < len(sub):
-                times_row = sub.iloc[i + 1]
-                for col, day in day_by_col.items():
-                    cell = str(times_row[col]).strip()
-                    if not cell:
-                        continue
-                    # plusieurs tampons séparés par saut de ligne
-                    stamps = [t.strip() for t in cell.splitlines() if t.strip()]
-                    # parser en datetime
-                    times = []
-                    for t in stamps:
-                        try:
-                            times.append(datetime.strptime(t, "%H:%M"))
-                        except:
-                            pass
-                    # si impair, on retire le dernier
-                    if len(times) % 2 == 1:
-                        times = times[:-1]
-                    # sommer les intervalles (entrée–sortie)
-                    total = timedelta()
-                    for k in range(0, len(times), 2):
-                        start, end = times[k], times[k + 1]
-                        if end < start:  # passage minuit
-                            end += timedelta(days=1)
-                        total += (end - start)
-                    hours = total.total_seconds() / 3600
-                    date_str = f"{ym_prefix}-{day:02d}"
-                    records.append({
-                        "emp_id": emp_id,
-                        "name":   name,
-                        "department": dept,
-                        "date":   date_str,
-                        "hours_worked": round(hours, 2)
-                    })
+                records.extend(_enregistrements_bloc(sub.iloc[i + 1].tolist(), day_by_col, ym_prefix, emp_id, name, dept))
             i += 2  # on saute la ligne Non: … et la ligne des horaires
         else:
             i += 1
 
+    plan = None
+    if labels is not None and None not in labels:
+        plan = {
+            'ligne_periode': int(period_pos[0]),
+            'col_periode': int(period_pos[1]),
+            'ligne_jours': int(header_idx),
+            'col_jours_debut': int(min(day_by_col)),
+            'col_non': int(labels[0]),
+            'col_nom': int(labels[1]),
+            'col_departement': int(labels[2]),
+            'decalage_valeur': 2,
+            'pas_bloc': 2,
+        }
+    return records, plan
+
+def _analyser_avec_plan(df, plan):
+    """
+    Analyse un onglet dont la mise en page est connue, sans rien redétecter.
+
+    Returns:
+        list | None: Les enregistrements, ou None si le fichier ne suit pas le plan
+    """
+    try:
+        period_text = df.iat[plan['ligne_periode'], plan['col_periode']]
+        if not MOTIF_PERIODE.search(period_text):
+            return None
+        ym_prefix = _prefixe_mois(period_text)
+        day_by_col = _jours_par_colonne(df.iloc[plan['ligne_jours']].tolist(), plan['col_jours_debut'])
+        if len(day_by_col) < 5:
+            return None
+
+        sub = df.iloc[plan['ligne_jours'] + 1:]
+        decalage = plan['decalage_valeur']
+        # Lignes de bloc repérées en une fois sur la colonne du libellé "Non"
+        candidats = np.flatnonzero(sub.iloc[:, plan['col_non']].str.strip().str.startswith("Non").to_numpy())
+        # Une ligne "Non" qui tombe sur la ligne des horaires du bloc précédent est ignorée
+        debuts = []
+        fin_bloc_precedent = -1
+        for debut in candidats:
+            if debut >= fin_bloc_precedent:
+                debuts.append(debut)
+                fin_bloc_precedent = debut + plan['pas_bloc']
+        if not debuts:
+            return None
+        # Les libellés "Nom" et "Département" doivent être dans les colonnes du plan sur toutes
+        # les lignes d'en-tête de bloc : une autre mise en page de même empreinte est redétectée
+        entetes = sub.iloc[debuts]
+        if not (entetes.iloc[:, plan['col_nom']].str.strip().str.startswith("Nom").all()
+                and entetes.iloc[:, plan['col_departement']].str.strip().str.startswith("Département").all()):
+            return None
+        ids = entetes.iloc[:, plan['col_non'] + decalage].str.strip().tolist()
+        noms = entetes.iloc[:, plan['col_nom'] + decalage].str.strip().tolist()
+        depts = entetes.iloc[:, plan['col_departement'] + decalage].str.strip().tolist()
+    except (IndexError, KeyError, TypeError, AttributeError):
+        return None
+
+    records = []
+    for debut, emp_id, name, dept in zip(debuts, ids, noms, depts):
+        if debut + 1 < len(sub):
+            records.extend(_enregistrements_bloc(sub.iloc[debut + 1].tolist(), day_by_col, ym_prefix, emp_id, name, dept))
+    return records
+
+def table_intervalles(jours):
+    """
+    Déplie la colonne 'intervalles' des données journalières en une ligne par intervalle.
+
+    Returns:
+        pd.DataFrame: Colonnes 'ligne' (index de la journée dans `jours`), 'emp_id', 'date'
+                      (datetime), 'debut' et 'fin' (minutes depuis minuit du jour de la journée)
+    """
+    colonnes = ['ligne', 'emp_id', 'date', 'debut', 'fin']
+    deplie = jours['intervalles'].explode().dropna()
+    if deplie.empty:
+        return pd.DataFrame(columns=colonnes)
+    bornes = np.array(deplie.tolist(), dtype=float).reshape(-1, 2)
+    return pd.DataFrame({
+        'ligne': deplie.index,
+        'emp_id': jours['emp_id'].loc[deplie.index].to_numpy(),
+        'date': pd.to_datetime(jours['date'].loc[deplie.index]).to_numpy(),
+        'debut': bornes[:, 0],
+        'fin': bornes[:, 1],
+    })[colonnes]
+
+def _texte_cellule(v):
+    # Même rendu texte que pd.read_excel(...).fillna("").astype(str)
+    if v is None:
+        return ""
+    if isinstance(v, float) and v.is_integer():
+        v = int(v)
+    return str(v)
+
+def _lignes_onglet(file, nom_onglet):
+    """
+    Parcourt les lignes d'un onglet (listes de str), la ligne d'en-tête exclue comme avec
+    pd.read_excel. Les .xlsx sont lus en flux (openpyxl en lecture seule).
+    """
+    if isinstance(file, (bytes, bytearray)):
+        file = io.BytesIO(file)
+    if isinstance(file, str):
+        with open(file, "rb") as f:
+            file = io.BytesIO(f.read())
+    file.seek(0)
+    signature = file.read(4)
+    file.seek(0)
+
+    if signature.startswith(b"PK"):
+        classeur = _ouvrir_xlsx(file)
+        try:
+            if nom_onglet not in classeur.sheetnames:
+                raise ValueError(f"Onglet introuvable: {nom_onglet}")
+            feuille = classeur[nom_onglet]
+            # Dimension du fichier ignorée (souvent fausse ou périmée), comme pd.read_excel
+            feuille.reset_dimensions()
+            lignes = feuille.iter_rows(values_only=True)
+            next(lignes, None)
+            for ligne in lignes:
+                yield [_texte_cellule(v) for v in ligne]
+        finally:
+            classeur.close()
+    else:
+        import xlrd
+        classeur = xlrd.open_workbook(file_contents=file.read(), on_demand=True)
+        try:
+            if nom_onglet not in classeur.sheet_names():
+                raise ValueError(f"Onglet introuvable: {nom_onglet}")
+            feuille = classeur.sheet_by_name(nom_onglet)
+            for i in range(1, feuille.nrows):
+                yield [_texte_cellule(v) for v in feuille.row_values(i)]
+        finally:
+            classeur.release_resources()
+
+def mois_de_periode(period_text):
+    """
+    Renvoie les mois (1 à 12) couverts par une période "YYYY/MM/DD ~ MM/DD".
+    """
+    m = re.search(r"(\d{4})/(\d{2})/(\d{2})\s*~\s*(\d{2})/(\d{2})", period_text)
+    debut, fin = int(m.group(2)), int(m.group(4))
+    nb_mois = (fin - debut) % 12 + 1
+    return [(debut - 1 + k) % 12 + 1 for k in range(nb_mois)]
+
+class LecturePointages:
+    """
+    Lecture en un seul passage d'un onglet de pointage.
+
+    Un aperçu n'a besoin que des premières lignes (période, ligne des jours, premiers blocs
+    employés) ; l'analyse complète reprend ensuite les lignes déjà lues et lit la suite
+    du même flux, sans relire le fichier.
+    """
+
+    def __init__(self, file, nom_onglet):
+        """
+        Args:
+            file: Chemin, contenu (bytes) ou fichier binaire ouvert
+            nom_onglet (str): Onglet de pointage
+        """
+        self.nom_onglet = nom_onglet
+        self._flux = _lignes_onglet(file, nom_onglet)
+        self._lignes = []
+        self.complet = False
+
+    def _lire_ligne(self):
+        ligne = next(self._flux, None)
+        if ligne is None:
+            self.complet = True
+            return None
+        self._lignes.append(ligne)
+        return ligne
+
+    def _tableau(self):
+        return pd.DataFrame(self._lignes).fillna("")
+
+    def fermer(self):
+        """
+        Abandonne la suite de la lecture (classeur libéré), par exemple quand l'analyse
+        complète est confiée au pool de processus après l'aperçu.
+        """
+        self._flux.close()
+
+    def apercu(self, nb_blocs=NB_BLOCS_APERCU):
+        """
+        Lit juste assez de lignes pour analyser les premiers blocs employés.
+
+        Args:
+            nb_blocs (int): Nombre de blocs employés à analyser
+
+        Returns:
+            dict: 'periode' (texte de la période), 'mois' (mois couverts), 'jours' (numéros des
+                  jours en colonnes), 'employes' (données journalières des blocs lus, comme
+                  traiter_fichier), 'nb_blocs' et 'nb_lignes_lues'
+
+        Raises:
+            ValueError: Pas de période ou de ligne des jours dans les premières lignes
+                        (onglet qui n'est pas un onglet de pointage)
+        """
+        # En-tête : période et ligne des jours, cherchées dans les premières lignes seulement
+        periode, ligne_jours = None, None
+        idx = 0
+        while ligne_jours is None or periode is None:
+            if idx >= len(self._lignes) and (idx >= LIGNES_DECOUVERTE or self._lire_ligne() is None):
+                break
+            ligne = self._lignes[idx]
+            if periode is None:
+                periode = next((c for c in ligne if re.search(r"\d{4}/\d{2}/\d{2}\s*~", c)), None)
+            if ligne_jours is None and sum(bool(MOTIF_NUMERIQUE.match(c.strip())) for c in ligne[1:]) >= 5:
+                ligne_jours = idx
+            idx += 1
+        if periode is None:
+            raise ValueError(f"Période non trouvée dans les {LIGNES_DECOUVERTE} premières lignes de l'onglet.")
+        if ligne_jours is None:
+            raise ValueError(f"Ligne des jours introuvable dans les {LIGNES_DECOUVERTE} premières lignes de l'onglet.")
+
+        # Blocs employés : une ligne "Non" puis la ligne des horaires
+        nb_lus = 0
+        idx = ligne_jours + 1
+        while nb_lus < nb_blocs:
+            if idx >= len(self._lignes) and self._lire_ligne() is None:
+                break
+            if any(c.strip().startswith("Non") for c in self._lignes[idx]):
+                nb_lus += 1
+                if idx + 1 >= len(self._lignes):
+                    self._lire_ligne()
+                idx += 2
+            else:
+                idx += 1
+
+        records, _ = _analyser_par_detection(self._tableau().iloc[:idx])
+        periode_complete = MOTIF_PERIODE.search(periode)
+        return {
+            'periode': periode_complete.group(0) if periode_complete else periode.strip(),
+            'mois': mois_de_periode(periode) if periode_complete else [],
+            'jours': sorted(set(_jours_par_colonne(self._lignes[ligne_jours], col_debut=0).values())),
+            'employes': pd.DataFrame(records, columns=["emp_id", "name", "department", "date", "hours_worked"]),
+            'nb_blocs': nb_lus,
+            'nb_lignes_lues': len(self._lignes),
+        }
+
+    def terminer(self):
+        """
+        Lit le reste de l'onglet et l'analyse en entier (voir analyser_fichier).
+        """
+        while self._lire_ligne() is not None:
+            pass
+        return _analyser_tableau(self._tableau())
+
+def _analyser_tableau(df):
+    """
+    Analyse un onglet de pointage lu en texte (cellules vides : "").
+
+    Returns:
+        tuple: (jours, intervalles), voir analyser_fichier
+    """
+    # Mise en page déjà connue : analyse directe avec le plan mémorisé,
+    # sinon détection complète puis mémorisation du plan trouvé
+    empreinte = empreinte_mise_en_page(df)
+    plan = plans.obtenir_plan(empreinte)
+    records = _analyser_avec_plan(df, plan) if plan is not None else None
+    if records is None:
+        if plan is not None:
+            plans.oublier_plan(empreinte)
+        records, plan = _analyser_par_detection(df)
+        if plan is not None:
+            plans.enregistrer_plan(empreinte, plan)
+
     # 6) Finalisation et déduplication
     res = pd.DataFrame(records)
     if not res.empty:
-        # Éliminer les doublons exacts (même emp_id, date, et hours_worked)
-        res = res.drop_duplicates(subset=["emp_id", "date", "hours_worked"], keep="first")
+        # Éliminer les doublons exacts (même emp_id, date, et hours_worked),
+        # en gardant sur la ligne conservée le nombre de doublons retirés
+        cles_doublons = ["emp_id", "date", "hours_worked"]
+        res["doublons_retires"] = res.groupby(cles_doublons)["hours_worked"].transform("size") - 1
+        res = res.drop_duplicates(subset=cles_doublons, keep="first")
         res = res.sort_values(["emp_id", "date"]).reset_index(drop=True)
-    return res
+
+        # 7) Heures majorées : tous les intervalles ventilés en une fois, puis sommés par journée
+        intervalles = table_intervalles(res)
+        ventilation = majorations.ventiler_intervalles(intervalles)
+        par_jour = ventilation.groupby(intervalles['ligne'].to_numpy()).sum().reindex(res.index, fill_value=0.0)
+        for colonne in majorations.COLONNES_MAJOREES:
+            res[colonne] = par_jour[colonne].round(2)
+        res = res.drop(columns=["intervalles"])
+    else:
+        intervalles = table_intervalles(pd.DataFrame({'emp_id': [], 'date': [], 'intervalles': []}))
+    return res, intervalles.drop(columns=['ligne'])
+
+def analyser_fichier(file, nom_onglet):
+    """
+    Analyse un onglet de pointage.
+
+    Returns:
+        tuple: (jours, intervalles) où jours a une ligne par employé et par jour (heures
+               travaillées, heures de nuit, du dimanche et fériées, diagnostics) et
+               intervalles une ligne par couple entrée–sortie (voir table_intervalles)
+    """
+    return LecturePointages(file, nom_onglet).terminer()
+
+def traiter_fichier(file, nom_onglet):
+    """
+    Analyse un onglet de pointage et renvoie les données journalières (voir analyser_fichier).
+    """
+    return analyser_fichier(file, nom_onglet)[0]
 
 def determiner_statut(heures_totales, seuil_heures_standard, marge_alerte):
     """Détermine le statut en fonction des heures travaillées par rapport au seuil spécifique."""
@@ -122,6 +608,68 @@ def determiner_statut(heures_totales, seuil_heures_standard, marge_alerte):
     else:
         return "Normal"
 
+def totaliser_par_employe(df):
+    """
+    Totalise les heures par employé (somme, moyenne et nombre de jours, heures majorées).
+
+    Args:
+        df (pd.DataFrame): Données journalières avec les colonnes 'emp_id', 'name',
+                           'department', 'Role' et 'hours_worked' (et les colonnes
+                           d'heures majorées si elles sont présentes)
+
+    Returns:
+        pd.DataFrame: Une ligne par employé, colonnes du résumé
+    """
+    cles = ['emp_id', 'name', 'department', 'Role']
+    totaux = df.groupby(cles)['hours_worked'].agg(['sum', 'mean', 'count']).reset_index()
+    totaux.columns = ['ID Employé', 'Nom', 'Département', 'Role', 'Heures Totales', 'Moyenne Quotidienne', 'Jours Travaillés']
+    colonnes_majorees = [c for c in majorations.COLONNES_MAJOREES if c in df.columns]
+    if colonnes_majorees:
+        majorees = df.groupby(cles)[colonnes_majorees].sum().reset_index(drop=True)
+        for colonne in colonnes_majorees:
+            totaux[majorations.COLONNES_MAJOREES[colonne]] = majorees[colonne].to_numpy()
+    return totaux
+
+def classer_resume(totaux, seuils_par_role, seuil_defaut, marge_alerte, seuils_employes=None):
+    """
+    Ajoute aux totaux par employé le seuil individuel, les heures supp/restantes et le statut.
+
+    Args:
+        totaux (pd.DataFrame): Résultat de totaliser_par_employe (ou CubeAgregats.totaux_employes)
+        seuils_par_role (dict): Seuil mensuel par rôle (ex: {"Cuisine": 181.86, "Salle": 168.87})
+        seuil_defaut (float): Seuil mensuel pour les rôles absents de `seuils_par_role`
+        marge_alerte (float): Marge (en heures) avant le seuil déclenchant l'alerte
+        seuils_employes (pd.Series): Seuil mensuel par emp_id (contrats du registre, voir
+                                     registre.resoudre_seuils), prioritaire sur le seuil du rôle
+
+    Returns:
+        pd.DataFrame: Une ligne par employé
+    """
+    resume = totaux.copy()
+    seuil_role = resume['Role'].map(seuils_par_role).fillna(seuil_defaut)
+    if seuils_employes is not None:
+        resume['Seuil Individuel'] = resume['ID Employé'].map(seuils_employes).fillna(seuil_role).astype(float)
+    else:
+        resume['Seuil Individuel'] = seuil_role.astype(float)
+    resume['Heures Supp'] = (resume['Heures Totales'] - resume['Seuil Individuel']).clip(lower=0)
+    resume['Heures Restantes'] = (resume['Seuil Individuel'] - resume['Heures Totales']).clip(lower=0)
+    # Même règle que determiner_statut, appliquée sur toute la colonne
+    resume['Statut'] = np.select(
+        [resume['Heures Totales'] > resume['Seuil Individuel'],
+         resume['Seuil Individuel'] - resume['Heures Totales'] <= marge_alerte],
+        ["Dépassement", "Alerte"],
+        default="Normal"
+    )
+    return resume
+
+def calculer_resume(df, seuils_par_role, seuil_defaut, marge_alerte, seuils_employes=None):
+    """
+    Calcule le résumé par employé (heures totales, seuil individuel, heures supp, statut).
+
+    Voir totaliser_par_employe et classer_resume pour le détail des arguments.
+    """
+    return classer_resume(totaliser_par_employe(df), seuils_par_role, seuil_defaut, marge_alerte, seuils_employes)
+
 def analyser_rythme_hebdomadaire(df_employe, seuil_hebdo, nom_role):
     """
     Analyse le rythme hebdomadaire de la dernière semaine pour un employé.
@@ -145,13 +693,32 @@ def analyser_rythme_hebdomadaire(df_employe, seuil_hebdo, nom_role):
     # Prendre les 7 derniers jours disponibles
     derniers_jours = df_employe.tail(7)
     
-    if len(derniers_jours) < 3:  # Besoin d'au moins 3 jours pour une projection significative
+    return evaluer_rythme(
+        derniers_jours['hours_worked'].sum(),
+        len(derniers_jours),
+        seuil_hebdo,
+        nom_role,
+        derniers_jours['date'].min(),
+        derniers_jours['date'].max()
+    )
+
+def evaluer_rythme(heures_periode, nb_jours, seuil_hebdo, nom_role, date_debut, date_fin):
+    """
+    Projette sur une semaine les heures des derniers jours travaillés et classe le rythme.
+
+    Args:
+        heures_periode (float): Heures des derniers jours travaillés
+        nb_jours (int): Nombre de ces jours
+        seuil_hebdo (float): Seuil hebdomadaire en heures
+        nom_role (str): Nom du rôle pour l'affichage
+        date_debut, date_fin (datetime-like): Premier et dernier de ces jours
+
+    Returns:
+        dict: Informations sur le rythme hebdomadaire (None si moins de 3 jours)
+    """
+    if nb_jours < 3:  # Besoin d'au moins 3 jours pour une projection significative
         return None
     
-    # Calculer les heures totales de la période
-    heures_periode = derniers_jours['hours_worked'].sum()
-    nb_jours = len(derniers_jours)
-    
     # Calculer la moyenne journalière
     moyenne_jour = heures_periode / nb_jours
     
@@ -182,6 +749,59 @@ def analyser_rythme_hebdomadaire(df_employe, seuil_hebdo, nom_role):
         'projection_hebdo': projection_hebdo,
         'seuil_hebdo': seuil_hebdo,
         'nom_role': nom_role,
-        'date_debut': derniers_jours['date'].min().strftime('%d/%m/%Y'),
-        'date_fin': derniers_jours['date'].max().strftime('%d/%m/%Y')
-    } 
\ No newline at end of file
+        'date_debut': pd.Timestamp(date_debut).strftime('%d/%m/%Y'),
+        'date_fin': pd.Timestamp(date_fin).strftime('%d/%m/%Y')
+    }
+
+
+def _avec_dimension(donnees, reference):
+    # Copie d'un .xlsx dont chaque feuille déclare la dimension `reference` (ex: "A1")
+    import zipfile
+
+    entree = zipfile.ZipFile(io.BytesIO(donnees))
+    sortie = io.BytesIO()
+    with zipfile.ZipFile(sortie, "w", zipfile.ZIP_DEFLATED) as copie:
+        for element in entree.infolist():
+            contenu = entree.read(element)
+            if element.filename.startswith("xl/worksheets/"):
+                contenu = re.sub(rb'<dimension ref="[^"]*"\s*/>', f'<dimension ref="{reference}"/>'.encode(), contenu)
+            copie.writestr(element, contenu)
+    return sortie.getvalue()
+
+
+def verifier_dimensions_ignorees(donnees, nom_onglet):
+    """
+    Vérifie que la lecture d'un .xlsx ne dépend pas de la dimension enregistrée dans ses
+    feuilles (souvent fausse ou périmée selon le logiciel qui a écrit le fichier).
+
+    L'onglet doit aussi rester détecté comme onglet de pointage (decouvrir_onglets).
+
+    Returns:
+        dict: Dimension testée -> nombre de lignes analysées (ou message d'erreur) ; la clé
+              None donne la référence (fichier d'origine)
+    """
+    resultats = {None: len(traiter_fichier(donnees, nom_onglet))}
+    for reference in ("A1", "A1:F20"):
+        copie = _avec_dimension(donnees, reference)
+        detection = {o['onglet']: o['pointage'] for o in decouvrir_onglets(copie)}
+        if not detection.get(nom_onglet):
+            resultats[reference] = "erreur: onglet non détecté comme onglet de pointage"
+            continue
+        try:
+            resultats[reference] = len(traiter_fichier(copie, nom_onglet))
+        except ValueError as e:
+            resultats[reference] = f"erreur: {e}"
+    return resultats
+
+
+if __name__ == "__main__":
+    import sys
+
+    # python utils.py fichier.xlsx ["Onglet"] : lecture identique avec une dimension fausse
+    with open(sys.argv[1], "rb") as f:
+        contenu = f.read()
+    resultats = verifier_dimensions_ignorees(contenu, sys.argv[2] if len(sys.argv) > 2 else "Enregistrement ")
+    for reference, nb in resultats.items():
+        libelle = reference or "fichier d'origine"
+        print(f"{libelle:<20} {nb:>8} lignes" if isinstance(nb, int) else f"{libelle:<20} {nb}")
+    sys.exit(0 if len(set(resultats.values())) == 1 else 1)
@@ -2,22 +2,35 @@ import streamlit as st
 import pandas as pd
 import altair as alt
 
-def creer_graphique_heures_par_employe(df_role_specific, seuil_role_specific, role_name):
+def creer_graphique_heures_par_employe(df_role_specific, seuil_role_specific, role_name, cube=None,
+                                       seuils_employes=None):
     """
     Crée un graphique à barres montrant les heures totales par employé 
     pour un rôle spécifique (Salle ou Cuisine) avec le seuil correspondant.
 
     Args:
-        df_role_specific (pd.DataFrame): DataFrame filtré pour un seul rôle.
+        df_role_specific (pd.DataFrame): DataFrame filtré pour un seul rôle (ignoré si `cube` est fourni).
         seuil_role_specific (float): Seuil mensuel d'heures pour ce rôle.
         role_name (str): Nom du rôle ("Salle" ou "Cuisine") pour le titre.
+        cube (CubeAgregats): Agrégats précalculés à utiliser à la place de `df_role_specific`.
+        seuils_employes (pd.Series): Seuil mensuel par emp_id (contrats du registre) ; chaque barre
+                                     est alors comparée au seuil de son employé.
     """
-    if df_role_specific.empty:
+    # Graphique Altair - Heures totales par employé avec ligne de référence spécifique
+    if cube is not None:
+        employes = cube.employe.reset_index()
+        employes = employes[employes['Role'] == role_name]
+        heures_par_employe = employes.groupby(['emp_id', 'name'])['heures'].sum().rename('hours_worked').reset_index()
+    else:
+        heures_par_employe = df_role_specific.groupby(['emp_id', 'name'])['hours_worked'].sum().reset_index()
+    heures_par_employe['seuil'] = (heures_par_employe['emp_id'].map(seuils_employes) if seuils_employes is not None
+                                   else pd.Series(float('nan'), index=heures_par_employe.index))
+    heures_par_employe['seuil'] = heures_par_employe['seuil'].fillna(seuil_role_specific).astype(float)
+
+    if heures_par_employe.empty:
         # Retourner un graphique vide ou un message si aucune donnée pour ce rôle
         return alt.Chart().mark_text(text=f"Aucun employé trouvé pour le rôle {role_name}.").properties(height=100)
 
-    # Graphique Altair - Heures totales par employé avec ligne de référence spécifique
-    heures_par_employe = df_role_specific.groupby(['name'])['hours_worked'].sum().reset_index()
     heures_par_employe = heures_par_employe.sort_values('hours_worked', ascending=False)
     
     # Préparation des données pour la ligne de référence spécifique
@@ -46,44 +59,63 @@ def creer_graphique_heures_par_employe(df_role_specific, seuil_role_specific, ro
         text=alt.value(f"Seuil {role_name}: {seuil_role_specific:.2f}h")
     )
     
+    # Ordre des employés commun aux barres et aux repères de seuil (heures décroissantes)
+    ordre_employes = alt.EncodingSortField(field='hours_worked', order='descending')
+    
     # Barre pour heures totales
     bars = alt.Chart(heures_par_employe).mark_bar().encode(
-        x=alt.X('name:N', title='Employé', sort='-y', axis=alt.Axis(labelAngle=-45)),
+        x=alt.X('name:N', title='Employé', sort=ordre_employes, axis=alt.Axis(labelAngle=-45)),
         y=alt.Y('hours_worked:Q', title='Heures totales'),
         color=alt.condition(
-            alt.datum.hours_worked > seuil_role_specific,
+            alt.datum.hours_worked > alt.datum.seuil,
             alt.value('#FF5733'),  # rouge pour heures supp
             alt.value('#4CAF50')   # vert pour heures normales
         ),
-        tooltip=['name', alt.Tooltip('hours_worked:Q', title='Heures totales')]
+        tooltip=['name', alt.Tooltip('hours_worked:Q', title='Heures totales'),
+                 alt.Tooltip('seuil:Q', title='Seuil individuel', format='.2f')]
+    )
+    
+    # Repère du seuil individuel sur chaque barre (contrats à temps partiel, etc.)
+    seuils_individuels = alt.Chart(heures_par_employe).mark_tick(
+        color='black',
+        thickness=2
+    ).encode(
+        x=alt.X('name:N', sort=ordre_employes),
+        y='seuil:Q'
     )
     
     # Combinaison des graphiques
-    chart = (bars + rule + text).properties(
+    chart = (bars + seuils_individuels + rule + text).properties(
         height=400,
         title=f"Heures travaillées ({role_name} - Seuil: {seuil_role_specific:.2f}h)"
     ).interactive()
     
     return chart
 
-def creer_graphiques_par_departement(filtered_df, heures_standard):
+def creer_graphiques_par_departement(filtered_df, heures_standard, cube=None):
     """
     Crée des graphiques montrant les heures par département.
+    Si `cube` (CubeAgregats) est fourni, ses agrégats remplacent le calcul sur `filtered_df`.
     """
     # Vérifier si le DataFrame est vide
-    if filtered_df.empty:
+    if (cube.departement.empty if cube is not None else filtered_df.empty):
         empty_chart = alt.Chart().mark_text(text="Aucune donnée disponible").properties(height=100)
         return empty_chart, empty_chart, empty_chart
     
-    # Graphique des heures par département
-    heures_par_dept = filtered_df.groupby(['department'])['hours_worked'].sum().reset_index()
+    if cube is not None:
+        heures_par_dept = cube.departement.reset_index().rename(
+            columns={'heures': 'hours_worked', 'nb_employes': 'nombre_employes'}
+        )[['department', 'hours_worked', 'nombre_employes']]
+    else:
+        # Graphique des heures par département
+        heures_par_dept = filtered_df.groupby(['department'])['hours_worked'].sum().reset_index()
+        
+        # Calcul des heures moyennes par employé dans chaque département
+        dept_emp_count = filtered_df.groupby('department')['name'].nunique().reset_index()
+        dept_emp_count.columns = ['department', 'nombre_employes']
+        
+        heures_par_dept = heures_par_dept.merge(dept_emp_count, on='department')
     heures_par_dept = heures_par_dept.sort_values('hours_worked', ascending=False)
-    
-    # Calcul des heures moyennes par employé dans chaque département
-    dept_emp_count = filtered_df.groupby('department')['name'].nunique().reset_index()
-    dept_emp_count.columns = ['department', 'nombre_employes']
-    
-    heures_par_dept = heures_par_dept.merge(dept_emp_count, on='department')
     heures_par_dept['heures_moyennes_par_employe'] = heures_par_dept['hours_worked'] / heures_par_dept['nombre_employes']
     
     # Graphique des heures totales par département
@@ -165,17 +197,21 @@ def creer_graphiques_par_departement(filtered_df, heures_standard):
     
     return chart1, chart_combo, pie
 
-def creer_graphiques_tendance_journaliere(filtered_df, heures_jour):
+def creer_graphiques_tendance_journaliere(filtered_df, heures_jour, cube=None):
     """
     Crée des graphiques montrant la tendance des heures par jour.
+    Si `cube` (CubeAgregats) est fourni, ses agrégats remplacent le calcul sur `filtered_df`.
     """
     # Vérifier si le DataFrame est vide
-    if filtered_df.empty:
+    if (cube.jour.empty if cube is not None else filtered_df.empty):
         empty_chart = alt.Chart().mark_text(text="Aucune donnée disponible").properties(height=100)
         return empty_chart, empty_chart
     
     # Préparation des données pour la tendance journalière
-    heures_par_jour = filtered_df.groupby('date')['hours_worked'].sum().reset_index()
+    if cube is not None:
+        heures_par_jour = cube.jour['heures'].rename('hours_worked').reset_index()
+    else:
+        heures_par_jour = filtered_df.groupby('date')['hours_worked'].sum().reset_index()
     
     # Préparation des données pour la ligne de référence
     heures_ref_df = pd.DataFrame([{'threshold': heures_jour}])
@@ -253,7 +289,10 @@ def creer_graphiques_tendance_journaliere(filtered_df, heures_jour):
     
     # Heatmap des heures par jour par employé avec Altair
     # Préparation des données
-    heatmap_data = filtered_df.copy()
+    if cube is not None:
+        heatmap_data = cube.employe_jour.reset_index()[['name', 'date', 'heures']].rename(columns={'heures': 'hours_worked'})
+    else:
+        heatmap_data = filtered_df.copy()
     heatmap_data['jour'] = heatmap_data['date'].dt.strftime('%d/%m')
     
     # Création du heatmap avec coloration spéciale pour les valeurs > 12h
@@ -281,6 +320,39 @@ def creer_graphiques_tendance_journaliere(filtered_df, heures_jour):
     
     return chart, heatmap + text_heatmap
 
+def creer_heatmap_couverture(profil, titre="Effectif présent par jour et par heure"):
+    """
+    Crée une heatmap de la couverture (jour de la semaine × heure).
+
+    Args:
+        profil (pd.DataFrame): Semaine type issue de couverture.profil_hebdomadaire
+                               (groupes déjà additionnés ou filtrés)
+        titre (str): Titre du graphique
+    """
+    if profil.empty:
+        return alt.Chart().mark_text(text="Aucune donnée disponible").properties(height=100)
+    
+    jours = profil.drop_duplicates('jour_semaine').sort_values('jour_semaine')['jour'].tolist()
+    base = alt.Chart(profil).encode(
+        x=alt.X('heure:O', title='Heure'),
+        y=alt.Y('jour:N', title='Jour', sort=jours)
+    )
+    heatmap = base.mark_rect().encode(
+        color=alt.Color('effectif_moyen:Q', scale=alt.Scale(scheme='greens'),
+                        legend=alt.Legend(title="Effectif moyen")),
+        tooltip=[
+            alt.Tooltip('jour:N', title='Jour'),
+            alt.Tooltip('heure:O', title='Heure'),
+            alt.Tooltip('effectif_moyen:Q', title='Effectif moyen', format='.1f'),
+            alt.Tooltip('effectif_max:Q', title='Effectif maximal')
+        ]
+    )
+    # Valeurs dans les cellules occupées
+    texte = base.transform_filter(alt.datum.effectif_moyen >= 0.05).mark_text(fontSize=9).encode(
+        text=alt.Text('effectif_moyen:Q', format='.1f')
+    )
+    return (heatmap + texte).properties(title=titre, height=len(jours) * 40 + 50)
+
 def afficher_statut_employes(statut_df):
     """
     Affiche le statut des heures (Normal, Alerte, Dépassement) pour chaque employé 